@@ -0,0 +1,117 @@
+"""API routes for stat analytics (team builder)."""
+
+from typing import Annotated, Any, Literal
+
+from ninja import Field, Query, Router
+
+import numpy as np
+
+from api.authentification import CachedAPIKeyAuth
+from api.schemas import MatchupRequestSchema, MatchupSchema, PokemonValueSchema, StatWeightsSchema
+from pokemon.analytics import STATS, stat_matrix
+from pokemon.effectiveness import get_chart
+
+# Création d'un routeur Ninja pour les statistiques, avec authentification par clé API.
+# Les calculs sont faits en mémoire sur une matrice NumPy (voir pokemon/analytics.py),
+# sans charger les Pokémon via l'ORM à chaque requête.
+router = Router(auth=CachedAPIKeyAuth())
+
+@router.get("top", response=list[PokemonValueSchema])
+# Endpoint pour obtenir les meilleurs Pokémon selon un score pondéré de leurs statistiques.
+# Système de routing : cette route correspond à /api/analytics/top (voir api/ninja.py).
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/analytics/top?k=6&attack=2&speed=1.5&defense=0&type=Dragon
+# - Header : X-API-KEY : <votre_clé_api>
+def top_k(
+    request,
+    weights: Query[StatWeightsSchema],
+    k: int = Query(10, ge=1, le=1000),
+    type: str | None = None,
+    generation: int | None = None,
+    legendary: bool | None = None,
+):
+    """
+    Les k Pokémon ayant le plus grand score (somme des statistiques pondérées).
+    Chaque statistique a un poids de 1 par défaut ; type, generation et legendary filtrent les candidats.
+    """
+    matrix = stat_matrix.get()
+    mask = matrix.mask(type=type, generation=generation, legendary=legendary)
+    return matrix.top_k([getattr(weights, stat) for stat in STATS], k, mask)
+
+@router.get("percentiles", response=dict[str, dict[str, float]])
+# Endpoint pour obtenir les percentiles d'une statistique pour chaque type.
+# Système de routing : cette route correspond à /api/analytics/percentiles
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/analytics/percentiles?stat=speed&percentiles=50&percentiles=90
+# - Header : X-API-KEY : <votre_clé_api>
+def stat_percentiles(
+    request,
+    stat: Literal[tuple(STATS + ["total"])] = "total",
+    percentiles: list[Annotated[float, Field(ge=0, le=100)]] = Query([25, 50, 75, 90]),
+):
+    """
+    Percentiles d'une statistique (ou du total) parmi les Pokémon de chaque type (type1 ou type2).
+    Retourne {type: {percentile: valeur}}.
+    """
+    return stat_matrix.get().percentiles(stat, percentiles)
+
+@router.get("nearest/{id}", response={200: list[PokemonValueSchema], 404: Any})
+# Endpoint pour trouver les Pokémon aux statistiques les plus proches d'un Pokémon donné.
+# Système de routing : cette route correspond à /api/analytics/nearest/{id}
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/analytics/nearest/25?k=5
+# - Header : X-API-KEY : <votre_clé_api>
+# Remplacez 25 par l'identifiant (id) du Pokémon.
+def nearest(request, id: int, k: int = Query(5, ge=1, le=1000)):
+    """
+    Les k Pokémon les plus proches (distance euclidienne sur les six statistiques).
+    La valeur retournée pour chaque Pokémon est la distance.
+    """
+    try:
+        return stat_matrix.get().nearest(id, k)
+    except KeyError:
+        return (404, {"message": "Pokemon not found"})
+
+@router.post("matchups", response={200: MatchupSchema, 404: Any, 422: Any})
+# Endpoint pour calculer l'efficacité de N types d'attaque contre M Pokémon défenseurs en un seul appel.
+# Système de routing : cette route correspond à /api/analytics/matchups
+# Pour tester dans Postman :
+# - Méthode : POST
+# - URL : http://127.0.0.1:8000/api/analytics/matchups
+# - Header : X-API-KEY : <votre_clé_api>
+# - Body (JSON) :
+#   {
+#     "attackers": ["Fire", "Water", "Electric"],
+#     "defenders": [1, 7, 150]
+#   }
+def matchups(request, data: MatchupRequestSchema):
+    """
+    Multiplicateurs d'efficacité de chaque type d'attaque contre chaque Pokémon défenseur (par id).
+    Les doubles types sont gérés en multipliant les deux multiplicateurs (ex : 4, 0.25).
+    Le calcul est fait en une seule opération vectorisée sur la matrice 18x18 (voir pokemon/effectiveness.py).
+    """
+    chart = get_chart()
+    try:
+        attackers = chart.encode(data.attackers)
+    except KeyError as error:
+        return (422, {"detail": f"Unknown type {error.args[0]}"})
+
+    matrix = stat_matrix.get()
+    rows = [matrix.rows.get(pk) for pk in data.defenders]
+    missing = [pk for pk, row in zip(data.defenders, rows) if row is None]
+    if missing:
+        return (404, {"message": "Pokemon not found", "missing": missing})
+    # Codes of the stat matrix -> codes of the chart; the last item maps "no type2" (-1) to -1.
+    # Types missing from the chart (created through the API) are neutral: x1, like no type.
+    translation = np.append(chart.encode(matrix.type_names, default=-1), -1)
+    rows = np.array(rows, dtype=np.intp)
+    multipliers = chart.multipliers(attackers, translation[matrix.type1[rows]], translation[matrix.type2[rows]])
+    return {"attackers": data.attackers, "defenders": data.defenders, "multipliers": multipliers.tolist()}
+
+# Explications générales :
+# - Les routes de ce fichier sont accessibles sous le préfixe /api/analytics/ grâce à l'ajout du routeur dans api/ninja.py.
+# - La matrice des statistiques est chargée une fois par processus et reconstruite automatiquement
+#   dès qu'un Pokémon, un type ou une génération est modifié (compteurs ChangeCounter).
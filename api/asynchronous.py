@@ -0,0 +1,112 @@
+"""Async (ASGI-native) versions of the read routes."""
+
+from typing import Any
+
+from ninja import Query, Router
+from ninja.pagination import paginate, PageNumberPagination
+
+from api.authentification import AsyncAPIKeyAuth, AsyncStatelessJwtAuth
+from api.conditional import conditional
+from api.pagination import CursorPagination
+from api.schemas import PokemonSchema, PokemonSchemaMini, PokemonSearchOrderSchema, PokemonSearchSchema, TypeSchema
+from pokemon.cache import reference_cache
+from pokemon.models import Generation, Pokemon, Type
+
+# Création d'un routeur Ninja pour les versions async des routes de lecture.
+# Sous un serveur ASGI (uvicorn), ces routes s'exécutent directement dans la boucle d'évènements
+# avec l'ORM async (aget, afirst, async for), sans passer par un thread (sync_to_async) à chaque requête.
+# Les URLs reprennent celles des routes sync sous le préfixe /api/async/.
+router = Router()
+
+@router.get("pokemon/view/{number}", response={200: PokemonSchema, 404: Any}, auth=AsyncAPIKeyAuth())
+@conditional(Pokemon, Type, Generation)
+# Version async de /api/pokemon/view/{number}.
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/async/pokemon/view/{number}
+# - Header : X-API-KEY : <votre_clé_api>
+async def pokemon_view(request, number: int, version: str = ""):
+    """Détaille un Pokémon selon son numéro et sa version."""
+    try:
+        return await Pokemon.objects.for_schema().aget(number=number, version=version)
+    except Pokemon.DoesNotExist:
+        return (404, {"message": "Pokemon not found"})
+
+@router.get("pokemon/view-all/{number}", response={200: list[PokemonSchema], 404: Any}, auth=AsyncStatelessJwtAuth())
+# Version async de /api/pokemon/view-all/{number}.
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/async/pokemon/view-all/{number}
+# - Header : Authorization : Bearer <votre_token_jwt>
+async def pokemon_view_all(request, number: int):
+    """Détaille tous les Pokémon d'un numéro donné (toutes versions)."""
+    pokemons = [pokemon async for pokemon in Pokemon.objects.for_schema().filter(number=number)]
+    if not pokemons:
+        return (404, {"message": "Pokemon not found"})
+    return pokemons
+
+@router.get("pokemon/search", response=list[PokemonSchema], auth=AsyncAPIKeyAuth())
+@paginate(PageNumberPagination, page_size=10)
+# Version async de /api/pokemon/search.
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/async/pokemon/search?min_attack=100&type=Fire
+# - Header : X-API-KEY : <votre_clé_api>
+async def pokemon_search(request, filters: Query[PokemonSearchSchema], order: Query[PokemonSearchOrderSchema]):
+    """Recherche les Pokémon par plages de statistiques, type, génération et légendaire."""
+    # Le queryset n'est évalué (en async) que par la pagination.
+    return filters.filter(Pokemon.objects.for_schema()).order_by(order.order_by, "id")
+
+@router.get("type/list", response=list[TypeSchema])
+@conditional(Type)
+# Version async de /api/type/list.
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/async/type/list
+async def type_list(request):
+    """Liste tous les types de Pokémon (servie depuis reference_cache)."""
+    async def load():
+        return [type async for type in Type.objects.values()]
+    return await reference_cache.aget_or_set("type_list", load)
+
+@router.get("type/view/{name}", response={200: TypeSchema, 404: dict[str, str]})
+# Version async de /api/type/view/{name}.
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/async/type/view/Steel
+async def type_view(request, name: str):
+    """Route pour obtenir un type par son nom (servi depuis reference_cache)."""
+    async def load():
+        return await Type.objects.filter(name=name).values().afirst()
+    type = await reference_cache.aget_or_set(f"type:{name}", load)
+    if type is None:
+        return (404, {"message": "Type not found"})
+    return type
+
+@router.get("querysets/pokemons", response=list[PokemonSchemaMini])
+@conditional(Pokemon, Type)
+@paginate(PageNumberPagination, page_size=10)
+# Version async de /api/querysets/pokemons.
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/async/querysets/pokemons?page=1
+async def list_pokemons(request):
+    """List all Pokemons."""
+    return Pokemon.objects.for_mini_schema()
+
+@router.get("querysets/pokemons/cursor", response=list[PokemonSchemaMini])
+@conditional(Pokemon, Type)
+@paginate(CursorPagination, ordering=("number", "id"), page_size=10)
+# Version async de /api/querysets/pokemons/cursor.
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/async/querysets/pokemons/cursor
+async def list_pokemons_cursor(request):
+    """List all Pokemons, ordered by number, with cursor pagination."""
+    return Pokemon.objects.for_mini_schema()
+
+# Explications générales :
+# - Les routes de ce fichier sont accessibles sous le préfixe /api/async/ grâce à l'ajout du routeur dans api/ninja.py.
+# - Elles renvoient exactement les mêmes réponses que les routes sync correspondantes ;
+#   sous WSGI (runserver, gunicorn) Django les exécute aussi, mais via async_to_sync : préférez alors les routes sync.
+# - Les routes d'écriture (création, modification, suppression) restent synchrones.
@@ -1,7 +1,38 @@
+import hashlib
+import hmac
+from datetime import datetime, timezone as dt_timezone
+from functools import lru_cache
+
+import jwt
+
+from asgiref.sync import sync_to_async
 from ninja import Router
-from ninja.security import HttpBasicAuth
-from django.contrib.auth import authenticate
+from ninja.errors import AuthenticationError, HttpError
+from ninja.security import HttpBasicAuth, HttpBearer
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.core.cache import cache
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import Permission
+from django.db.models import Q
+from cryptography.hazmat.primitives import serialization
+from jwt import InvalidTokenError, PyJWTError
+from ninja_apikey.models import APIKey
 from ninja_apikey.security import APIKeyAuth
+from ninja_simple_jwt.auth.views.api import mobile_sign_in, web_sign_in, web_sign_out
+from ninja_simple_jwt.auth.views.schemas import (
+    Empty, MobileSignInResponse, MobileTokenRefreshRequest, MobileTokenRefreshResponse, WebSignInResponse,
+)
+from ninja_simple_jwt.jwt.key_retrieval import InMemoryJwtKeyPair
+from ninja_simple_jwt.jwt.token_operations import TokenTypes, decode_token, get_access_token_for_user
+from ninja_simple_jwt.settings import ninja_simple_jwt_settings
+from django.utils import timezone
+
+from pokemon.cache import MISSING, api_key_cache, credentials_cache
+from pokemon.revocation import revoked_tokens
+from pokemon.usage import api_key_usage
+
+User = get_user_model()
 
 # Création d'un routeur Ninja sans authentification globale.
 # Chaque route peut définir son propre système d'authentification.
@@ -12,12 +43,310 @@ class FakeBasicAuth(HttpBasicAuth):
     Classe d'authentification basique personnalisée.
     Vérifie les identifiants (username/password) dans la base de données Django.
     Si les identifiants sont valides, retourne l'utilisateur ; sinon, retourne None.
+    - Le hash du mot de passe (PBKDF2, volontairement lent) n'est calculé qu'une fois : l'id de
+      l'utilisateur est gardé dans credentials_cache sous le HMAC des identifiants (voir pokemon/cache.py).
+      Le cache est vidé quand le mot de passe d'un utilisateur change. Les échecs ne sont pas gardés :
+      un compte créé ou réactivé est accepté aussitôt (les essais répétés sont limités par LoginThrottle).
+    - Si BASIC_AUTH_THROTTLE est défini, les échecs sont comptés par IP et username (voir LoginThrottle).
     """
     def authenticate(self, request, username, password):
+        throttle = LoginThrottle.from_settings(request, username)
+        if throttle is not None:
+            throttle.check()
+        key = key_digest(f"{username}\0{password}")
+        user_id = credentials_cache.get(key)
+        if user_id is MISSING:
+            user_id = self.verify(username, password)
+            if user_id is not None:
+                credentials_cache.set(key, user_id)
+        # L'utilisateur est relu par sa clé primaire (requête rapide) : un compte désactivé est refusé aussitôt.
+        user = User.objects.filter(pk=user_id, is_active=True).first() if user_id is not None else None
+        if throttle is not None:
+            throttle.record(success=user is not None)
+        return user
+
+    @staticmethod
+    def verify(username, password):
         user = authenticate(username=username, password=password)
-        if user is not None:
-            return user
-        return None
+        return user.pk if user is not None else None
+
+class LoginThrottle:
+    """
+    Limite les tentatives de connexion en échec par IP et username.
+    Après FAILURES échecs en WINDOW secondes, les tentatives suivantes sont refusées (429)
+    avant tout calcul de hash. Les compteurs sont dans le cache Django "default" ;
+    une connexion réussie remet le compteur à zéro.
+    """
+    def __init__(self, key, failures, window):
+        self.key = key
+        self.failures = failures
+        self.window = window
+
+    @classmethod
+    def from_settings(cls, request, username):
+        config = getattr(settings, "BASIC_AUTH_THROTTLE", None)
+        if not config:
+            return None
+        digest = key_digest(f"{request.META.get('REMOTE_ADDR', '')}\0{username}")
+        return cls(f"login-failures:{digest}", config["FAILURES"], config["WINDOW"])
+
+    def check(self):
+        if cache.get(self.key, 0) >= self.failures:
+            raise HttpError(429, "Too many failed login attempts, try again later.")
+
+    def record(self, success):
+        if success:
+            cache.delete(self.key)
+        elif not cache.add(self.key, 1, timeout=self.window):
+            try:
+                cache.incr(self.key)
+            except ValueError:
+                # The counter expired between add and incr.
+                cache.add(self.key, 1, timeout=self.window)
+
+def key_digest(secret: str) -> str:
+    """HMAC (avec SECRET_KEY) d'un secret (clé API, identifiants), utilisé comme clé de cache."""
+    return hmac.new(settings.SECRET_KEY.encode(), secret.encode(), hashlib.sha256).hexdigest()
+
+class CachedAPIKeyAuth(APIKeyAuth):
+    """
+    Authentification par clé API (header X-API-KEY) avec cache des clés vérifiées.
+    APIKeyAuth lit la clé en base et vérifie son hash (volontairement lent) à chaque requête ;
+    ici le résultat (id, username, statut et permissions de l'utilisateur, date d'expiration)
+    est gardé dans api_key_cache (voir pokemon/cache.py).
+    - La clé de cache est "<prefix>:<HMAC du secret>" : le secret n'est jamais comparé caractère
+      par caractère, et une requête avec un mauvais secret ne réutilise pas le résultat d'une bonne.
+    - Le cache ne contient pas d'instance de User : chaque requête reçoit son propre TokenUser,
+      construit à partir de l'entrée.
+    - Le cache est vidé quand une clé est modifiée ou supprimée (révocation), et quand le statut ou les
+      permissions d'un utilisateur changent (voir pokemon/signals.py) ; l'expiration est revérifiée à chaque requête.
+    - La date de dernière utilisation est enregistrée par lots (voir pokemon/usage.py).
+    """
+    def authenticate(self, request, key):
+        parts = self.split_key(key)
+        if parts is None:
+            return False
+        prefix, secret = parts
+        entry = api_key_cache.get_or_set(f"{prefix}:{key_digest(secret)}", lambda: self.verify(prefix, secret))
+        return self.accept(request, prefix, entry)
+
+    @staticmethod
+    def split_key(key):
+        if not key or "." not in key:
+            return None
+        return key.split(".", 1)
+
+    @staticmethod
+    def is_valid(persistent_key, valid):
+        return persistent_key is not None and valid and persistent_key.is_valid and persistent_key.user.is_active
+
+    @staticmethod
+    def make_entry(persistent_key, permissions):
+        """Résultat mis en cache pour une clé valide : (claims de l'utilisateur, expiration)."""
+        user = persistent_key.user
+        claims = {
+            "user_id": user.pk,
+            "username": user.get_username(),
+            "is_active": user.is_active,
+            "is_staff": user.is_staff,
+            "is_superuser": user.is_superuser,
+            "permissions": sorted(f"{app_label}.{codename}" for app_label, codename in permissions),
+        }
+        return (claims, persistent_key.expires_at)
+
+    def verify(self, prefix, secret):
+        persistent_key = APIKey.objects.select_related("user").filter(prefix=prefix).first()
+        valid = persistent_key is not None and check_password(secret, persistent_key.hashed_key)
+        if not self.is_valid(persistent_key, valid):
+            return None
+        return self.make_entry(persistent_key, list(permissions_query(persistent_key.user)))
+
+    def accept(self, request, prefix, entry):
+        if entry is None:
+            return False
+        claims, expires_at = entry
+        if expires_at is not None and expires_at < timezone.now():
+            return False
+        api_key_usage.record(prefix)
+        user = request.user = TokenUser(claims)
+        return user
+
+class AsyncAPIKeyAuth(CachedAPIKeyAuth):
+    """
+    Version asynchrone de CachedAPIKeyAuth, pour les routes async (voir api/asynchronous.py).
+    En cas d'absence du cache, la clé est lue avec l'ORM async ; la vérification du hash (coûteuse en CPU)
+    est faite dans un thread pour ne pas bloquer la boucle d'évènements.
+    À n'utiliser que sur des routes async : une route sync ne peut pas attendre la coroutine.
+    """
+    async def authenticate(self, request, key):
+        parts = self.split_key(key)
+        if parts is None:
+            return False
+        prefix, secret = parts
+
+        async def verify():
+            persistent_key = await APIKey.objects.select_related("user").filter(prefix=prefix).afirst()
+            valid = persistent_key is not None and await sync_to_async(check_password, thread_sensitive=False)(
+                secret, persistent_key.hashed_key
+            )
+            if not self.is_valid(persistent_key, valid):
+                return None
+            return self.make_entry(persistent_key, [permission async for permission in permissions_query(persistent_key.user)])
+
+        entry = await api_key_cache.aget_or_set(f"{prefix}:{key_digest(secret)}", verify)
+        return self.accept(request, prefix, entry)
+
+def permissions_query(user):
+    """Permissions (app_label, codename) de l'utilisateur, directes ou par ses groupes, en une requête."""
+    return (
+        Permission.objects.filter(Q(user=user) | Q(group__user=user))
+        .values_list("content_type__app_label", "codename")
+        .distinct()
+    )
+
+@lru_cache(maxsize=4)
+def load_public_key(pem):
+    """Clé publique RSA chargée une seule fois (PyJWT relit le PEM à chaque décodage sinon)."""
+    return serialization.load_pem_public_key(pem)
+
+def decode_access_token(token):
+    """
+    Vérifie la signature, l'expiration et le type d'un token d'accès et retourne ses claims.
+
+    Raises:
+        PyJWTError: Si le token est invalide.
+    """
+    claims = jwt.decode(
+        token, load_public_key(InMemoryJwtKeyPair.public_key), algorithms=["RS256"],
+        options={"require": ["exp", "jti", "token_type"]},
+    )
+    if claims["token_type"] != TokenTypes.ACCESS:
+        raise InvalidTokenError("Incorrect token type in JWT.")
+    return claims
+
+class TokenUser:
+    """
+    Utilisateur léger construit à partir des claims d'un JWT (ou d'une entrée du cache des clés API),
+    sans requête en base.
+    Expose ce dont les vues ont besoin : id, username, statut et permissions (claim "permissions",
+    voir NINJA_SIMPLE_JWT dans project/settings.py).
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, claims):
+        self.claims = claims
+        self.id = self.pk = claims.get("user_id")
+        self.username = claims.get("username", "")
+        self.is_active = claims.get("is_active", True)
+        self.is_staff = claims.get("is_staff", False)
+        self.is_superuser = claims.get("is_superuser", False)
+        self.permissions = frozenset(claims.get("permissions") or ())
+
+    def __str__(self):
+        return self.username
+
+    def get_all_permissions(self, obj=None):
+        return set(self.permissions)
+
+    def has_perm(self, perm, obj=None):
+        return self.is_active and (self.is_superuser or perm in self.permissions)
+
+    def has_perms(self, perm_list, obj=None):
+        return all(self.has_perm(perm, obj) for perm in perm_list)
+
+class StatelessJwtAuth(HttpBearer):
+    """
+    Authentification JWT (token Bearer) sans lecture de l'utilisateur en base.
+    HttpJwtAuth copie les claims sur request.user, qui est évalué (session, utilisateur) à chaque requête ;
+    ici request.user est un TokenUser construit à partir des seuls claims.
+    La signature est vérifiée avec la clé publique en cache ; les tokens révoqués (déconnexion)
+    sont refusés grâce à la liste en mémoire de pokemon/revocation.py.
+    Limite : le statut et les permissions sont ceux de l'émission du token. Un utilisateur désactivé
+    ou privé d'une permission garde son accès jusqu'à l'expiration du token (JWT_ACCESS_TOKEN_LIFETIME,
+    15 minutes par défaut) ; les claims sont relus en base à chaque rafraîchissement (voir refresh_access_token).
+    Pour couper l'accès aussitôt, révoquer le token.
+    """
+    def authenticate(self, request, token):
+        claims = self.decode(token)
+        if revoked_tokens.is_revoked(claims["jti"]):
+            raise AuthenticationError(message="Token has been revoked.")
+        return self.accept(request, claims)
+
+    @staticmethod
+    def decode(token):
+        try:
+            return decode_access_token(token)
+        except PyJWTError as e:
+            raise AuthenticationError(message=str(e))
+
+    @staticmethod
+    def accept(request, claims):
+        user = TokenUser(claims)
+        if not user.is_active:
+            return False
+        request.user = user
+        return user
+
+class AsyncStatelessJwtAuth(StatelessJwtAuth):
+    """Version asynchrone de StatelessJwtAuth, pour les routes async (voir api/asynchronous.py)."""
+    async def authenticate(self, request, token):
+        claims = self.decode(token)
+        if await revoked_tokens.ais_revoked(claims["jti"]):
+            raise AuthenticationError(message="Token has been revoked.")
+        return self.accept(request, claims)
+
+def refresh_access_token(refresh_token):
+    """
+    Nouveau token d'accès pour un token de rafraîchissement, avec les claims de l'utilisateur relus en base.
+    ninja_simple_jwt recopie les claims du token de rafraîchissement (valable 30 jours par défaut) :
+    un utilisateur désactivé ou privé d'une permission garderait son accès jusqu'à son expiration.
+
+    Raises:
+        AuthenticationError: Si le token est invalide, ou l'utilisateur supprimé ou désactivé.
+    """
+    try:
+        claims = decode_token(refresh_token, token_type=TokenTypes.REFRESH, verify=True)
+    except PyJWTError:
+        raise AuthenticationError()
+    user = User.objects.filter(pk=claims.get("user_id"), is_active=True).first()
+    if user is None:
+        raise AuthenticationError()
+    access_token, _ = get_access_token_for_user(user)
+    return access_token
+
+# Routeurs JWT : connexion et déconnexion de ninja_simple_jwt, rafraîchissement par refresh_access_token.
+# Ils remplacent mobile_auth_router et web_auth_router (voir api/ninja.py).
+mobile_jwt_router = Router()
+mobile_jwt_router.add_api_operation("/sign-in", ["POST"], mobile_sign_in, response=MobileSignInResponse, url_name="mobile_signin")
+web_jwt_router = Router()
+web_jwt_router.add_api_operation("/sign-in", ["POST"], web_sign_in, response=WebSignInResponse, url_name="web_signin")
+web_jwt_router.add_api_operation("/sign-out", ["POST"], web_sign_out, response={204: Empty}, url_name="web_sign_out")
+
+@mobile_jwt_router.post("/token-refresh", response=MobileTokenRefreshResponse, url_name="mobile_token_refresh")
+# Endpoint de rafraîchissement du token d'accès (client mobile).
+# Système de routing : l'URL attend /api/auth/mobile/token-refresh (voir api/ninja.py).
+# Pour tester dans Postman :
+# - Méthode : POST
+# - URL : http://127.0.0.1:8000/api/auth/mobile/token-refresh
+# - Body (JSON) : {"refresh": "<votre_token_de_rafraîchissement>"}
+def mobile_token_refresh(request, payload: MobileTokenRefreshRequest):
+    """Retourne un nouveau token d'accès, avec le statut et les permissions actuels de l'utilisateur."""
+    return {"access": refresh_access_token(payload.refresh)}
+
+@web_jwt_router.post("/token-refresh", response=WebSignInResponse, url_name="web_token_refresh")
+# Endpoint de rafraîchissement du token d'accès (client web, token de rafraîchissement en cookie).
+# Système de routing : l'URL attend /api/auth/web/token-refresh (voir api/ninja.py).
+# Pour tester dans Postman :
+# - Méthode : POST
+# - URL : http://127.0.0.1:8000/api/auth/web/token-refresh
+# - Cookie : refresh=<votre_token_de_rafraîchissement> (posé par /api/auth/web/sign-in)
+def web_token_refresh(request):
+    """Retourne un nouveau token d'accès, avec le statut et les permissions actuels de l'utilisateur."""
+    refresh_token = request.COOKIES.get(ninja_simple_jwt_settings.JWT_REFRESH_COOKIE_NAME)
+    if refresh_token is None:
+        raise AuthenticationError()
+    return {"access": refresh_access_token(refresh_token)}
 
 @router.get("basic", auth=FakeBasicAuth())
 # Endpoint protégé par authentification Basic.
@@ -30,7 +359,7 @@ def basic_auth_protection(request):
     """Vérifie si l'utilisateur est authentifié via Basic Auth."""
     return {"message": f"Your are authenticated as {request.auth}"}
 
-@router.get("key", auth=APIKeyAuth())
+@router.get("key", auth=CachedAPIKeyAuth())
 # Endpoint protégé par authentification par clé API.
 # Système de routing : l'URL attend /api/auth/key (voir api/ninja.py).
 # Pour tester dans Postman :
@@ -44,6 +373,19 @@ def api_key_protection(request):
     """
     return {"message": f"Your are authenticated with API key {request.auth}"}
 
+@router.post("logout", auth=StatelessJwtAuth())
+# Endpoint de déconnexion JWT : le token d'accès utilisé est révoqué jusqu'à son expiration.
+# Système de routing : l'URL attend /api/auth/logout (voir api/ninja.py).
+# Pour tester dans Postman :
+# - Méthode : POST
+# - URL : http://127.0.0.1:8000/api/auth/logout
+# - Header : Authorization : Bearer <votre_token_jwt>
+def jwt_logout(request):
+    """Révoque le token d'accès de la requête."""
+    claims = request.auth.claims
+    revoked_tokens.revoke(claims["jti"], datetime.fromtimestamp(claims["exp"], tz=dt_timezone.utc))
+    return {"message": "Token revoked"}
+
 # Explications générales :
 # - Le système de routing de Django Ninja permet de définir des routes accessibles via /api/auth/basic et /api/auth/key.
 # - Chaque route peut avoir son propre système d'authentification (ici Basic ou API Key).
@@ -0,0 +1,250 @@
+"""
+Bulk writes for the content pipeline.
+
+The body is a JSON array, or NDJSON (one JSON object per line, read from the
+request stream without loading the body at once). Items are validated one by
+one; foreign keys are resolved with one IN query per model; the valid items
+are written with bulk_create/bulk_update in a single transaction. Every item
+gets its own status, so one bad or duplicate item does not abort the batch.
+
+Bulk writes bypass the model signals: the change counters, the reference
+cache and the response cache are bumped explicitly.
+"""
+
+import json
+from typing import Any, Iterable, Literal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as ModelValidationError
+from django.db import transaction
+from django.http import HttpRequest
+from ninja import Schema
+from ninja.errors import HttpError
+from pydantic import ValidationError
+
+from api.schemas import PokemonCreateSchema, TypeCreationSchema
+from pokemon.cache import reference_cache, response_cache
+from pokemon.models import ChangeCounter, Generation, Pokemon, Type
+from pokemon.readmodel import refresh_documents, refresh_related
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+OnConflict = Literal["skip", "update"]
+
+
+class BulkItemResultSchema(Schema):
+    """Outcome of one item: created, updated, skipped (already exists), duplicate (earlier in the batch) or invalid."""
+    index: int
+    status: Literal["created", "updated", "skipped", "duplicate", "invalid"]
+    id: int | None = None
+    errors: dict[str, list[str]] | None = None
+
+
+class BulkResultSchema(Schema):
+    """Counts per status and the per-item results, in the order of the body."""
+    counts: dict[str, int]
+    items: list[BulkItemResultSchema]
+
+
+def openapi_body(schema: type[Schema]) -> dict:
+    """openapi_extra documenting a body read by read_items (the route declares no body parameter)."""
+    array = {"type": "array", "items": schema.model_json_schema()}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": array},
+                "application/x-ndjson": {"schema": schema.model_json_schema()},
+            },
+        }
+    }
+
+
+def read_items(request: HttpRequest) -> list[Any]:
+    """
+    Parses the body: NDJSON when the Content-Type says so, a JSON array otherwise.
+
+    Raises:
+        HttpError: 400 on malformed JSON, 413 above settings.BULK_MAX_ITEMS items.
+    """
+    limit = getattr(settings, "BULK_MAX_ITEMS", 10000)
+    content_type = request.content_type or ""
+    if content_type in NDJSON_CONTENT_TYPES:
+        items = []
+        for number, line in enumerate(request, start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as error:
+                raise HttpError(400, f"Line {number}: invalid JSON ({error}).")
+            if len(items) > limit:
+                raise HttpError(413, f"A bulk request accepts at most {limit} items.")
+        return items
+    try:
+        items = json.loads(request.body or b"null")
+    except ValueError as error:
+        raise HttpError(400, f"Invalid JSON ({error}).")
+    if not isinstance(items, list):
+        raise HttpError(400, "The body must be a JSON array (or NDJSON).")
+    if len(items) > limit:
+        raise HttpError(413, f"A bulk request accepts at most {limit} items.")
+    return items
+
+
+def validate_items(items: Iterable[Any], schema: type[Schema], results: list[dict]) -> list[tuple[int, Schema]]:
+    """Validates each item with the schema; the invalid ones get their result, the others are returned."""
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as error:
+            errors: dict[str, list[str]] = {}
+            for detail in error.errors():
+                field = ".".join(str(part) for part in detail["loc"]) or "__all__"
+                errors.setdefault(field, []).append(detail["msg"])
+            results[index] = {"index": index, "status": "invalid", "errors": errors}
+    return valid
+
+
+def field_errors(instance, fields: list[str]) -> dict[str, list[str]]:
+    """
+    Runs the validators of the model fields (lengths, integer ranges), which the
+    database would otherwise enforce by aborting the whole transaction.
+    """
+    errors = {}
+    for name in fields:
+        field = instance._meta.get_field(name)
+        try:
+            field.run_validators(getattr(instance, field.attname))
+        except ModelValidationError as error:
+            errors[name] = error.messages
+    return errors
+
+
+def summarize(results: list[dict]) -> dict:
+    counts = {status: 0 for status in ["created", "updated", "skipped", "duplicate", "invalid"]}
+    for result in results:
+        counts[result["status"]] += 1
+    return {"counts": counts, "items": results}
+
+
+def bulk_write_pokemons(items: list[Any], on_conflict: OnConflict = "skip") -> dict:
+    """
+    Creates (and with on_conflict="update", updates) pokemons by (number, name, version).
+
+    Costs one query for the types, one for the generations, one for the
+    existing pokemons, then the batched writes.
+    """
+    results: list[dict] = [None] * len(items)
+    valid = validate_items(items, PokemonCreateSchema, results)
+
+    type_names = {name for _, data in valid for name in (data.type1_name, data.type2_name) if name is not None}
+    types = dict(Type.objects.filter(name__in=type_names).values_list("name", "id"))
+    generations = dict(
+        Generation.objects.filter(number__in={data.generation_number for _, data in valid}).values_list("number", "id")
+    )
+    existing = {
+        (number, name, version): pk
+        for pk, number, name, version in Pokemon.objects.filter(
+            number__in={data.number for _, data in valid}
+        ).values_list("id", "number", "name", "version")
+    }
+
+    to_create: list[tuple[int, Pokemon]] = []
+    to_update: list[tuple[int, Pokemon]] = []
+    seen: set[tuple] = set()
+    stat_fields = [field for field in PokemonCreateSchema.model_fields if field not in ("type1_name", "type2_name", "generation_number")]
+    for index, data in valid:
+        errors = {}
+        for field, name in [("type1_name", data.type1_name), ("type2_name", data.type2_name)]:
+            if name is not None and name not in types:
+                errors[field] = ["Type does not exist."]
+        if data.generation_number not in generations:
+            errors["generation_number"] = ["Generation does not exist."]
+        instance = Pokemon(
+            **{field: getattr(data, field) for field in stat_fields},
+            type1_id=types.get(data.type1_name),
+            type2_id=types.get(data.type2_name) if data.type2_name is not None else None,
+            generation_id=generations.get(data.generation_number),
+        )
+        errors.update(field_errors(instance, stat_fields))
+        if errors:
+            results[index] = {"index": index, "status": "invalid", "errors": errors}
+            continue
+
+        key = (instance.number, instance.name, instance.version)
+        if key in seen:
+            results[index] = {"index": index, "status": "duplicate"}
+            continue
+        seen.add(key)
+        if key not in existing:
+            to_create.append((index, instance))
+        elif on_conflict == "update":
+            instance.pk = existing[key]
+            to_update.append((index, instance))
+        else:
+            results[index] = {"index": index, "status": "skipped", "id": existing[key]}
+
+    batch_size = getattr(settings, "BULK_BATCH_SIZE", 500)
+    with transaction.atomic():
+        Pokemon.objects.bulk_create([instance for _, instance in to_create], batch_size=batch_size)
+        Pokemon.objects.bulk_update(
+            [instance for _, instance in to_update],
+            [field for field in stat_fields if field not in ("number", "name", "version")] + ["type1", "type2", "generation"],
+            batch_size=batch_size,
+        )
+        if to_create or to_update:
+            ChangeCounter.bump(Pokemon)
+            # bulk_create and bulk_update send no signal: render the stored responses here.
+            refresh_documents(Pokemon.objects.filter(pk__in=[instance.pk for _, instance in to_create + to_update]))
+    if to_create or to_update:
+        response_cache.bump()
+    for status, written in [("created", to_create), ("updated", to_update)]:
+        for index, instance in written:
+            results[index] = {"index": index, "status": status, "id": instance.pk}
+    return summarize(results)
+
+
+def bulk_write_types(items: list[Any], on_conflict: OnConflict = "update") -> dict:
+    """Creates (and with on_conflict="update", updates the description of) types by name."""
+    results: list[dict] = [None] * len(items)
+    valid = validate_items(items, TypeCreationSchema, results)
+    existing = {
+        type.name: type for type in Type.objects.filter(name__in={data.name for _, data in valid})
+    }
+
+    to_create: list[tuple[int, Type]] = []
+    to_update: list[tuple[int, Type]] = []
+    seen: set[str] = set()
+    for index, data in valid:
+        instance = Type(name=data.name, description=data.description or "")
+        errors = field_errors(instance, ["name", "description"])
+        if errors:
+            results[index] = {"index": index, "status": "invalid", "errors": errors}
+            continue
+        if data.name in seen:
+            results[index] = {"index": index, "status": "duplicate"}
+            continue
+        seen.add(data.name)
+        if data.name not in existing:
+            to_create.append((index, instance))
+        elif on_conflict == "update":
+            instance.pk = existing[data.name].pk
+            to_update.append((index, instance))
+        else:
+            results[index] = {"index": index, "status": "skipped", "id": existing[data.name].pk}
+
+    with transaction.atomic():
+        Type.objects.bulk_create([instance for _, instance in to_create])
+        Type.objects.bulk_update([instance for _, instance in to_update], ["description"])
+        if to_create or to_update:
+            ChangeCounter.bump(Type)
+            refresh_related(types=[instance.pk for _, instance in to_update])
+    if to_create or to_update:
+        reference_cache.bump()
+        response_cache.bump()
+    for status, written in [("created", to_create), ("updated", to_update)]:
+        for index, instance in written:
+            results[index] = {"index": index, "status": status, "id": instance.pk}
+    return summarize(results)
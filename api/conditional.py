@@ -0,0 +1,115 @@
+"""
+HTTP conditional requests (ETag / Last-Modified / 304) for read endpoints.
+
+The validators are derived from the ChangeCounter rows of the tables a response
+is built from, read in one query: the response body is never hashed, and a
+matching If-None-Match (or If-Modified-Since) returns 304 before the handler
+runs, so neither the main query nor the serialization happen.
+"""
+
+import hashlib
+import inspect
+from functools import wraps
+from typing import Any, Callable
+
+from django.http import HttpRequest, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from ninja.utils import contribute_operation_callback
+
+from pokemon.models import ChangeCounter
+
+
+def make_validators(request: HttpRequest, tables: list[str], counters: list[tuple]) -> tuple[str, int | None]:
+    """Returns the strong ETag and the Last-Modified timestamp of the requested URL."""
+    versions = dict.fromkeys(tables, (0, None))
+    versions.update((table, (version, updated_at)) for table, version, updated_at in counters)
+    key = ",".join(f"{table}:{versions[table][0]}" for table in tables)
+    digest = hashlib.sha1(f"{request.get_full_path()}|{key}".encode()).hexdigest()
+    dates = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+    last_modified = int(max(dates).timestamp()) if dates else None
+    return f'"{digest}"', last_modified
+
+
+def counters_query(tables: list[str]):
+    return ChangeCounter.objects.filter(table__in=tables).values_list("table", "version", "updated_at")
+
+
+def get_validators(request: HttpRequest, tables: list[str]) -> tuple[str, int | None]:
+    return make_validators(request, tables, list(counters_query(tables)))
+
+
+async def aget_validators(request: HttpRequest, tables: list[str]) -> tuple[str, int | None]:
+    return make_validators(request, tables, [counter async for counter in counters_query(tables)])
+
+
+def not_modified(request: HttpRequest, etag: str, last_modified: int | None) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        # Weak comparison, as required for If-None-Match (RFC 9110, 13.1.2). "*" is not
+        # honoured: the check runs before the handler, which may still answer 404.
+        etags = [tag.removeprefix("W/") for tag in parse_etags(if_none_match)]
+        return etag in etags
+    if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return if_modified_since is not None and last_modified is not None and last_modified <= if_modified_since
+
+
+def conditional(*models) -> Callable:
+    """
+    Adds ETag/Last-Modified headers to a GET route and answers 304 when they match.
+
+    The models are those the response is built from (including nested relations).
+    To use below the router decorator, after authentication:
+
+        @router.get("view/{number}", response=PokemonSchema)
+        @conditional(Pokemon, Type, Generation)
+        def pokemon_view(request, number: int): ...
+    """
+    tables = [model._meta.db_table for model in models]
+
+    def decorator(view_func: Callable) -> Callable:
+        def check(request: HttpRequest, validators: tuple[str, int | None]) -> HttpResponseNotModified | None:
+            etag, last_modified = validators
+            headers = {"ETag": etag}
+            if last_modified is not None:
+                headers["Last-Modified"] = http_date(last_modified)
+            if not_modified(request, etag, last_modified):
+                return HttpResponseNotModified(headers=headers)
+            request.conditional_headers = headers
+            return None
+
+        if inspect.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def view_with_validators(request: HttpRequest, *args: Any, **kwargs: Any) -> Any:
+                response = check(request, await aget_validators(request, tables))
+                if response is not None:
+                    return response
+                return await view_func(request, *args, **kwargs)
+        else:
+            @wraps(view_func)
+            def view_with_validators(request: HttpRequest, *args: Any, **kwargs: Any) -> Any:
+                response = check(request, get_validators(request, tables))
+                if response is not None:
+                    return response
+                return view_func(request, *args, **kwargs)
+
+        def set_headers(request: HttpRequest, response: Any) -> Any:
+            # Only successful responses are cacheable (not 404 or auth errors).
+            if response.status_code == 200:
+                for header, value in getattr(request, "conditional_headers", {}).items():
+                    response[header] = value
+            return response
+
+        def add_headers(operation) -> None:
+            run = operation.run
+            if inspect.iscoroutinefunction(run):
+                async def run_with_headers(request: HttpRequest, **kw: Any) -> Any:
+                    return set_headers(request, await run(request, **kw))
+            else:
+                def run_with_headers(request: HttpRequest, **kw: Any) -> Any:
+                    return set_headers(request, run(request, **kw))
+            operation.run = run_with_headers
+
+        contribute_operation_callback(view_with_validators, add_headers)
+        return view_with_validators
+
+    return decorator
@@ -0,0 +1,103 @@
+"""
+DataLoader-style batching of the lookups of a request.
+
+A handler (or the helpers it calls) asks a DataLoader for keys one at a time
+with `load`, which returns a Pending handle without querying; the first
+`get()` of a pending key loads every key queued so far with a single call to
+the batch function. Results are cached for the rest of the request, so the
+same key is never loaded twice.
+
+    loader = request_loader(request, "pokemon_documents", documents_by_key)
+    team = [loader.load(key) for key in keys]   # nothing queried yet
+    documents = [pending.get() for pending in team]   # one query
+
+request_loader keeps one loader per name on the request: every helper of the
+request shares its batches and its cache, and nothing outlives the request
+(no invalidation needed).
+"""
+
+from typing import Callable, Generic, Hashable, Iterable, Mapping, TypeVar
+
+from django.http import HttpRequest
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class Pending(Generic[K, V]):
+    """A key queued in a DataLoader; `get()` returns its value, loading the queued batch if needed."""
+
+    __slots__ = ("loader", "key")
+
+    def __init__(self, loader: "DataLoader[K, V]", key: K):
+        self.loader = loader
+        self.key = key
+
+    def get(self) -> V | None:
+        return self.loader.get(self.key)
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Batches and caches the loads of keys.
+
+    Args:
+        batch_load: Loads a list of distinct keys, returns {key: value} for the keys found.
+        max_batch_size: Keys per call of batch_load (None: all the queued keys at once).
+        default: Value of the keys missing from the result of batch_load.
+    """
+
+    def __init__(self, batch_load: Callable[[list[K]], Mapping[K, V]], max_batch_size: int | None = None, default: V | None = None):
+        self.batch_load = batch_load
+        self.max_batch_size = max_batch_size
+        self.default = default
+        self._cache: dict[K, V | None] = {}
+        # Keys waiting for the next dispatch, in the order of their first load (a dict keeps it).
+        self._queue: dict[K, None] = {}
+
+    def load(self, key: K) -> Pending[K, V]:
+        if key not in self._cache:
+            self._queue[key] = None
+        return Pending(self, key)
+
+    def load_many(self, keys: Iterable[K]) -> list[V | None]:
+        """The values of `keys`, in order, loaded together."""
+        pending = [self.load(key) for key in keys]
+        return [item.get() for item in pending]
+
+    def get(self, key: K) -> V | None:
+        if key not in self._cache:
+            self._queue[key] = None
+            self.dispatch()
+        return self._cache[key]
+
+    def dispatch(self) -> None:
+        """Loads every queued key."""
+        keys, self._queue = list(self._queue), {}
+        size = self.max_batch_size or len(keys) or 1
+        for start in range(0, len(keys), size):
+            batch = keys[start:start + size]
+            values = self.batch_load(batch)
+            for key in batch:
+                self._cache[key] = values.get(key, self.default)
+
+    def prime(self, key: K, value: V) -> None:
+        """Caches a value already known (e.g. read by another query of the request)."""
+        self._cache[key] = value
+        self._queue.pop(key, None)
+
+    def clear(self, key: K | None = None) -> None:
+        """Forgets a key (all keys by default), e.g. after the handler changed it."""
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+
+def request_loader(request: HttpRequest, name: str, batch_load: Callable[[list[K]], Mapping[K, V]], **options) -> DataLoader[K, V]:
+    """The DataLoader `name` of the request, created on first use with `batch_load` and `options`."""
+    loaders = request.__dict__.setdefault("loaders", {})
+    loader = loaders.get(name)
+    if loader is None:
+        loader = loaders[name] = DataLoader(batch_load, **options)
+    return loader
@@ -1,9 +1,12 @@
 from ninja import NinjaAPI
-from ninja_simple_jwt.auth.views.api import mobile_auth_router, web_auth_router
+from api.renderers import renderer
+from project.metrics import time_serialization
+from project.querydetector import watch_api
 
 # Création de l'instance principale de l'API Ninja.
 # Cette instance gère toutes les routes de l'API et génère la documentation interactive.
-api = NinjaAPI(title="Pokemon API", version="1.0")
+# Les réponses sont encodées avec orjson s'il est installé, json sinon (voir api/renderers.py).
+api = NinjaAPI(title="Pokemon API", version="1.0", renderer=renderer)
 
 # Ajout des sous-routes à l'API.
 # Chaque sous-route correspond à un module qui gère un ensemble d'endpoints spécifiques.
@@ -16,13 +19,23 @@ api.add_router("/querysets/", "api.querysets.router")   # Endpoints pour manipul
 # disponible sur http://localhost:8000/api/querysets/
 api.add_router("/type/", "api.type.router")             # Endpoints pour les types de Pokémon (création, édition, etc.)
 # disponible sur http://localhost:8000/api/type/
+api.add_router("/analytics/", "api.analytics.router")   # Endpoints de statistiques (top-k, percentiles, plus proches voisins)
+# disponible sur http://localhost:8000/api/analytics/
+api.add_router("/async/", "api.asynchronous.router")   # Versions async des routes de lecture (pour un serveur ASGI)
+# disponible sur http://localhost:8000/api/async/
 api.add_router("/auth/", "api.authentification.router")   # Endpoints pour l'authentification (clé API, basic auth)
 # disponible sur http://localhost:8000/api/auth/
-api.add_router("/auth/mobile/", mobile_auth_router)     # Endpoints pour l'authentification JWT mobile
-# disponible sur http://localhost:8000/api/auth/mobile/
-api.add_router("/auth/web/", web_auth_router)           # Endpoints pour l'authentification JWT web
+api.add_router("/auth/mobile/", "api.authentification.mobile_jwt_router")   # Endpoints pour l'authentification JWT mobile
+# disponible sur http://localhost:8000/api/auth/mobile/ (le rafraîchissement relit l'utilisateur en base)
+api.add_router("/auth/web/", "api.authentification.web_jwt_router")         # Endpoints pour l'authentification JWT web
 # disponible sur http://localhost:8000/api/auth/web/
 
+# Le détecteur de N+1 (project/querydetector.py) nomme le handler de chaque route dans ses rapports,
+# sans décorateur à ajouter sur les handlers.
+watch_api(api)
+# Les métriques (project/metrics.py) comptent la validation par le schéma de réponse dans le temps de sérialisation.
+time_serialization(api)
+
 # Grâce à cette organisation, chaque fonctionnalité de l'API est séparée dans un fichier dédié,
 # ce qui rend le projet plus clair, évolutif et facile à maintenir.
 # La documentation interactive de l'API est accessible à l'URL /api/docs
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""Pagination classes for the API list endpoints."""
+
+from typing import Any, List, Optional
+
+from django.core import signing
+from django.db.models import Q, QuerySet
+from django.http import HttpRequest
+from ninja import Field, Schema
+from ninja.conf import settings
+from ninja.errors import HttpError
+from ninja.pagination import AsyncPaginationBase
+
+
+class CursorPagination(AsyncPaginationBase):
+    """
+    Keyset (cursor) pagination, an alternative to PageNumberPagination.
+
+    Pages are read with `WHERE (number, id) > (last number, last id) ORDER BY number, id LIMIT n`
+    instead of `COUNT(*)` + `OFFSET`, so every page costs the same whatever its depth.
+    The ordering columns must be unique together (hence `id` as the last one).
+
+    Cursors are opaque: the ordering values of the boundary item, signed with
+    django.core.signing so clients cannot forge them. The total is only
+    computed when the client asks for it (`?total=true`).
+
+    Usage:
+        @router.get("/items", response=list[ItemSchema])
+        @paginate(CursorPagination, ordering=("number", "id"))
+        def list_items(request): ...
+    """
+
+    salt = "api.pagination.CursorPagination"
+
+    class Input(Schema):
+        cursor: Optional[str] = None
+        page_size: Optional[int] = Field(None, ge=1)
+        total: bool = False
+
+    class Output(Schema):
+        items: List[Any]
+        next: Optional[str] = None
+        previous: Optional[str] = None
+        count: Optional[int] = None
+
+        def __init_subclass__(cls, **kwargs: Any) -> None:
+            # ninja names every paginated schema "Paged<ItemSchema>": rename ours so the
+            # OpenAPI documentation does not mix it up with PageNumberPagination's.
+            super().__init_subclass__(**kwargs)
+            cls.__name__ = cls.__qualname__ = f"Cursor{cls.__name__}"
+
+    def __init__(
+        self,
+        ordering: tuple[str, ...] = ("number", "id"),
+        page_size: int = settings.PAGINATION_PER_PAGE,
+        max_page_size: int = settings.PAGINATION_MAX_PER_PAGE_SIZE,
+        **kwargs: Any,
+    ) -> None:
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        super().__init__(**kwargs)
+
+    def encode_cursor(self, item: Any, reverse: bool) -> str:
+        values = [item[field] if isinstance(item, dict) else getattr(item, field) for field in self.ordering]
+        return signing.dumps({"v": values, "r": reverse}, salt=self.salt, compress=True)
+
+    def decode_cursor(self, cursor: str) -> tuple[list, bool]:
+        try:
+            data = signing.loads(cursor, salt=self.salt)
+            values, reverse = data["v"], data["r"]
+        except (signing.BadSignature, KeyError, TypeError):
+            raise HttpError(400, "Invalid cursor")
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise HttpError(400, "Invalid cursor")
+        return values, bool(reverse)
+
+    def keyset_filter(self, values: list, reverse: bool) -> Q:
+        """
+        Builds the row comparison `(f1, f2, ...) > (v1, v2, ...)` (or `<` when reverse).
+
+        Expanded as `f1 > v1 OR (f1 = v1 AND f2 > v2) OR ...` which the database
+        answers with a range scan on an index over the ordering columns.
+        """
+        lookup = "lt" if reverse else "gt"
+        condition = Q()
+        for position, field in enumerate(self.ordering):
+            equal = {name: value for name, value in zip(self.ordering[:position], values)}
+            condition |= Q(**equal, **{f"{field}__{lookup}": values[position]})
+        return condition
+
+    def link(self, request: HttpRequest, cursor: Optional[str]) -> Optional[str]:
+        if cursor is None:
+            return None
+        query = request.GET.copy()
+        query["cursor"] = cursor
+        query.pop("total", None)
+        return request.build_absolute_uri(f"?{query.urlencode()}")
+
+    def page_queryset(self, queryset: QuerySet, pagination: Input) -> tuple[QuerySet, int, bool]:
+        """Returns the query of the page (one extra row tells if there is more), its size and direction."""
+        page_size = min(pagination.page_size or self.page_size, self.max_page_size)
+        reverse = False
+        if pagination.cursor:
+            values, reverse = self.decode_cursor(pagination.cursor)
+            queryset = queryset.filter(self.keyset_filter(values, reverse))
+        ordering = [f"-{field}" if reverse else field for field in self.ordering]
+        return queryset.order_by(*ordering)[: page_size + 1], page_size, reverse
+
+    def build_page(
+        self, request: HttpRequest, items: list, page_size: int, reverse: bool, pagination: Input, count: Optional[int]
+    ) -> dict:
+        has_more = len(items) > page_size
+        items = items[:page_size]
+        next_cursor = previous_cursor = None
+        if reverse:
+            # Read backwards from the cursor: restore the ascending order.
+            items.reverse()
+            if items:
+                next_cursor = self.encode_cursor(items[-1], reverse=False)
+                if has_more:
+                    previous_cursor = self.encode_cursor(items[0], reverse=True)
+        elif items:
+            if has_more:
+                next_cursor = self.encode_cursor(items[-1], reverse=False)
+            if pagination.cursor:
+                previous_cursor = self.encode_cursor(items[0], reverse=True)
+
+        return {
+            "items": items,
+            "next": self.link(request, next_cursor),
+            "previous": self.link(request, previous_cursor),
+            "count": count,
+        }
+
+    def paginate_queryset(self, queryset: QuerySet, pagination: Input, **params: Any) -> Any:
+        page, page_size, reverse = self.page_queryset(queryset, pagination)
+        count = self._items_count(queryset) if pagination.total else None
+        return self.build_page(params["request"], list(page), page_size, reverse, pagination, count)
+
+    async def apaginate_queryset(self, queryset: QuerySet, pagination: Input, **params: Any) -> Any:
+        page, page_size, reverse = self.page_queryset(queryset, pagination)
+        count = await self._aitems_count(queryset) if pagination.total else None
+        items = [item async for item in page]
+        return self.build_page(params["request"], items, page_size, reverse, pagination, count)
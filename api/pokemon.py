@@ -1,19 +1,33 @@
 """API routes for Pokemon instances."""
 
-from typing import Any
-from api.schemas import PokemonSchema, TypeSchema
-from ninja import Router
-from ninja_apikey.security import APIKeyAuth
+import logging
+from typing import Any, Literal, Optional
+from api.bulk import BulkResultSchema, OnConflict, bulk_write_pokemons, openapi_body, read_items
+from api.conditional import conditional
+from api.renderers import stored_response
+from api.response_cache import cache_response
+from api.loaders import request_loader
+from api.schemas import PokemonCreateSchema, PokemonFuzzyMatchSchema, PokemonNameMatchSchema, PokemonSchema, PokemonSearchOrderSchema, PokemonSearchSchema, TypeSchema, ViewManyRequestSchema, ViewManySchema
+from ninja import Query, Router
+from ninja.pagination import paginate, PageNumberPagination
+from api.authentification import CachedAPIKeyAuth, StatelessJwtAuth
 
-from pokemon.models import Type, Pokemon
-from ninja_simple_jwt.auth.ninja_auth import HttpJwtAuth
+from pokemon.models import Generation, Type, Pokemon, PokemonDocument
+from pokemon.readmodel import documents_by_key, dumps, json_array
+from pokemon.fuzzy import THRESHOLD, fuzzy_index
+from pokemon.names import LANGUAGES, name_index
+from project.metrics import log_sampled
+
+logger = logging.getLogger(__name__)
 
 # Création d'un routeur Ninja avec authentification par clé API par défaut.
 # Toutes les routes définies dans ce fichier nécessitent la présence d'un header X-API-KEY valide,
 # sauf si un autre système d'authentification est précisé sur une route spécifique.
-router = Router(auth=APIKeyAuth())
+router = Router(auth=CachedAPIKeyAuth())
 
 @router.get("view/{number}", response={200: PokemonSchema, 404: Any})
+@conditional(Pokemon, Type, Generation)
+@cache_response(ttl=60, stale=30)
 # Endpoint pour récupérer un Pokémon par son numéro et sa version.
 # Système de routing : l'URL attend un paramètre dynamique {number}.
 # Pour tester dans Postman :
@@ -21,17 +35,24 @@ router = Router(auth=APIKeyAuth())
 # - URL : http://127.0.0.1:8000/api/pokemon/view/{number}
 # - Header : X-API-KEY : <votre_clé_api>
 # Remplacez {number} par le numéro du Pokémon recherché.
+# La réponse porte un ETag : renvoyez-le dans le header If-None-Match pour obtenir un 304 sans corps.
+# Les réponses rendues sont mises en cache (header X-Cache : HIT, MISS ou STALE), voir api/response_cache.py.
 def pokemon_view(request, number: int, version: str = ""):
-    """Détaille un Pokémon selon son numéro et sa version."""
-    try:
-        return Pokemon.objects.get(number=number, version=version)
-    except Pokemon.DoesNotExist:
+    """
+    Détaille un Pokémon selon son numéro et sa version.
+    Route très sollicitée : la réponse est lue déjà sérialisée dans le modèle de lecture
+    (pokemon/readmodel.py), par une seule requête sur un index, sans jointure ni schéma.
+    """
+    documents = PokemonDocument.objects.filter(number=number, version=version).values_list("detail", flat=True)[:1]
+    if not documents:
         return (404, {"message": "Pokemon not found"})
+    return stored_response(documents[0])
 
-@router.get("view-all/{number}", response={200: list[PokemonSchema], 404: Any}, auth=HttpJwtAuth())
+@router.get("view-all/{number}", response={200: list[PokemonSchema], 404: Any}, auth=StatelessJwtAuth())
 # Endpoint pour récupérer tous les Pokémon ayant un certain numéro (toutes versions confondues).
 # Système de routing : l'URL attend un paramètre dynamique {number}.
 # Cette route utilise l'authentification JWT (token Bearer) au lieu de la clé API.
+# request.user est construit à partir des claims du token, sans requête en base (voir StatelessJwtAuth).
 # Pour tester dans Postman :
 # - Méthode : GET
 # - URL : http://127.0.0.1:8000/api/pokemon/view-all/{number}
@@ -39,12 +60,117 @@ def pokemon_view(request, number: int, version: str = ""):
 # Remplacez {number} par le numéro du Pokémon recherché.
 def pokemon_view_all(request, number: int):
     """Détaille tous les Pokémon d'un numéro donné (toutes versions)."""
-    print(request.user.username)
-    pokemons = Pokemon.objects.filter(number=number)
-    if pokemons.count() == 0:
+    log_sampled(logger, "pokemon_view_all", user=request.user.username, number=number)
+    # La liste est évaluée une seule fois : pas de COUNT séparé avant la lecture.
+    documents = list(PokemonDocument.objects.filter(number=number).order_by("pokemon").values_list("detail", flat=True))
+    if not documents:
         return (404, {"message": "Pokemon not found"})
     else:
-        return pokemons
+        return stored_response(json_array(documents))
+
+@router.post("view-many", response=ViewManySchema)
+# Endpoint pour récupérer plusieurs Pokémon en un seul appel (ex : une équipe de six, une boîte de 30).
+# Système de routing : cette route correspond à /api/pokemon/view-many (voir api/ninja.py).
+# Pour tester dans Postman :
+# - Méthode : POST
+# - URL : http://127.0.0.1:8000/api/pokemon/view-many
+# - Header : X-API-KEY : <votre_clé_api>
+# - Body (JSON) : jusqu'à 500 clés (numéro, version)
+#   {
+#     "keys": [{"number": 25}, {"number": 6, "version": "Mega Charizard X"}, {"number": 9999}]
+#   }
+# Les résultats suivent l'ordre des clés ; une clé introuvable donne {"found": false, "pokemon": null}.
+def pokemon_view_many(request, data: ViewManyRequestSchema):
+    """
+    Détaille une liste de Pokémon (numéro, version) : une seule authentification et une seule requête
+    pour toutes les clés, via le DataLoader de la requête (voir api/loaders.py).
+    """
+    loader = request_loader(request, "pokemon_documents", documents_by_key)
+    pending = [loader.load((key.number, key.version)) for key in data.keys]
+    items = []
+    for key, document in zip(data.keys, pending):
+        detail = document.get()
+        # Les documents sont insérés tels quels dans la réponse (voir pokemon/readmodel.py).
+        items.append(
+            f'{{"number":{key.number},"version":{dumps(key.version)},'
+            f'"found":{"true" if detail is not None else "false"},"pokemon":{detail or "null"}}}'
+        )
+    return stored_response(f'{{"items":{json_array(items)}}}')
+
+@router.get("search", response=list[PokemonSchema])
+@paginate(PageNumberPagination, page_size=10)
+# Endpoint pour rechercher des Pokémon selon leurs statistiques.
+# Système de routing : cette route correspond à /api/pokemon/search (voir api/ninja.py).
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/pokemon/search?min_attack=100&type=Fire&order_by=-speed
+# - Header : X-API-KEY : <votre_clé_api>
+# Filtres possibles : min_<stat> / max_<stat> (hp, attack, defense, special_attack, special_defense, speed, total),
+# type, generation, legendary. Tri : order_by=<stat> ou -<stat> (par défaut -total).
+def pokemon_search(request, filters: Query[PokemonSearchSchema], order: Query[PokemonSearchOrderSchema]):
+    """
+    Recherche les Pokémon par plages de statistiques, type, génération et légendaire.
+    La colonne total est stockée en base et indexée avec chaque filtre (voir Pokemon.Meta.indexes).
+    """
+    return filters.filter(Pokemon.objects.for_schema()).order_by(order.order_by, "id")
+
+@router.get("lookup", response=list[PokemonNameMatchSchema])
+# Endpoint d'autocomplétion sur les noms traduits (9 langues, data/pokemon-translation.csv).
+# Système de routing : cette route correspond à /api/pokemon/lookup (voir api/ninja.py).
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/pokemon/lookup?q=salame&lang=fr
+# - Header : X-API-KEY : <votre_clé_api>
+# La recherche ignore la casse, les accents et la ponctuation ; sans lang, toutes les langues sont cherchées.
+def pokemon_lookup(
+    request,
+    q: str = Query(..., min_length=1, max_length=64),
+    lang: Optional[Literal[tuple(LANGUAGES)]] = None,
+    limit: int = Query(10, ge=1, le=50),
+):
+    """
+    Noms commençant par q, les correspondances exactes en premier.
+    Les noms sont cherchés dans un index trié en mémoire (voir pokemon/names.py), sans parcourir la table.
+    """
+    return name_index.get().lookup(q, lang, limit)
+
+@router.get("fuzzy", response=list[PokemonFuzzyMatchSchema])
+# Endpoint de recherche tolérante aux fautes de frappe (ex : "pikachoo", "bulbasor").
+# Système de routing : cette route correspond à /api/pokemon/fuzzy (voir api/ninja.py).
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/pokemon/fuzzy?q=pikachoo
+# - Header : X-API-KEY : <votre_clé_api>
+# Les noms des Pokémon et les noms traduits sont cherchés ; un résultat par espèce, le plus proche en premier.
+def pokemon_fuzzy(
+    request,
+    q: str = Query(..., min_length=1, max_length=64),
+    lang: Optional[Literal[tuple(LANGUAGES)]] = None,
+    limit: int = Query(10, ge=1, le=50),
+    threshold: float = Query(THRESHOLD, gt=0, le=1),
+):
+    """
+    Recherche floue par similarité de trigrammes (voir pokemon/fuzzy.py).
+    L'index est en mémoire et mis à jour à chaque enregistrement : aucune extension SQL (pg_trgm) n'est nécessaire.
+    """
+    return fuzzy_index.get().search_species(q, limit, lang, threshold)
+
+@router.post("bulk", response=BulkResultSchema, openapi_extra=openapi_body(PokemonCreateSchema))
+# Endpoint pour créer (ou mettre à jour) des Pokémon en masse.
+# Système de routing : cette route correspond à /api/pokemon/bulk (voir api/ninja.py).
+# Pour tester dans Postman :
+# - Méthode : POST
+# - URL : http://127.0.0.1:8000/api/pokemon/bulk?on_conflict=update
+# - Header : X-API-KEY : <votre_clé_api>
+# - Body (JSON) : une liste d'objets au format de /api/querysets/pokemon/create,
+#   ou (Content-Type: application/x-ndjson) un objet JSON par ligne.
+# on_conflict : skip (par défaut, un Pokémon existant est ignoré) ou update (il est mis à jour).
+def pokemon_bulk(request, on_conflict: OnConflict = "skip"):
+    """
+    Écrit tous les Pokémon valides en une transaction, avec un statut par élément :
+    un élément invalide ou en double n'empêche pas l'écriture des autres (voir api/bulk.py).
+    """
+    return bulk_write_pokemons(read_items(request), on_conflict)
 
 # Explications générales :
 # - Le système de routing de Django Ninja permet de définir des routes dynamiques avec des paramètres dans l'URL (ex: {number}).
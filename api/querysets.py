@@ -1,14 +1,21 @@
 from typing import Any
 from django.db import IntegrityError
+from django.http import StreamingHttpResponse
 from api.schemas import PokemonSchema, PokemonSchemaMini, TypeCreationSchema, TypeSchema, PokemonCreateSchema
-from pokemon.models import Pokemon, Type, Generation
+from pokemon.export import CONTENT_TYPES, ExportFormat, export
+from pokemon.models import Pokemon, PokemonDocument, Type, Generation
 from ninja import Router
 from ninja.pagination import paginate, PageNumberPagination
+from api.conditional import conditional
+from api.pagination import CursorPagination
+from api.renderers import stored_items
 
 # Création d'un routeur Ninja pour les opérations sur les ensembles de données (querysets).
 router = Router()
 
 @router.get("/pokemons", response = list[PokemonSchemaMini])
+@conditional(Pokemon, Type)
+@stored_items("mini")
 @paginate(PageNumberPagination, page_size=10)
 # Endpoint pour lister tous les Pokémons avec pagination.
 # Système de routing : cette route correspond à /api/querysets/pokemons (voir api/ninja.py).
@@ -16,10 +23,49 @@ router = Router()
 # - Méthode : GET
 # - URL : http://127.0.0.1:8000/api/querysets/pokemons
 # - Paramètres de pagination possibles : ?page=1
+# La réponse porte un ETag : renvoyez-le dans le header If-None-Match pour obtenir un 304 sans corps.
 def list_pokemons(request):
     """List all Pokemons."""
-    pokemons = Pokemon.objects.all()
-    return pokemons
+    # Les éléments sont lus déjà sérialisés dans le modèle de lecture (pokemon/readmodel.py) :
+    # ni jointure ni schéma, une seule requête par page (plus le COUNT).
+    return PokemonDocument.objects.order_by("pokemon").values("mini")
+
+@router.get("/pokemons/cursor", response = list[PokemonSchemaMini])
+@conditional(Pokemon, Type)
+@stored_items("mini")
+@paginate(CursorPagination, ordering=("number", "pokemon"), page_size=10)
+# Endpoint pour lister tous les Pokémons avec une pagination par curseur (keyset).
+# Contrairement à /pokemons, aucune page ne fait de COUNT ni d'OFFSET : le coût d'une page
+# ne dépend pas de sa profondeur, ce qui convient aux clients qui parcourent tout le catalogue.
+# Système de routing : cette route correspond à /api/querysets/pokemons/cursor (voir api/ninja.py).
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/querysets/pokemons/cursor
+# - Paramètres possibles : ?cursor=<valeur des liens next/previous>&page_size=20&total=true
+def list_pokemons_cursor(request):
+    """List all Pokemons, ordered by number, with cursor pagination."""
+    # "pokemon" est l'id du Pokémon : les curseurs sont les mêmes que sur la table pokemon.
+    return PokemonDocument.objects.values("number", "pokemon", "mini")
+
+@router.get("/pokemons/export")
+@conditional(Pokemon, Type, Generation)
+# Endpoint pour exporter tout le catalogue en une seule réponse, sans pagination.
+# La réponse est envoyée au fil de la lecture (StreamingHttpResponse) : la mémoire utilisée
+# ne dépend pas du nombre de Pokémon (voir pokemon/export.py).
+# Système de routing : cette route correspond à /api/querysets/pokemons/export (voir api/ninja.py).
+# Pour tester dans Postman (ou curl -o pokemon.csv.gz) :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/querysets/pokemons/export?format=csv&gzip=true
+# - Paramètres possibles : format=ndjson (par défaut, un objet JSON par ligne) ou csv, gzip=true pour un fichier .gz
+# La réponse porte un ETag : renvoyez-le dans le header If-None-Match pour obtenir un 304 sans corps.
+def export_pokemons(request, format: ExportFormat = "ndjson", gzip: bool = False):
+    """Exporte tous les Pokémon (types et génération joints) en NDJSON ou CSV, compressés ou non."""
+    filename = f"pokemon.{format}" + (".gz" if gzip else "")
+    return StreamingHttpResponse(
+        export(format, compress=gzip),
+        content_type="application/gzip" if gzip else CONTENT_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @router.post("/pokemon/create", response={200: PokemonSchema, 401: Any})
 # Endpoint pour créer un nouveau Pokémon.
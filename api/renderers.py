@@ -0,0 +1,110 @@
+"""
+Fast JSON rendering of the API responses.
+
+FastJSONRenderer encodes with orjson when it is installed (several times
+faster than json.dumps, and it returns bytes directly) and falls back on
+ninja's JSONRenderer otherwise. Types orjson does not know, and datetimes,
+go through NinjaJSONEncoder so that both encoders produce the same values.
+
+For hot read endpoints, values_response goes one step further: the view
+builds plain dicts (from `.values()`) already shaped like the response
+schema and returns them as an HttpResponse, which ninja sends as is,
+skipping the ORM instance -> Pydantic model -> dict round trip.
+
+The Pokémon routes skip the encoding too: stored_response and stored_items
+return the JSON pre-rendered in the read model (pokemon/readmodel.py).
+"""
+
+import inspect
+from functools import wraps
+from typing import Any, Callable
+
+from django.http import HttpRequest, HttpResponse
+from ninja.renderers import JSONRenderer
+from ninja.responses import NinjaJSONEncoder
+
+from pokemon.readmodel import json_array
+from project.metrics import timed_serialization
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+CONTENT_TYPE = "application/json; charset=utf-8"
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer using orjson when available."""
+
+    def __init__(self, use_orjson: bool | None = None):
+        self.use_orjson = orjson is not None if use_orjson is None else use_orjson
+        if self.use_orjson and orjson is None:
+            raise ImportError("orjson is not installed.")
+        self._encoder = self.encoder_class(**self.json_dumps_params)
+
+    # Reported in the serialization time of the request (see project/metrics.py); inside
+    # ninja's response step, already timed as a whole, it is not counted twice.
+    @timed_serialization
+    def dumps(self, data: Any) -> bytes | str:
+        if self.use_orjson:
+            return orjson.dumps(
+                data,
+                default=self._encoder.default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        return self._encoder.encode(data)
+
+    def render(self, request: HttpRequest, data: Any, *, response_status: int) -> Any:
+        return self.dumps(data)
+
+
+renderer = FastJSONRenderer()
+
+
+def values_response(data: Any, status: int = 200) -> HttpResponse:
+    """
+    Renders `data` without validating it against the response schema.
+
+    `data` must already have the shape of the schema declared on the route
+    (see e.g. PokemonQuerySet.schema_values).
+    """
+    return HttpResponse(renderer.dumps(data), status=status, content_type=CONTENT_TYPE)
+
+
+def stored_response(content: str, status: int = 200) -> HttpResponse:
+    """Returns JSON stored already serialized (a document of the read model) as is."""
+    return HttpResponse(content, status=status, content_type=CONTENT_TYPE)
+
+
+def stored_items(field: str) -> Callable:
+    """
+    Renders a page whose items are rows holding stored JSON in `field`.
+
+    To use above @paginate: the stored items are joined as they are, the
+    other keys of the page (count, next...) are encoded around them.
+
+        @router.get("/pokemons", response=list[PokemonSchemaMini])
+        @stored_items("mini")
+        @paginate(PageNumberPagination)
+        def list_pokemons(request):
+            return PokemonDocument.objects.values("mini")
+    """
+    def decorator(view_func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(view_func):
+            raise TypeError("stored_items only supports sync routes.")
+
+        @wraps(view_func)
+        def view_with_stored_items(request: HttpRequest, *args: Any, **kwargs: Any) -> Any:
+            page = view_func(request, *args, **kwargs)
+            if not isinstance(page, dict):
+                return page
+            items = json_array(item[field] for item in page["items"])
+            rest = renderer.dumps({key: value for key, value in page.items() if key != "items"})
+            rest = rest.decode() if isinstance(rest, bytes) else rest
+            content = f'{{"items":{items}{"," + rest[1:] if rest != "{}" else "}"}'
+            return stored_response(content)
+
+        return view_with_stored_items
+
+    return decorator
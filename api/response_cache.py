@@ -0,0 +1,171 @@
+"""
+Response cache for read routes.
+
+The rendered bytes of a successful response are stored in pokemon.cache.response_cache,
+keyed by the path, the query string, the auth scope and (below @conditional) the
+ETag, so a hit costs neither the main query nor the serialization:
+
+    - single-flight: on a cold key, one request computes the response while the
+      concurrent requests for the same key wait for it, instead of all hitting
+      the database at once;
+    - stale-while-revalidate: for `stale` seconds after its `ttl`, an entry is still
+      served while a single background refresh computes the new one;
+    - invalidation: the cache is bumped by the signals of the models the
+      responses are built from (see pokemon/signals.py), and the ETag in the key
+      follows the bulk writes of other processes.
+"""
+
+import copy
+import hashlib
+import inspect
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable
+
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+from ninja.utils import contribute_operation_callback
+
+from pokemon.cache import MISSING, response_cache
+
+# How long a request waits for the one computing the same key before computing it itself.
+WAIT_TIMEOUT = 10
+
+
+class SingleFlight:
+    """Elects one caller per key; the others get an event set when it is done."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, threading.Event] = {}
+
+    def acquire(self, key: str) -> threading.Event | None:
+        """Returns None when the caller leads the computation of `key`, else the event to wait for."""
+        with self._lock:
+            event = self._calls.get(key)
+            if event is None:
+                self._calls[key] = threading.Event()
+            return event
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            event = self._calls.pop(key, None)
+        if event is not None:
+            event.set()
+
+
+flights = SingleFlight()
+
+
+def start_refresh(function: Callable, *args: Any) -> None:
+    """Runs a stale-while-revalidate refresh in a background thread."""
+    def target() -> None:
+        try:
+            function(*args)
+        finally:
+            # The thread opened its own database connections.
+            connections.close_all()
+
+    threading.Thread(target=target, daemon=True).start()
+
+
+def cache_key(request: HttpRequest, vary_on_user: bool) -> str:
+    scope = f"user:{request.user.pk}" if vary_on_user else "shared"
+    etag = getattr(request, "conditional_headers", {}).get("ETag", "")
+    return hashlib.sha1(f"{request.get_full_path()}|{scope}|{etag}".encode()).hexdigest()
+
+
+def cache_response(ttl: float = 60, stale: float = 0, vary_on_user: bool = False) -> Callable:
+    """
+    Caches the rendered 200 responses of a sync GET route.
+
+    To use below the router decorator (after authentication), and below
+    @conditional when the route has one:
+
+        @router.get("view/{number}", response=PokemonSchema)
+        @conditional(Pokemon, Type, Generation)
+        @cache_response(ttl=60, stale=30)
+        def pokemon_view(request, number: int): ...
+
+    Args:
+        ttl: Seconds during which an entry is served as is.
+        stale: Seconds after `ttl` during which it is still served while being refreshed.
+        vary_on_user: One entry per user, for responses that depend on the caller;
+            by default every authenticated caller shares the entry.
+    """
+    def decorator(view_func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(view_func):
+            raise TypeError("cache_response only supports sync routes.")
+
+        def hit(entry: tuple, status: str) -> HttpResponse:
+            content, content_type = entry[:2]
+            response = HttpResponse(content, content_type=content_type)
+            response["X-Cache"] = status
+            return response
+
+        @wraps(view_func)
+        def view_with_cache(request: HttpRequest, *args: Any, **kwargs: Any) -> Any:
+            key = request.response_cache_key = cache_key(request, vary_on_user)
+            if getattr(request, "response_cache_refresh", False):
+                return view_func(request, *args, **kwargs)
+
+            entry = response_cache.get(key)
+            now = time.time()
+            if entry is not MISSING and now < entry[3]:
+                if now < entry[2]:
+                    return hit(entry, "HIT")
+                if flights.acquire(f"refresh:{key}") is None:
+                    refresh = copy.copy(request)
+                    refresh.response_cache_refresh = True
+                    start_refresh(refresh_response, refresh, request.response_cache_call, key)
+                return hit(entry, "STALE")
+
+            event = flights.acquire(key)
+            if event is not None:
+                # Another request is computing this key: reuse its response.
+                event.wait(WAIT_TIMEOUT)
+                entry = response_cache.get(key)
+                if entry is not MISSING and time.time() < entry[2]:
+                    return hit(entry, "HIT")
+            else:
+                request.response_cache_leader = key
+            return view_func(request, *args, **kwargs)
+
+        def store(request: HttpRequest, response: Any) -> None:
+            key = getattr(request, "response_cache_key", None)
+            if key is None or response.status_code != 200 or response.streaming or response.has_header("X-Cache"):
+                return
+            now = time.time()
+            # (body, content type, fresh until, stale until)
+            entry = (response.content, response["Content-Type"], now + ttl, now + ttl + stale)
+            response_cache.set(key, entry, ttl + stale)
+            response["X-Cache"] = "MISS"
+
+        def refresh_response(request: HttpRequest, call: tuple, key: str) -> None:
+            run, kw = call
+            try:
+                run(request, **kw)
+            finally:
+                flights.release(f"refresh:{key}")
+
+        def add_cache(operation) -> None:
+            run = operation.run
+
+            def run_with_cache(request: HttpRequest, **kw: Any) -> Any:
+                request.response_cache_call = (run_with_cache, kw)
+                try:
+                    response = run(request, **kw)
+                    store(request, response)
+                    return response
+                finally:
+                    leader = getattr(request, "response_cache_leader", None)
+                    if leader is not None:
+                        flights.release(leader)
+
+            operation.run = run_with_cache
+
+        contribute_operation_callback(view_with_cache, add_cache)
+        return view_with_cache
+
+    return decorator
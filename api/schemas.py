@@ -1,4 +1,6 @@
-from ninja import Field, Schema, ModelSchema
+from typing import Literal, Optional
+from django.db.models import Q
+from ninja import Field, FilterSchema, Schema, ModelSchema
 from pokemon.models import Type, Pokemon, Generation
 
 class SumSchema(Schema):
@@ -55,7 +57,7 @@ class PokemonCreateSchema(ModelSchema):
 
     class Meta:
         model = Pokemon
-        exclude = ["id", "type1", "type2", "generation"]
+        exclude = ["id", "type1", "type2", "generation", "total"]
 
 #Autre façon de faire/exemple
 class PokemonSchemaMini(ModelSchema):
@@ -71,3 +73,117 @@ class PokemonSchemaMini(ModelSchema):
         fields = None
         exclude = ["type1"]
 
+STAT_FIELDS = ["hp", "attack", "defense", "special_attack", "special_defense", "speed", "total"]
+
+class PokemonSearchSchema(FilterSchema):
+    """
+    Filters of the stat search endpoint.
+
+    Each stat (and the total) accepts an inclusive range; `type` matches
+    either type1 or type2. Unset filters are ignored.
+    """
+    min_hp: int | None = Field(None, q="hp__gte")
+    max_hp: int | None = Field(None, q="hp__lte")
+    min_attack: int | None = Field(None, q="attack__gte")
+    max_attack: int | None = Field(None, q="attack__lte")
+    min_defense: int | None = Field(None, q="defense__gte")
+    max_defense: int | None = Field(None, q="defense__lte")
+    min_special_attack: int | None = Field(None, q="special_attack__gte")
+    max_special_attack: int | None = Field(None, q="special_attack__lte")
+    min_special_defense: int | None = Field(None, q="special_defense__gte")
+    max_special_defense: int | None = Field(None, q="special_defense__lte")
+    min_speed: int | None = Field(None, q="speed__gte")
+    max_speed: int | None = Field(None, q="speed__lte")
+    min_total: int | None = Field(None, q="total__gte")
+    max_total: int | None = Field(None, q="total__lte")
+    type: str | None = None
+    generation: int | None = None
+    legendary: bool | None = None
+
+    # Sub-queries rather than joins, so the database can use the (type, total)
+    # and (generation, total) indexes of the pokemon table.
+    def filter_type(self, value: str | None) -> Q:
+        if value is None:
+            return Q()
+        types = Type.objects.filter(name=value).values("pk")
+        return Q(type1__in=types) | Q(type2__in=types)
+
+    def filter_generation(self, value: int | None) -> Q:
+        if value is None:
+            return Q()
+        return Q(generation__in=Generation.objects.filter(number=value).values("pk"))
+
+    # legendary=True is rendered as a bare `WHERE legendary`, which the database
+    # cannot look up in the (legendary, total) index: compare it to a value.
+    def filter_legendary(self, value: bool | None) -> Q:
+        if value is None:
+            return Q()
+        return Q(legendary__in=[value])
+
+class PokemonSearchOrderSchema(Schema):
+    """Sort of the stat search endpoint: a stat or the total, `-` for descending."""
+    order_by: Literal[tuple(STAT_FIELDS + [f"-{field}" for field in STAT_FIELDS])] = "-total"
+
+class StatWeightsSchema(Schema):
+    """Weights of the six stats in the score of the analytics top-k endpoint."""
+    hp: float = 1
+    attack: float = 1
+    defense: float = 1
+    special_attack: float = 1
+    special_defense: float = 1
+    speed: float = 1
+
+class PokemonValueSchema(Schema):
+    """A Pokemon with the value computed for it (score, distance...)."""
+    id: int
+    number: int
+    name: str
+    version: str
+    value: float
+
+class MatchupRequestSchema(Schema):
+    """Batch of attacking types against defending Pokemon (ids)."""
+    attackers: list[str] = Field(..., min_length=1, max_length=1000)
+    defenders: list[int] = Field(..., min_length=1, max_length=10000)
+
+class MatchupSchema(Schema):
+    """Multipliers of the batch: multipliers[i][j] is attackers[i] against defenders[j]."""
+    attackers: list[str]
+    defenders: list[int]
+    multipliers: list[list[float]]
+
+class PokemonNameMatchSchema(Schema):
+    """A translated name matching the lookup query (`exact` when the whole name matches)."""
+    number: int
+    language: str
+    name: str
+    exact: bool
+
+class PokemonFuzzyMatchSchema(Schema):
+    """Best fuzzy match of a species: the matched name, its language and its similarity (0 to 1)."""
+    number: int
+    pokemon_id: Optional[int] = None
+    name: str
+    language: str
+    score: float
+
+class PokemonKeySchema(Schema):
+    """Key of a Pokemon in the batch lookup: its number and its version ("" for the base form)."""
+    # Range of Pokemon.number (PositiveSmallIntegerField): a larger number would fail in the SQL query.
+    number: int = Field(..., ge=0, le=32767)
+    version: str = ""
+
+class ViewManyRequestSchema(Schema):
+    """Keys of the batch lookup, answered in the same order."""
+    keys: list[PokemonKeySchema] = Field(..., min_length=1, max_length=500)
+
+class ViewManyItemSchema(Schema):
+    """Result of one key of the batch lookup: `found` is false (and pokemon null) for a miss."""
+    number: int
+    version: str
+    found: bool
+    pokemon: PokemonSchema | None = None
+
+class ViewManySchema(Schema):
+    """Results of the batch lookup, one per requested key, in the request order."""
+    items: list[ViewManyItemSchema]
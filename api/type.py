@@ -1,23 +1,34 @@
 """API routes for Pokemon types."""
 
 from typing import Any
-from api.schemas import TypeSchema
+from api.bulk import BulkResultSchema, OnConflict, bulk_write_types, openapi_body, read_items
+from api.conditional import conditional
+from api.renderers import values_response
+from api.schemas import TypeCreationSchema, TypeSchema
 from ninja import Router
+from pokemon.cache import reference_cache
 from pokemon.models import Type
 
 # Création d'un routeur Ninja pour les types de Pokémon.
 router = Router()
 
 @router.get("list", response=list[TypeSchema])
+@conditional(Type)
 # Endpoint pour récupérer la liste complète des types existants.
 # Système de routing : cette route correspond à /api/type/list (voir api/ninja.py).
 # Pour tester dans Postman :
 # - Méthode : GET
 # - URL : http://127.0.0.1:8000/api/type/list
+# La réponse porte un ETag : renvoyez-le dans le header If-None-Match pour obtenir un 304 sans corps.
 def type_list(request):
-    """Liste tous les types de Pokémon."""
-    types = Type.objects.all()
-    return types
+    """
+    Liste tous les types de Pokémon.
+    Les types changent rarement : la liste est servie depuis reference_cache,
+    invalidé à chaque modification d'un type (voir pokemon/signals.py).
+    """
+    types = reference_cache.get_or_set("type_list", lambda: list(Type.objects.values()))
+    # Les dicts ont déjà la forme de TypeSchema : ils sont encodés sans validation (voir api/renderers.py).
+    return values_response(types)
 
 @router.get("view/{name}", response={200: TypeSchema, 404: dict[str, str]})
 # Endpoint pour récupérer les détails d’un type à partir de son nom.
@@ -28,13 +39,12 @@ def type_list(request):
 # Remplacez "Steel" par le nom du type recherché.
 def type_view(request, name: str):
     """
-    Route pour obtenir un type par son nom.
+    Route pour obtenir un type par son nom (servi depuis reference_cache).
     """
-    try:
-        type = Type.objects.get(name=name)
-        return type
-    except Type.DoesNotExist:
+    type = reference_cache.get_or_set(f"type:{name}", lambda: Type.objects.filter(name=name).values().first())
+    if type is None:
         return (404, {"message": "Type not found"})
+    return values_response(type)
 
 @router.post("create", response=dict[str, bool | TypeSchema])
 # Endpoint pour créer ou mettre à jour un type.
@@ -56,6 +66,21 @@ def type_create(request, data: TypeSchema):
     instance, created = Type.objects.update_or_create(name=data.name, defaults={"description": data.description})
     return {"created": created, "instance": instance}
 
+@router.post("bulk", response=BulkResultSchema, openapi_extra=openapi_body(TypeCreationSchema))
+# Endpoint pour créer ou mettre à jour des types en masse.
+# Système de routing : cette route correspond à /api/type/bulk
+# Pour tester dans Postman :
+# - Méthode : POST
+# - URL : http://127.0.0.1:8000/api/type/bulk
+# - Body (JSON) : [{"name": "Steel", "description": "..."}, {"name": "Sound", "description": "..."}]
+#   ou (Content-Type: application/x-ndjson) un objet JSON par ligne.
+# on_conflict : update (par défaut, comme /api/type/create) ou skip.
+def type_bulk(request, on_conflict: OnConflict = "update"):
+    """
+    Crée ou met à jour les types en une transaction, avec un statut par élément (voir api/bulk.py).
+    """
+    return bulk_write_types(read_items(request), on_conflict)
+
 @router.put("edit/{name}", response={200: TypeSchema, 404: Any})
 # Endpoint pour modifier un type existant à partir de son nom.
 # Système de routing : cette route correspond à /api/type/edit/{name}
@@ -97,6 +122,18 @@ def type_delete(request, name: str):
     count, _ = Type.objects.filter(name=name).delete()
     return {"message": "Type deleted" if count else "Type not found"}
 
+@router.get("cache/stats", response=dict[str, int])
+# Endpoint pour consulter les compteurs du cache des types (hits, misses, invalidations).
+# Système de routing : cette route correspond à /api/type/cache/stats
+# Pour tester dans Postman :
+# - Méthode : GET
+# - URL : http://127.0.0.1:8000/api/type/cache/stats
+def type_cache_stats(request):
+    """
+    Compteurs du cache des données de référence pour ce processus.
+    """
+    return reference_cache.stats()
+
 # Explications générales :
 # - Le système de routing de Django Ninja permet de définir des routes accessibles sous /api/type/ grâce à l'ajout du routeur dans api/ninja.py.
 # - Les routes peuvent être statiques ou dynamiques, et acceptent des paramètres dans l'URL ou dans le corps de la requête (JSON).
@@ -0,0 +1,6 @@
+"""
+Benchmarks of the Pokemon API.
+
+Each module is run as a script from the project root, for instance:
+    python -m benchmarks.importpokemon
+"""
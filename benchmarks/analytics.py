@@ -0,0 +1,67 @@
+"""
+Benchmark of the NumPy stat matrix against the equivalent ORM queries.
+
+Usage:
+    python -m benchmarks.analytics [--rows 100000] [--repeat 20]
+"""
+
+import argparse
+import tempfile
+import timeit
+from io import StringIO
+from pathlib import Path
+
+from benchmarks.utils import make_synthetic_csv, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    import numpy as np
+    from django.core.management import call_command
+    from django.db.models import F, Q
+    from pokemon.analytics import STATS, StatMatrix, stat_matrix
+    from pokemon.models import Pokemon, Type
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_synthetic_csv(Path(directory) / "pokemon.csv", args.rows)
+        call_command("importpokemon", path=path, stdout=StringIO())
+
+    weights = [1, 2, 1, 0.5, 1, 1.5]
+    target = Pokemon.objects.order_by("id").first()
+
+    def orm_top_k():
+        score = sum((weight * F(stat) for weight, stat in zip(weights, STATS)), start=0)
+        return list(Pokemon.objects.annotate(score=score).order_by("-score", "id").values_list("id", "score")[:10])
+
+    def orm_percentiles():
+        result = {}
+        for type in Type.objects.all():
+            values = Pokemon.objects.filter(Q(type1=type) | Q(type2=type)).values_list("total", flat=True)
+            result[type.name] = np.percentile(list(values), [25, 50, 75, 90])
+        return result
+
+    def orm_nearest():
+        distance = sum(((F(stat) - getattr(target, stat)) * (F(stat) - getattr(target, stat)) for stat in STATS), start=0)
+        return list(Pokemon.objects.exclude(pk=target.pk).annotate(distance=distance).order_by("distance", "id").values_list("id", flat=True)[:5])
+
+    matrix = stat_matrix.get()
+    cases = [
+        ("top_k", orm_top_k, lambda: stat_matrix.get().top_k(weights, 10)),
+        ("percentiles", orm_percentiles, lambda: stat_matrix.get().percentiles("total", [25, 50, 75, 90])),
+        ("nearest", orm_nearest, lambda: stat_matrix.get().nearest(target.pk, 5)),
+    ]
+    print(f"{len(matrix)} pokemons, matrix load {timeit.timeit(StatMatrix.load, number=1) * 1000:.0f} ms")
+    print(f"{'query':<12} {'orm ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for name, orm, vectorized in cases:
+        orm_time = min(timeit.repeat(orm, number=1, repeat=args.repeat)) * 1000
+        numpy_time = min(timeit.repeat(vectorized, number=1, repeat=args.repeat)) * 1000
+        print(f"{name:<12} {orm_time:>10.2f} {numpy_time:>10.2f} {orm_time / numpy_time:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
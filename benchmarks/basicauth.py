@@ -0,0 +1,50 @@
+"""
+Benchmark of /api/auth/basic with and without the credential cache.
+
+Requests go through the Django test client (no network), with the project's
+password hasher (PBKDF2): "cold" clears the credential cache before each
+request, as when every request hashed the password.
+
+Usage:
+    python -m benchmarks.basicauth [--requests 200]
+"""
+
+import argparse
+import base64
+import time
+
+from benchmarks.utils import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from pokemon.cache import credentials_cache
+
+    # Allows the test client's "testserver" host.
+    setup_test_environment()
+    User.objects.create_user("benchmark", password="benchmark")
+    client = Client(headers={"Authorization": "Basic " + base64.b64encode(b"benchmark:benchmark").decode()})
+
+    def run(clear: bool) -> float:
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            if clear:
+                credentials_cache.clear()
+            response = client.get("/api/auth/basic")
+            assert response.status_code == 200, response.content
+        return args.requests / (time.perf_counter() - start)
+
+    print(f"{'mode':<8} {'req/s':>8}")
+    print(f"{'cold':<8} {run(clear=True):>8.0f}")
+    print(f"{'cached':<8} {run(clear=False):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
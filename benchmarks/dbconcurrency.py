@@ -0,0 +1,122 @@
+"""
+Concurrent writers and readers on SQLite, default settings against the profile of project/database.py.
+
+Writer threads run what type_create and create_pokemon do (update_or_create,
+get + create in a transaction), reader threads run the queries of
+pokemon/view, all on the same file database. With the default settings the
+writers fail with "database is locked"; with the profile (WAL, busy timeout,
+BEGIN IMMEDIATE) they wait for the lock instead.
+
+Each profile runs in its own process, since the database settings are read once.
+
+Usage:
+    python -m benchmarks.dbconcurrency [--writers 8] [--readers 8] [--duration 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+
+PROFILES = {
+    "default settings": {"SQLITE_PROFILE": "off"},
+    "tuned profile": {"SQLITE_PROFILE": "on"},
+}
+
+
+def run_workload(writers: int, readers: int, duration: float) -> dict:
+    """Runs in the child process: prepares the database then runs the threads."""
+    os.environ["DJANGO_SETTINGS_MODULE"] = "benchmarks.settings"
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.db import OperationalError, connection, transaction
+    from pokemon.models import Generation, Pokemon, Type
+
+    call_command("migrate", verbosity=0)
+    call_command("importpokemon", no_names=True, stdout=StringIO())
+    generation = Generation.objects.get(number=1)
+    grass = Type.objects.get(name="Grass")
+    counts = {"writes": 0, "reads": 0, "locked": 0, "other errors": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def count(name: str) -> None:
+        with lock:
+            counts[name] += 1
+
+    def write(thread: int, iteration: int) -> None:
+        if iteration % 2:
+            # type_create
+            Type.objects.update_or_create(name=f"Type {iteration % 20}", defaults={"description": f"{thread}-{iteration}"})
+        else:
+            # create_pokemon: reads the relations then inserts, in one transaction
+            with transaction.atomic():
+                Type.objects.get(pk=grass.pk)
+                Pokemon.objects.create(
+                    number=2000 + thread, name=f"Writer{thread}", version=str(iteration), type1=grass,
+                    hp=1, attack=1, defense=1, special_attack=1, special_defense=1, speed=1, generation=generation,
+                )
+
+    def read(thread: int, iteration: int) -> None:
+        list(Pokemon.objects.for_schema().filter(number=random.randint(1, 721)))
+
+    def loop(action, name: str, thread: int) -> None:
+        iteration = 0
+        try:
+            while time.monotonic() < deadline:
+                iteration += 1
+                try:
+                    action(thread, iteration)
+                    count(name)
+                except OperationalError as error:
+                    count("locked" if "locked" in str(error) else "other errors")
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=loop, args=(write, "writes", index)) for index in range(writers)]
+    threads += [threading.Thread(target=loop, args=(read, "reads", index)) for index in range(readers)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counts["elapsed"] = time.monotonic() - start
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_workload(args.writers, args.readers, args.duration)))
+        return
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.duration:g}s per profile")
+    print(f"{'profile':<18} {'writes/s':>9} {'reads/s':>9} {'locked':>7} {'errors':>7}")
+    for profile, environ in PROFILES.items():
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, **environ, "BENCHMARK_DB": str(Path(directory) / "concurrency.sqlite3")}
+            command = [sys.executable, "-m", "benchmarks.dbconcurrency", "--child", "--writers", str(args.writers),
+                       "--readers", str(args.readers), "--duration", str(args.duration)]
+            output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.splitlines()[-1])
+        elapsed = result["elapsed"]
+        print(f"{profile:<18} {result['writes'] / elapsed:>9.0f} {result['reads'] / elapsed:>9.0f} "
+              f"{result['locked']:>7} {result['other errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark of the trigram fuzzy index on a synthetic corpus of names.
+
+The corpus is made of the translated names, each repeated with random
+syllables appended until `--names` names. Queries are corpus names with
+one typo (substitution, deletion or transposition); recall@5 tells how often
+the original name is among the five best matches. difflib (a linear scan)
+is the baseline.
+
+Usage:
+    python -m benchmarks.fuzzy [--names 100000] [--queries 200]
+"""
+
+import argparse
+import difflib
+import random
+import statistics
+import string
+import time
+
+from benchmarks.utils import setup_django
+
+SYLLABLES = ["ka", "zu", "mon", "ri", "ta", "bo", "lix", "ne", "sa", "dor", "pi", "chu", "ra", "gon"]
+
+
+def make_corpus(names: list[str], size: int, rng: random.Random) -> list[str]:
+    corpus = list(dict.fromkeys(names))
+    seen = set(corpus)
+    while len(corpus) < size:
+        name = rng.choice(names) + "".join(rng.choices(SYLLABLES, k=rng.randint(1, 2)))
+        if name not in seen:
+            seen.add(name)
+            corpus.append(name)
+    return corpus[:size]
+
+
+def add_typo(name: str, rng: random.Random) -> str:
+    position = rng.randrange(len(name))
+    kind = rng.choice(["substitution", "deletion", "transposition"])
+    if kind == "substitution" or len(name) < 3:
+        return name[:position] + rng.choice(string.ascii_lowercase) + name[position + 1:]
+    if kind == "deletion":
+        return name[:position] + name[position + 1:]
+    position = min(position, len(name) - 2)
+    return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--names", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--baseline-queries", type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from pokemon.fuzzy import TrigramIndex
+    from pokemon.names import read_names
+
+    rng = random.Random(0)
+    latin = [name for _, language, name in read_names() if language in ("en", "fr", "de")]
+    corpus = make_corpus(latin, args.names, rng)
+
+    start = time.perf_counter()
+    index = TrigramIndex()
+    for key, name in enumerate(corpus):
+        index.add(key, name)
+    build = time.perf_counter() - start
+    print(f"{len(index)} names, {len(index.postings)} trigrams, index built in {build:.2f}s")
+
+    targets = rng.sample(corpus, args.queries)
+    queries = [add_typo(name, rng) for name in targets]
+    timings, found = [], 0
+    for query, target in zip(queries, targets):
+        start = time.perf_counter()
+        matches = index.search(query, limit=5)
+        timings.append((time.perf_counter() - start) * 1000)
+        found += target in [match["name"] for match in matches]
+    timings.sort()
+    print(
+        f"{'trigram':<8} mean {statistics.fmean(timings):7.2f} ms  p99 {timings[int(len(timings) * 0.99) - 1]:7.2f} ms"
+        f"  recall@5 {found / len(queries):.0%}"
+    )
+
+    start = time.perf_counter()
+    found = 0
+    for query, target in list(zip(queries, targets))[:args.baseline_queries]:
+        found += target in difflib.get_close_matches(query, corpus, n=5, cutoff=0.6)
+    mean = (time.perf_counter() - start) * 1000 / args.baseline_queries
+    print(f"{'difflib':<8} mean {mean:7.2f} ms  ({args.baseline_queries} queries)  recall@5 {found / args.baseline_queries:.0%}")
+
+
+if __name__ == "__main__":
+    main()
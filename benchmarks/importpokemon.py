@@ -0,0 +1,41 @@
+"""
+Benchmark of the importpokemon command with 1, 2, 4 and 8 workers.
+
+Usage:
+    python -m benchmarks.importpokemon [--rows 1000000] [--batch-size 1000]
+"""
+
+import argparse
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+from benchmarks.utils import make_synthetic_csv, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from pokemon.models import Pokemon
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_synthetic_csv(Path(directory) / "pokemon.csv", args.rows)
+        print(f"{'workers':>8} {'seconds':>10} {'rows/s':>10}")
+        for workers in args.workers:
+            # The ORM delete cascades to the documents of the read model (a raw DELETE breaks their foreign key).
+            Pokemon.objects.all().delete()
+            start = time.perf_counter()
+            call_command("importpokemon", path=path, batch_size=args.batch_size, workers=workers, stdout=StringIO())
+            elapsed = time.perf_counter() - start
+            print(f"{workers:>8} {elapsed:>10.2f} {args.rows / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
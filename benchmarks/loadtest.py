@@ -0,0 +1,166 @@
+"""
+Load test of the read routes: sync routes under WSGI against /api/async/ under ASGI.
+
+Starts the project under gunicorn (WSGI, threaded workers) then under uvicorn
+(ASGI), and hammers each with an asyncio HTTP/1.1 keep-alive client at several
+concurrency levels. Neither server is a dependency of the project:
+    pip install gunicorn uvicorn
+
+Usage:
+    python -m benchmarks.loadtest [--connections 50 200 1000] [--duration 10] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from io import StringIO
+
+from benchmarks.utils import BASE_DIR
+
+HOST = "127.0.0.1"
+
+# (label, url path relative to /api/, needs the API key)
+ROUTES = [
+    ("pokemon view", "pokemon/view/25", True),
+    ("type list", "type/list", False),
+    ("pokemons page", "querysets/pokemons?page=5", False),
+]
+
+
+def prepare_database() -> str:
+    """Creates benchmarks' file database with the pokemon csv and returns an API key."""
+    os.environ["DJANGO_SETTINGS_MODULE"] = "benchmarks.settings"
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from ninja_apikey.models import APIKey
+    from ninja_apikey.security import generate_key
+
+    database = settings.DATABASES["default"]["NAME"]
+    if os.path.exists(database):
+        os.remove(database)
+    call_command("migrate", verbosity=0)
+    call_command("importpokemon", stdout=StringIO())
+    user = User.objects.create_user("loadtest", password="loadtest")
+    prefix, key, hashed_key = generate_key()
+    APIKey.objects.create(prefix=prefix, hashed_key=hashed_key, user=user, label="loadtest")
+    return f"{prefix}.{key}"
+
+
+def server_commands(port: int, workers: int) -> dict[str, list[str]]:
+    bind = f"{HOST}:{port}"
+    return {
+        "wsgi": [
+            "gunicorn", "project.wsgi:application", "--bind", bind, "--workers", str(workers),
+            "--threads", "8", "--worker-class", "gthread", "--log-level", "warning",
+        ],
+        "asgi": [
+            "uvicorn", "project.asgi:application", "--host", HOST, "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ],
+    }
+
+
+def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"The server did not listen on port {port} after {timeout}s.")
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    """Reads one response and returns its status code."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def connection_loop(port: int, request: bytes, deadline: float, latencies: list[float], errors: list[int]):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    try:
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    except (ConnectionError, asyncio.IncompleteReadError):
+        errors.append(0)
+    finally:
+        writer.close()
+
+
+async def run_load(port: int, path: str, headers: dict[str, str], connections: int, duration: float) -> dict:
+    lines = [f"GET {path} HTTP/1.1", f"Host: {HOST}:{port}", "Connection: keep-alive"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    request = ("\r\n".join(lines) + "\r\n\r\n").encode()
+    latencies: list[float] = []
+    errors: list[int] = []
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(connection_loop(port, request, deadline, latencies, errors) for _ in range(connections)))
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0
+    return {
+        "rps": len(latencies) / duration,
+        "p50": percentile(0.50),
+        "p99": percentile(0.99),
+        "mean": statistics.fmean(latencies) * 1000 if latencies else 0,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    api_key = prepare_database()
+    environment = {**os.environ, "DJANGO_SETTINGS_MODULE": "benchmarks.settings"}
+    print(f"{'server':<6} {'route':<15} {'conns':>6} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for server, command in server_commands(args.port, args.workers).items():
+        if shutil.which(command[0]) is None:
+            print(f"{server:<6} skipped: {command[0]} is not installed", file=sys.stderr)
+            continue
+        process = subprocess.Popen(command, cwd=BASE_DIR, env=environment)
+        try:
+            wait_for_port(args.port)
+            for label, route, needs_key in ROUTES:
+                # The sync routes under WSGI, their async versions under ASGI.
+                path = f"/api/{route}" if server == "wsgi" else f"/api/async/{route}"
+                headers = {"X-API-Key": api_key} if needs_key else {}
+                for connections in args.connections:
+                    result = asyncio.run(run_load(args.port, path, headers, connections, args.duration))
+                    print(
+                        f"{server:<6} {label:<15} {connections:>6} {result['rps']:>9.0f} "
+                        f"{result['p50']:>8.1f} {result['p99']:>8.1f} {result['errors']:>7}"
+                    )
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark of the response rendering of the hot read endpoints.
+
+"before" is what ninja did for these routes: ORM instances validated by the
+response schema, dumped to dicts, then encoded by json.dumps (JSONRenderer).
+"after" is the current path: `.values()` dicts shaped like the schema
+(PokemonQuerySet.schema_values) encoded by FastJSONRenderer, or only the
+faster encoder for the routes that still go through their schema.
+Both sides include the database query, except for "encoder only".
+
+Usage:
+    python -m benchmarks.renderers [--rows 800] [--repeat 50]
+"""
+
+import argparse
+import json
+import tempfile
+import timeit
+from io import StringIO
+from pathlib import Path
+
+from benchmarks.utils import make_synthetic_csv, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=800)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from ninja.renderers import JSONRenderer
+    from pydantic import TypeAdapter
+    from api.renderers import FastJSONRenderer, orjson
+    from api.schemas import PokemonSchema, PokemonSchemaMini, TypeSchema
+    from pokemon.models import Pokemon, Type
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_synthetic_csv(Path(directory) / "pokemon.csv", args.rows)
+        call_command("importpokemon", path=path, no_names=True, stdout=StringIO())
+
+    default, fast = JSONRenderer(), FastJSONRenderer()
+    pokemons = TypeAdapter(list[PokemonSchema])
+    minis = TypeAdapter(list[PokemonSchemaMini])
+    types = TypeAdapter(list[TypeSchema])
+
+    def render(renderer, data):
+        return renderer.render(None, data, response_status=200)
+
+    payload = Pokemon.objects.schema_values()
+    cases = [
+        (
+            "encoder only (all)",
+            lambda: render(default, payload),
+            lambda: render(fast, payload),
+        ),
+        (
+            "pokemon/view/3",
+            lambda: render(default, PokemonSchema.model_validate(Pokemon.objects.for_schema().get(number=3, version="")).model_dump()),
+            lambda: render(fast, Pokemon.objects.filter(number=3, version="").schema_values()[0]),
+        ),
+        (
+            "pokemon/view-all/6",
+            lambda: render(default, pokemons.dump_python(pokemons.validate_python(list(Pokemon.objects.for_schema().filter(number=6))))),
+            lambda: render(fast, Pokemon.objects.filter(number=6).order_by("id").schema_values()),
+        ),
+        (
+            "type/list",
+            lambda: render(default, types.dump_python(types.validate_python(list(Type.objects.values())))),
+            lambda: render(fast, list(Type.objects.values())),
+        ),
+        (
+            "pokemon/search (page)",
+            lambda: render(default, pokemons.dump_python(pokemons.validate_python(list(Pokemon.objects.for_schema().order_by("-total", "id")[:10])))),
+            lambda: render(fast, pokemons.dump_python(pokemons.validate_python(list(Pokemon.objects.for_schema().order_by("-total", "id")[:10])))),
+        ),
+        (
+            "querysets/pokemons (all)",
+            lambda: render(default, minis.dump_python(minis.validate_python(list(Pokemon.objects.for_mini_schema())))),
+            lambda: render(fast, minis.dump_python(minis.validate_python(list(Pokemon.objects.for_mini_schema())))),
+        ),
+        (
+            "list[PokemonSchema] (all)",
+            lambda: render(default, pokemons.dump_python(pokemons.validate_python(list(Pokemon.objects.for_schema())))),
+            lambda: render(fast, Pokemon.objects.schema_values()),
+        ),
+    ]
+    print(f"{Pokemon.objects.count()} pokemons, encoder: {'orjson ' + orjson.__version__ if orjson else 'json (orjson not installed)'}")
+    print(f"{'endpoint':<28} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for name, before, after in cases:
+        # Both sides must produce the same document.
+        assert json.loads(before()) == json.loads(after()), name
+        before_time = min(timeit.repeat(before, number=1, repeat=args.repeat)) * 1000
+        after_time = min(timeit.repeat(after, number=1, repeat=args.repeat)) * 1000
+        print(f"{name:<28} {before_time:>10.3f} {after_time:>10.3f} {before_time / after_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Settings of the multi-process benchmarks (benchmarks/loadtest.py, benchmarks/dbconcurrency.py).
+
+The servers run in separate processes: they share a file database instead of
+the in-memory test database of the other benchmarks. It is kept in the temporary
+directory of the system (BENCHMARK_DB to choose another file), out of the repository.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from project.settings import *  # noqa: F401,F403
+from project.database import database_settings
+from project.settings import BASE_DIR
+
+DEBUG = False
+ALLOWED_HOSTS = ["*"]
+
+# Same environment-driven profile as the project (project/database.py), on another file.
+DATABASES = database_settings(BASE_DIR, name=os.environ.get("BENCHMARK_DB", Path(tempfile.gettempdir()) / "pokemon-benchmark.sqlite3"))
+
+# The load tests measure the serving stack, not the password hashing of the API keys.
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
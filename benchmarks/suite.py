@@ -0,0 +1,455 @@
+"""
+Reproducible benchmark suite of the API: import, schemas and endpoints.
+
+Groups (all by default, or a subset with --only):
+    import     importpokemon on data/pokemon.csv scaled to --rows rows
+               (make_synthetic_csv): into an empty table, then again over the
+               imported rows (upsert). The imported rows are the dataset of the
+               other groups, which import them untimed when this group is skipped.
+    schemas    validation and dump of each schema of api/schemas.py, for 1, 100
+               and 10000 objects (--sizes), from ORM instances for the output
+               schemas and from JSON-like dicts for the input ones.
+    endpoints  every route of every router of api/ninja.py through the Django
+               test client, authenticated, caches warm. A route without an entry
+               in `endpoint_requests` stops the suite: new routes must be added.
+
+Each benchmark runs once untimed then --repeat times. The results (min, median
+and mean in ms, plus the environment) are written as JSON with --output.
+--baseline compares the medians with a previous result file and exits with
+status 1 when one is slower by more than --threshold (default 10%); --compare
+does the same for two existing files, without running anything.
+
+Usage:
+    python -m benchmarks.suite [--rows 1000000] [--only schemas endpoints] [--output results.json]
+    python -m benchmarks.suite --rows 10000 --output new.json --baseline old.json --threshold 0.15
+    python -m benchmarks.suite --compare old.json new.json
+"""
+
+import argparse
+import base64
+import json
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from io import StringIO
+from pathlib import Path
+from typing import Any, Callable
+
+from benchmarks.utils import BASE_DIR, make_synthetic_csv, setup_django
+
+GROUPS = ["import", "schemas", "endpoints"]
+
+
+def measure(function: Callable[[], Any], repeat: int, setup: Callable[[int], Any] | None = None) -> dict:
+    """Times `function` `repeat` times after one warm-up call; `setup(i)` runs untimed before each call."""
+    timings = []
+    for index in range(repeat + 1):
+        if setup is not None:
+            setup(index)
+        start = time.perf_counter()
+        function()
+        if index:
+            timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "runs": len(timings),
+        "min_ms": round(min(timings), 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+    }
+
+
+def environment(rows: int) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import django
+    import pydantic
+    from api.renderers import orjson
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "rows": rows,
+        "python": platform.python_version(),
+        "django": django.__version__,
+        "pydantic": pydantic.VERSION,
+        "orjson": orjson.__version__ if orjson else None,
+        "machine": f"{platform.system()} {platform.machine()}",
+    }
+
+
+# --- import ---------------------------------------------------------------
+
+def run_import(path: Path, rows: int, workers: list[int], batch_size: int) -> dict:
+    from django.core.management import call_command
+    from pokemon.models import Pokemon
+
+    def import_file(workers: int) -> None:
+        call_command("importpokemon", path=path, workers=workers, batch_size=batch_size, stdout=StringIO())
+
+    def empty_table(_) -> None:
+        Pokemon.objects.all().delete()
+
+    results = {}
+    for count in workers:
+        # One timed run each: a run over 1M rows is long enough to be stable.
+        results[f"import/insert/rows={rows}/workers={count}"] = measure(lambda: import_file(count), 1, empty_table)
+        results[f"import/upsert/rows={rows}/workers={count}"] = measure(lambda: import_file(count), 1)
+    for result in results.values():
+        result["rows_per_s"] = round(rows / (result["median_ms"] / 1000))
+    return results
+
+
+# --- schemas --------------------------------------------------------------
+
+def schema_samples() -> dict[type, list[Any]]:
+    """Base objects of each schema of api/schemas.py, repeated up to the benchmarked sizes."""
+    from api import schemas
+    from pokemon.models import Generation, Pokemon, PokemonName, Type
+
+    pokemons = list(Pokemon.objects.for_schema().order_by("id")[:1000])
+    stats = ["hp", "attack", "defense", "special_attack", "special_defense", "speed"]
+    creations = [
+        {
+            **{field: getattr(pokemon, field) for field in ["number", "name", "version", "legendary"] + stats},
+            "type1_name": pokemon.type1.name,
+            "type2_name": pokemon.type2.name if pokemon.type2 else None,
+            "generation_number": pokemon.generation.number,
+        }
+        for pokemon in pokemons
+    ]
+    types = list(Type.objects.all())
+    names = list(PokemonName.objects.all()[:1000]) or [PokemonName(number=1, language="en", name="Bulbasaur")]
+    return {
+        schemas.SumSchema: [{"x": 1.5, "y": 2}],
+        schemas.TypeSchema: types,
+        schemas.TypeCreationSchema: [{"name": type.name, "description": type.description} for type in types],
+        schemas.GenerationSchema: list(Generation.objects.all()),
+        schemas.PokemonSchema: pokemons,
+        schemas.PokemonCreateSchema: creations,
+        schemas.PokemonSchemaMini: list(Pokemon.objects.for_mini_schema().order_by("id")[:1000]),
+        schemas.PokemonSearchSchema: [{"min_attack": 50, "max_speed": 120, "type": "Dragon", "legendary": False}],
+        schemas.PokemonSearchOrderSchema: [{"order_by": "-speed"}],
+        schemas.StatWeightsSchema: [dict(zip(stats, [1, 2, 1, 0.5, 1, 1.5]))],
+        schemas.PokemonValueSchema: [
+            {"id": pokemon.id, "number": pokemon.number, "name": pokemon.name, "version": pokemon.version, "value": 1.5}
+            for pokemon in pokemons
+        ],
+        schemas.MatchupRequestSchema: [{"attackers": ["Fire", "Water"], "defenders": [pokemon.id for pokemon in pokemons[:100]]}],
+        schemas.MatchupSchema: [{"attackers": ["Fire", "Water"], "defenders": [1, 2, 3], "multipliers": [[2, 1, 0.5], [0.5, 2, 1]]}],
+        schemas.PokemonNameMatchSchema: [
+            {"number": name.number, "language": name.language, "name": name.name, "exact": False} for name in names
+        ],
+        schemas.PokemonKeySchema: [{"number": pokemon.number, "version": pokemon.version} for pokemon in pokemons],
+        # Each object of a batch schema is a whole request or response: a team of six.
+        schemas.ViewManyRequestSchema: [{"keys": [{"number": pokemon.number, "version": pokemon.version} for pokemon in pokemons[:6]]}],
+        schemas.ViewManyItemSchema: [
+            {"number": pokemon.number, "version": pokemon.version, "found": True, "pokemon": pokemon} for pokemon in pokemons
+        ],
+        schemas.ViewManySchema: [
+            {"items": [{"number": pokemon.number, "version": pokemon.version, "found": True, "pokemon": pokemon} for pokemon in pokemons[:6]]}
+        ],
+        schemas.PokemonFuzzyMatchSchema: [
+            {"number": name.number, "pokemon_id": None, "name": name.name, "language": name.language, "score": 0.8}
+            for name in names
+        ],
+    }
+
+
+def run_schemas(sizes: list[int], repeat: int) -> dict:
+    from ninja import Schema
+    from pydantic import TypeAdapter
+    from api import schemas
+
+    samples = schema_samples()
+    declared = [
+        value for value in vars(schemas).values()
+        if isinstance(value, type) and issubclass(value, Schema) and value.__module__ == schemas.__name__
+    ]
+    missing = [schema.__name__ for schema in declared if schema not in samples]
+    if missing:
+        raise SystemExit(f"No benchmark sample for {', '.join(missing)}: add them to schema_samples.")
+
+    results = {}
+    for schema, base in samples.items():
+        adapter = TypeAdapter(list[schema])
+        for size in sizes:
+            objects = [base[index % len(base)] for index in range(size)]
+            results[f"schemas/{schema.__name__}/{size}"] = measure(
+                lambda: adapter.dump_python(adapter.validate_python(objects), mode="json"), repeat,
+            )
+    return results
+
+
+# --- endpoints ------------------------------------------------------------
+
+def endpoint_requests(context: dict) -> dict[str, dict]:
+    """
+    The request of each route, keyed by "METHOD /api/path/{param}".
+
+    Entries: url, body (JSON), auth (a function of the iteration returning the
+    headers), setup (a function of the iteration, run untimed), status.
+    A url or a body may be a function of the iteration, for the routes that create rows.
+    """
+    from pokemon.models import Type
+
+    key = lambda index: {"X-API-Key": context["api_key"]}
+    jwt = lambda index: {"Authorization": f"Bearer {context['access_token']}"}
+    basic = lambda index: {"Authorization": f"Basic {context['basic']}"}
+    cookie = lambda index: {"Cookie": f"{context['refresh_cookie']}={context['refresh_token']}"}
+    credentials = {"username": "benchmark", "password": "benchmark"}
+    pokemon, ids = context["pokemon"], context["ids"]
+
+    def new_pokemon(index: int) -> dict:
+        # Unique on (number, name, version); numbers stay in the range of pokemon/analytics.py.
+        return {
+            "number": 900 + index % 100, "name": f"Bench{index}", "version": "Benchmark",
+            "type1_name": "Steel", "type2_name": None, "generation_number": 1, "legendary": False,
+            "hp": 50, "attack": 60, "defense": 70, "special_attack": 80, "special_defense": 90, "speed": 100,
+        }
+
+    def fresh_token(index: int) -> None:
+        # The token of the previous iteration was revoked by the logout.
+        from ninja_simple_jwt.jwt.token_operations import get_access_token_for_user
+        context["logout_token"], _ = get_access_token_for_user(context["user"])
+
+    read_routes = {
+        "GET /api/pokemon/view/{number}": {"url": "/api/pokemon/view/25", "auth": key},
+        "GET /api/pokemon/view-all/{number}": {"url": "/api/pokemon/view-all/3", "auth": jwt},
+        "GET /api/pokemon/search": {"url": "/api/pokemon/search?type=Dragon&min_total=500", "auth": key},
+        "GET /api/type/list": {"url": "/api/type/list"},
+        "GET /api/type/view/{name}": {"url": "/api/type/view/Steel"},
+        "GET /api/querysets/pokemons": {"url": "/api/querysets/pokemons?page=5"},
+        "GET /api/querysets/pokemons/cursor": {"url": "/api/querysets/pokemons/cursor?page_size=50"},
+    }
+    return {
+        "GET /api/basics/": {"url": "/api/basics/?a=1&b=2"},
+        "GET /api/basics/users/{id}": {"url": f"/api/basics/users/{context['user'].pk}"},
+        "POST /api/basics/sum": {"url": "/api/basics/sum", "body": {"x": 1.5, "y": 2}},
+        "GET /api/basics/sum2/{x}/{y}": {"url": "/api/basics/sum2/1.5/2"},
+        **read_routes,
+        "POST /api/pokemon/view-many": {
+            "url": "/api/pokemon/view-many", "auth": key,
+            "body": {"keys": [{"number": number} for number in range(1, 29)] + [{"number": 6, "version": "Mega Charizard X"}, {"number": 9999}]},
+        },
+        "GET /api/pokemon/lookup": {"url": "/api/pokemon/lookup?q=pika", "auth": key},
+        "GET /api/pokemon/fuzzy": {"url": "/api/pokemon/fuzzy?q=pikachoo", "auth": key},
+        "POST /api/pokemon/bulk": {
+            "url": "/api/pokemon/bulk", "auth": key,
+            "body": lambda index: [new_pokemon(1_000_000 + index * 100 + item) for item in range(100)],
+        },
+        "GET /api/querysets/pokemons/export": {"url": "/api/querysets/pokemons/export?format=ndjson"},
+        "POST /api/querysets/pokemon/create": {"url": "/api/querysets/pokemon/create", "body": new_pokemon},
+        "POST /api/type/create": {"url": "/api/type/create", "body": {"name": "Steel", "description": "Steel type."}},
+        "POST /api/type/bulk": {
+            "url": "/api/type/bulk", "body": [{"name": name, "description": f"{name} type."} for name in context["types"]],
+        },
+        "PUT /api/type/edit/{name}": {
+            "url": "/api/type/edit/Steel", "method": "put",
+            "body": {"id": context["steel"], "name": "Steel", "description": "Edited."},
+        },
+        "DELETE /api/type/delete/{name}": {
+            "url": lambda index: f"/api/type/delete/Bench{index}", "method": "delete",
+            "setup": lambda index: Type.objects.create(name=f"Bench{index}", description=""),
+        },
+        "GET /api/type/cache/stats": {"url": "/api/type/cache/stats"},
+        "GET /api/analytics/top": {"url": "/api/analytics/top?k=10&attack=2&speed=1.5", "auth": key},
+        "GET /api/analytics/percentiles": {"url": "/api/analytics/percentiles?stat=speed", "auth": key},
+        "GET /api/analytics/nearest/{id}": {"url": f"/api/analytics/nearest/{pokemon.id}?k=10", "auth": key},
+        "POST /api/analytics/matchups": {
+            "url": "/api/analytics/matchups", "auth": key, "body": {"attackers": ["Fire", "Water", "Electric"], "defenders": ids},
+        },
+        # The async versions of the read routes (api/asynchronous.py).
+        **{
+            route.replace(" /api/", " /api/async/"): {**entry, "url": entry["url"].replace("/api/", "/api/async/", 1)}
+            for route, entry in read_routes.items()
+        },
+        "GET /api/auth/basic": {"url": "/api/auth/basic", "auth": basic},
+        "GET /api/auth/key": {"url": "/api/auth/key", "auth": key},
+        "POST /api/auth/logout": {
+            "url": "/api/auth/logout", "setup": fresh_token,
+            "auth": lambda index: {"Authorization": f"Bearer {context['logout_token']}"},
+        },
+        "POST /api/auth/mobile/sign-in": {"url": "/api/auth/mobile/sign-in", "body": credentials},
+        "POST /api/auth/mobile/token-refresh": {"url": "/api/auth/mobile/token-refresh", "body": {"refresh": context["refresh_token"]}},
+        "POST /api/auth/web/sign-in": {"url": "/api/auth/web/sign-in", "body": credentials},
+        "POST /api/auth/web/token-refresh": {"url": "/api/auth/web/token-refresh", "auth": cookie},
+        "POST /api/auth/web/sign-out": {"url": "/api/auth/web/sign-out", "auth": cookie, "status": 204},
+    }
+
+
+def api_routes() -> list[str]:
+    """Every "METHOD /api/path" of the routers of api/ninja.py."""
+    from api.ninja import api
+
+    routes = []
+    for prefix, router in api._routers:
+        for path, path_view in router.path_operations.items():
+            for operation in path_view.operations:
+                for method in operation.methods:
+                    routes.append(f"{method} " + re.sub("/+", "/", f"/api/{prefix}/{path}"))
+    return routes
+
+
+def endpoint_context() -> dict:
+    """The user, credentials and JWT key pair of the endpoint requests."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from django.contrib.auth.models import User
+    from ninja_apikey.models import APIKey
+    from ninja_apikey.security import generate_key
+    from ninja_simple_jwt.jwt.key_retrieval import InMemoryJwtKeyPair
+    from ninja_simple_jwt.jwt.token_operations import get_access_token_for_user, get_refresh_token_for_user
+    from ninja_simple_jwt.settings import ninja_simple_jwt_settings
+    from pokemon.models import Pokemon, Type
+
+    # A throw-away key pair instead of the key files of the project.
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    InMemoryJwtKeyPair._private_key = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    InMemoryJwtKeyPair._public_key = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    user = User.objects.create_user("benchmark", password="benchmark")
+    prefix, key, hashed_key = generate_key()
+    APIKey.objects.create(prefix=prefix, hashed_key=hashed_key, user=user, label="benchmark")
+    return {
+        "user": user,
+        "api_key": f"{prefix}.{key}",
+        "access_token": get_access_token_for_user(user)[0],
+        "refresh_token": get_refresh_token_for_user(user)[0],
+        "refresh_cookie": ninja_simple_jwt_settings.JWT_REFRESH_COOKIE_NAME,
+        "basic": base64.b64encode(b"benchmark:benchmark").decode(),
+        "pokemon": Pokemon.objects.order_by("id").first(),
+        "ids": list(Pokemon.objects.order_by("id").values_list("id", flat=True)[:100]),
+        "types": list(Type.objects.values_list("name", flat=True)),
+        "steel": Type.objects.get(name="Steel").pk,
+    }
+
+
+def run_endpoints(repeat: int) -> dict:
+    from django.test import Client
+    from django.test.utils import override_settings, setup_test_environment
+
+    # Allows the test client's "testserver" host.
+    setup_test_environment()
+    requests = endpoint_requests(endpoint_context())
+    missing = [route for route in api_routes() if route not in requests]
+    if missing:
+        raise SystemExit(f"No benchmark request for {', '.join(missing)}: add them to endpoint_requests.")
+
+    client = Client()
+    results = {}
+    # No sampled log lines in the output.
+    with override_settings(LOG_SAMPLE_RATE=0):
+        for route, entry in requests.items():
+            iteration = {"index": 0}
+            expected = entry.get("status", 200)
+
+            def setup(index: int, entry=entry) -> None:
+                iteration["index"] = index
+                if "setup" in entry:
+                    entry["setup"](index)
+
+            def call(entry=entry, expected=expected, route=route) -> None:
+                index = iteration["index"]
+                url = entry["url"](index) if callable(entry["url"]) else entry["url"]
+                headers = entry["auth"](index) if "auth" in entry else {}
+                method = getattr(client, entry.get("method", "post" if "body" in entry or route.startswith("POST") else "get"))
+                if "body" in entry:
+                    body = entry["body"](index) if callable(entry["body"]) else entry["body"]
+                    response = method(url, json.dumps(body), content_type="application/json", headers=headers)
+                else:
+                    response = method(url, headers=headers)
+                if response.streaming:
+                    b"".join(response.streaming_content)
+                if response.status_code != expected:
+                    raise AssertionError(f"{route}: {response.status_code} {response.content[:300]!r}")
+
+            results[f"endpoints/{route}"] = measure(call, repeat, setup)
+    return results
+
+
+# --- comparison -----------------------------------------------------------
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Prints the change of each median and returns the benchmarks slower by more than `threshold`."""
+    if baseline["environment"].get("rows") != current["environment"].get("rows"):
+        print(f"warning: {baseline['environment'].get('rows')} rows in the baseline, "
+              f"{current['environment'].get('rows')} in the current run.")
+    regressions = []
+    print(f"{'benchmark':<64} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before, after = baseline["results"][name]["median_ms"], result["median_ms"]
+        change = after / before - 1 if before else 0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<64} {before:>12.3f} {after:>12.3f} {change:>+7.1%}{flag}")
+    print(f"{len(regressions)} regression(s) above {threshold:.0%}.")
+    return regressions
+
+
+def load(path: Path) -> dict:
+    with path.open("r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=GROUPS)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="Workers of the import benchmarks.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--output", type=Path, help="JSON file of the results.")
+    parser.add_argument("--baseline", type=Path, help="Previous results to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown flagged as a regression (0.10: 10%%).")
+    parser.add_argument("--compare", type=Path, nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two result files, without running the suite.")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(load(args.compare[0]), load(args.compare[1]), args.threshold) else 0)
+
+    setup_django()
+    from django.core.management import call_command
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_synthetic_csv(Path(directory) / "pokemon.csv", args.rows)
+        if "import" in args.only:
+            results.update(run_import(path, args.rows, args.workers, args.batch_size))
+        else:
+            call_command("importpokemon", path=path, batch_size=args.batch_size, stdout=StringIO())
+    if "schemas" in args.only:
+        results.update(run_schemas(args.sizes, args.repeat))
+    if "endpoints" in args.only:
+        results.update(run_endpoints(args.repeat))
+
+    report = {"environment": environment(args.rows), "results": results}
+    print(f"{'benchmark':<64} {'median ms':>12} {'min ms':>12}")
+    for name, result in results.items():
+        print(f"{name:<64} {result['median_ms']:>12.3f} {result['min_ms']:>12.3f}")
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Results written to {args.output}.")
+    if args.baseline:
+        print()
+        sys.exit(1 if compare(load(args.baseline), report, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Helpers shared by the benchmark scripts."""
+
+import csv
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+POKEMON_CSV = BASE_DIR / "data" / "pokemon.csv"
+
+
+def setup_django():
+    """
+    Configures Django and creates a throw-away test database.
+
+    The benchmarks never touch the development database (db.sqlite3).
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+    import django
+    django.setup()
+    from django.db import connection
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+
+def make_synthetic_csv(path: Path, rows: int) -> Path:
+    """
+    Writes a pokemon csv file of `rows` rows built from data/pokemon.csv.
+
+    The original rows are repeated; each copy gets a version suffix
+    (e.g. "BulbasaurX12") so the (number, name, version) key stays unique.
+    """
+    with POKEMON_CSV.open("r", encoding="utf-8", newline="") as source:
+        reader = csv.reader(source)
+        header = next(reader)
+        originals = list(reader)
+    with path.open("w", encoding="utf-8", newline="") as target:
+        writer = csv.writer(target)
+        writer.writerow(header)
+        for index in range(rows):
+            copy, position = divmod(index, len(originals))
+            row = list(originals[position])
+            if copy:
+                row[1] = f"{row[1]}X{copy}"
+            writer.writerow(row)
+    return path
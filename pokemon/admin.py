@@ -1,8 +1,24 @@
 from django.contrib import admin
-from pokemon.models import Generation, Pokemon, Type
+from pokemon.fuzzy import fuzzy_index
+from pokemon.models import Generation, Pokemon, PokemonName, Type
 # Register your models here.
 # Enregistrer les modèles pour qu'ils soient accessibles dans l'interface d'administration
 
+
+class FuzzySearchMixin:
+    """
+    Admin search tolerant to typos: the rows of the species found by the fuzzy
+    index (see pokemon/fuzzy.py) are added to the usual `search_fields` results.
+    """
+    fuzzy_search_limit = 20
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            matches = fuzzy_index.get().search_species(search_term, limit=self.fuzzy_search_limit)
+            results |= queryset.filter(number__in=[match["number"] for match in matches])
+        return results, may_have_duplicates
+
 @admin.register(Type)
 class TypeAdmin(admin.ModelAdmin):
     """Admin configuration for Type model."""
@@ -16,8 +32,15 @@ class GenerationAdmin(admin.ModelAdmin):
 
 
 @admin.register(Pokemon)
-class PokemonAdmin(admin.ModelAdmin):
+class PokemonAdmin(FuzzySearchMixin, admin.ModelAdmin):
     """Admin configuration for Pokemon model."""
     list_display = ("pk", "number", "name", "version", "type1", "type2", "hp", "attack", "defense", "special_attack", "special_defense", "speed", "generation", "legendary")
     list_filter = ("type1","type2","generation","legendary")
-    search_fields = ("name", "version")
\ No newline at end of file
+    search_fields = ("name", "version")
+
+@admin.register(PokemonName)
+class PokemonNameAdmin(FuzzySearchMixin, admin.ModelAdmin):
+    """Admin configuration for PokemonName model."""
+    list_display = ("pk", "number", "language", "name")
+    list_filter = ("language",)
+    search_fields = ("name",)
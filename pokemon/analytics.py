@@ -0,0 +1,160 @@
+"""
+In-memory stat matrix for analytics queries.
+
+The stats of every Pokemon are loaded once in compact NumPy arrays; top-k,
+percentiles and nearest-neighbour queries are then answered with vectorized
+operations instead of pulling every row through the ORM on each request.
+
+The matrix is rebuilt lazily when the ChangeCounter versions of the tables it
+was built from change, i.e. after any save/delete (see pokemon/signals.py) or
+bulk import, in this process or in another one.
+"""
+
+import threading
+
+import numpy as np
+
+from pokemon.models import ChangeCounter, Generation, Pokemon, Type
+
+STATS = ["hp", "attack", "defense", "special_attack", "special_defense", "speed"]
+
+
+class StatMatrix:
+    """
+    Immutable snapshot of the Pokemon stats.
+
+    Row i of every array describes the same Pokemon:
+        ids, numbers      int64 / int16
+        stats             int16 (n, 6), columns in STATS order
+        type1, type2      int16 codes into type_names (-1 when there is no type2)
+        generations       int16 generation numbers
+        legendary         bool
+    """
+
+    def __init__(self, rows: list[tuple], type_names: dict[int, str], generation_numbers: dict[int, int]):
+        self.type_names = list(type_names.values())
+        type_codes = {pk: code for code, pk in enumerate(type_names)}
+        type_codes[None] = -1
+        columns = list(zip(*rows)) or [()] * (8 + len(STATS))
+        pks, numbers, names, versions, type1, type2, generations, legendary = columns[:8]
+        self.ids = np.array(pks, dtype=np.int64)
+        self.numbers = np.array(numbers, dtype=np.int16)
+        self.stats = np.array(columns[8:], dtype=np.int16).T.reshape(len(rows), len(STATS))
+        self.type1 = np.array([type_codes[pk] for pk in type1], dtype=np.int16)
+        self.type2 = np.array([type_codes[pk] for pk in type2], dtype=np.int16)
+        self.generations = np.array([generation_numbers[pk] for pk in generations], dtype=np.int16)
+        self.legendary = np.array(legendary, dtype=bool)
+        self.labels: list[tuple[str, str]] = list(zip(names, versions))
+        self.rows = {pk: row for row, pk in enumerate(pks)}
+
+    @classmethod
+    def load(cls) -> "StatMatrix":
+        """Reads the three tables (one query each)."""
+        rows = list(Pokemon.objects.order_by("id").values_list(
+            "id", "number", "name", "version", "type1_id", "type2_id", "generation_id", "legendary", *STATS
+        ))
+        type_names = dict(Type.objects.order_by("id").values_list("id", "name"))
+        generation_numbers = dict(Generation.objects.values_list("id", "number"))
+        return cls(rows, type_names, generation_numbers)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def describe(self, row: int, value: float) -> dict:
+        name, version = self.labels[row]
+        return {
+            "id": int(self.ids[row]),
+            "number": int(self.numbers[row]),
+            "name": name,
+            "version": version,
+            "value": float(value),
+        }
+
+    def mask(self, type: str | None = None, generation: int | None = None, legendary: bool | None = None) -> np.ndarray:
+        """Boolean mask of the rows matching the filters (None means no filter)."""
+        mask = np.ones(len(self), dtype=bool)
+        if type is not None:
+            if type not in self.type_names:
+                return np.zeros(len(self), dtype=bool)
+            code = self.type_names.index(type)
+            mask &= (self.type1 == code) | (self.type2 == code)
+        if generation is not None:
+            mask &= self.generations == generation
+        if legendary is not None:
+            mask &= self.legendary == legendary
+        return mask
+
+    def top_k(self, weights: list[float], k: int, mask: np.ndarray | None = None) -> list[dict]:
+        """The k rows with the highest weighted stat score, best first."""
+        scores = self.stats @ np.asarray(weights, dtype=np.float64)
+        candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        k = min(k, len(candidates))
+        if k == 0:
+            return []
+        # argpartition is O(n): only the k selected scores are sorted.
+        best = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        best = best[np.lexsort((self.ids[best], -scores[best]))]
+        return [self.describe(row, scores[row]) for row in best]
+
+    def column(self, stat: str) -> np.ndarray:
+        if stat == "total":
+            return self.stats.sum(axis=1, dtype=np.int32)
+        return self.stats[:, STATS.index(stat)]
+
+    def percentiles(self, stat: str, percentiles: list[float]) -> dict[str, dict[str, float]]:
+        """Percentiles of a stat (or the total) among the Pokemon of each type."""
+        values = self.column(stat)
+        result = {}
+        for code, name in enumerate(self.type_names):
+            selected = values[(self.type1 == code) | (self.type2 == code)]
+            if len(selected):
+                result[name] = {
+                    f"{percentile:g}": float(value)
+                    for percentile, value in zip(percentiles, np.percentile(selected, percentiles))
+                }
+        return result
+
+    def nearest(self, pk: int, k: int) -> list[dict]:
+        """
+        The k Pokemon closest to `pk` by Euclidean distance on the six stats.
+
+        Raises:
+            KeyError: If there is no Pokemon `pk`.
+        """
+        row = self.rows[pk]
+        differences = self.stats.astype(np.float64) - self.stats[row]
+        distances = np.sqrt(np.einsum("ij,ij->i", differences, differences))
+        distances[row] = np.inf
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            return []
+        closest = np.argpartition(distances, k - 1)[:k]
+        closest = closest[np.lexsort((self.ids[closest], distances[closest]))]
+        return [self.describe(other, distances[other]) for other in closest]
+
+
+class StatMatrixCache:
+    """Holds the current StatMatrix of the process, rebuilt when the data changes."""
+
+    tables = [Pokemon._meta.db_table, Type._meta.db_table, Generation._meta.db_table]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matrix: StatMatrix | None = None
+        self._versions = None
+
+    def get(self) -> StatMatrix:
+        """Returns the matrix, costing a single query when it is up to date."""
+        versions = sorted(ChangeCounter.objects.filter(table__in=self.tables).values_list("table", "version"))
+        with self._lock:
+            if self._matrix is None or versions != self._versions:
+                self._matrix = StatMatrix.load()
+                self._versions = versions
+            return self._matrix
+
+    def clear(self) -> None:
+        with self._lock:
+            self._matrix = self._versions = None
+
+
+stat_matrix = StatMatrixCache()
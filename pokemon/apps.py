@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PokemonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pokemon'
+
+    def ready(self):
+        # Connect the signal receivers (cache invalidation)
+        from pokemon import signals  # noqa: F401
@@ -0,0 +1,196 @@
+"""
+Versioned caches for rarely modified data.
+
+A VersionedCache has two tiers:
+    - an in-process LRU with a TTL (no network, no serialization),
+    - an optional Django cache backend (settings.CACHES alias) shared by the workers.
+Every key includes a version counter; bumping it (see pokemon/signals.py) invalidates
+all the entries at once, without having to know which keys were stored.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Distinguishes a cached None from a missing entry.
+MISSING = object()
+
+
+class VersionedCache:
+    """
+    Two-tier cache invalidated by a version counter.
+
+    When a backend is configured, the version lives in it so that a bump in one
+    process invalidates the local tier of every process; otherwise the version is
+    local and other processes see the change after at most `ttl` seconds.
+    """
+
+    def __init__(self, namespace: str, ttl: float = 300, maxsize: int = 1024, backend: str | None = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.backend = backend
+        self._local: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._version = 1
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "backend_hits": 0, "misses": 0, "invalidations": 0}
+
+    @property
+    def version_key(self) -> str:
+        return f"{self.namespace}:version"
+
+    @property
+    def version(self) -> int:
+        if self.backend is None:
+            return self._version
+        backend = caches[self.backend]
+        version = backend.get(self.version_key)
+        if version is None:
+            backend.add(self.version_key, 1, timeout=None)
+            version = backend.get(self.version_key, 1)
+        return version
+
+    async def aversion(self) -> int:
+        if self.backend is None:
+            return self._version
+        backend = caches[self.backend]
+        version = await backend.aget(self.version_key)
+        if version is None:
+            await backend.aadd(self.version_key, 1, timeout=None)
+            version = await backend.aget(self.version_key, 1)
+        return version
+
+    def bump(self) -> None:
+        """Invalidates every entry of the cache."""
+        with self._lock:
+            self._version += 1
+            self._local.clear()
+            self._stats["invalidations"] += 1
+        if self.backend is not None:
+            backend = caches[self.backend]
+            backend.add(self.version_key, 1, timeout=None)
+            try:
+                backend.incr(self.version_key)
+            except ValueError:
+                # The key expired between add and incr.
+                backend.set(self.version_key, 2, timeout=None)
+
+    def get_or_set(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Returns the cached value of `key`, calling `compute` on a miss."""
+        key = f"{self.namespace}:{self.version}:{key}"
+        now = time.monotonic()
+        value = self._get_local(key, now)
+        if value is not MISSING:
+            return value
+
+        if self.backend is not None:
+            value = caches[self.backend].get(key, MISSING)
+            if value is not MISSING:
+                self._stats["backend_hits"] += 1
+                self._store(key, value, now)
+                return value
+
+        self._stats["misses"] += 1
+        value = compute()
+        if self.backend is not None:
+            caches[self.backend].set(key, value, timeout=self.ttl)
+        self._store(key, value, now)
+        return value
+
+    async def aget_or_set(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Async version of get_or_set, `compute` being a coroutine function."""
+        key = f"{self.namespace}:{await self.aversion()}:{key}"
+        now = time.monotonic()
+        value = self._get_local(key, now)
+        if value is not MISSING:
+            return value
+
+        if self.backend is not None:
+            value = await caches[self.backend].aget(key, MISSING)
+            if value is not MISSING:
+                self._stats["backend_hits"] += 1
+                self._store(key, value, now)
+                return value
+
+        self._stats["misses"] += 1
+        value = await compute()
+        if self.backend is not None:
+            await caches[self.backend].aset(key, value, timeout=self.ttl)
+        self._store(key, value, now)
+        return value
+
+    def get(self, key: str) -> Any:
+        """Returns the cached value of `key`, or MISSING."""
+        key = f"{self.namespace}:{self.version}:{key}"
+        now = time.monotonic()
+        value = self._get_local(key, now)
+        if value is MISSING and self.backend is not None:
+            value = caches[self.backend].get(key, MISSING)
+            if value is not MISSING:
+                self._stats["backend_hits"] += 1
+                self._store(key, value, now)
+        if value is MISSING:
+            self._stats["misses"] += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        """Stores `value` for `ttl` seconds (default: the ttl of the cache)."""
+        key = f"{self.namespace}:{self.version}:{key}"
+        ttl = self.ttl if ttl is None else ttl
+        if self.backend is not None:
+            caches[self.backend].set(key, value, timeout=ttl)
+        self._store(key, value, time.monotonic(), ttl)
+
+    def _get_local(self, key: str, now: float) -> Any:
+        with self._lock:
+            expires, value = self._local.get(key, (0, MISSING))
+            if expires > now:
+                self._local.move_to_end(key)
+                self._stats["local_hits"] += 1
+                return value
+        return MISSING
+
+    def _store(self, key: str, value: Any, now: float, ttl: float | None = None) -> None:
+        with self._lock:
+            self._local[key] = (now + (self.ttl if ttl is None else ttl), value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss counters of this process, plus the current size and version."""
+        with self._lock:
+            return {**self._stats, "size": len(self._local), "version": self._version}
+
+    def clear(self) -> None:
+        """Empties the local tier and resets the counters."""
+        with self._lock:
+            self._local.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+
+
+# Cache of the reference data (Type, Generation), invalidated on every save/delete.
+reference_cache = VersionedCache("reference", **{
+    name.lower(): value for name, value in getattr(settings, "REFERENCE_CACHE", {}).items()
+})
+
+# Cache of the verified API keys (see api/authentification.py), invalidated when a key or a user changes.
+api_key_cache = VersionedCache("apikey", **{
+    name.lower(): value for name, value in getattr(settings, "API_KEY_CACHE", {}).items()
+})
+
+# Cache of the verified Basic auth credentials (see api/authentification.py), invalidated when a user changes.
+credentials_cache = VersionedCache("credentials", **{
+    name.lower(): value for name, value in getattr(settings, "CREDENTIALS_CACHE", {}).items()
+})
+
+# Cache of the rendered responses of the routes decorated with api.response_cache.cache_response,
+# invalidated when a Pokemon, a type or a generation changes.
+response_cache = VersionedCache("response", **{
+    name.lower(): value for name, value in getattr(settings, "RESPONSE_CACHE", {}).items()
+})
@@ -0,0 +1,74 @@
+"""
+Type effectiveness engine.
+
+The 18x18 chart of data/type-effectiveness.csv (rows: attacking type, columns:
+defending type) is loaded once in a dense NumPy array. Against a dual-type
+defender the multipliers of both types are multiplied; a batch of N attacking
+types against M defenders is computed in a single vectorized pass.
+"""
+
+import csv
+from collections import defaultdict
+from functools import cache
+from pathlib import Path
+
+import numpy as np
+
+CHART_PATH: Path = Path(__file__).parent.parent / "data" / "type-effectiveness.csv"
+
+
+class EffectivenessChart:
+    """
+    Dense effectiveness matrix.
+
+    `matrix` has one extra column of ones, used as the "type" of single-type
+    defenders (code -1), so type2 needs no special case.
+    """
+
+    def __init__(self, types: list[str], multipliers: list[list[float]]):
+        if len(multipliers) != len(types) or any(len(row) != len(types) for row in multipliers):
+            raise ValueError("The effectiveness chart must be a square matrix.")
+        self.types = types
+        self.codes = {name: code for code, name in enumerate(types)}
+        self.matrix = np.ones((len(types), len(types) + 1), dtype=np.float32)
+        self.matrix[:, :-1] = multipliers
+
+    @classmethod
+    def load(cls, path: Path = CHART_PATH) -> "EffectivenessChart":
+        with path.open("r", encoding="utf-8", newline="") as file:
+            reader = csv.reader(file)
+            types = next(reader)[1:]
+            rows = {row[0]: [float(value) for value in row[1:]] for row in reader}
+        # Rows may be listed in any order: align them on the columns.
+        return cls(types, [rows[name] for name in types])
+
+    def encode(self, names: list[str | None], default: int | None = None) -> np.ndarray:
+        """
+        Converts type names to codes (None -> -1).
+
+        Args:
+            default: Code of the names missing from the chart. With -1, they defend
+                like no type at all (x1 against every attacking type).
+
+        Raises:
+            KeyError: If a name is not in the chart and no default is given.
+        """
+        codes = self.codes if default is None else defaultdict(lambda: default, self.codes)
+        return np.array([codes[name] if name is not None else -1 for name in names], dtype=np.intp)
+
+    def multipliers(self, attackers: np.ndarray, type1: np.ndarray, type2: np.ndarray) -> np.ndarray:
+        """
+        Multipliers of N attacking types against M defenders, as an (N, M) array.
+
+        Args:
+            attackers: (N,) codes of the attacking types.
+            type1, type2: (M,) codes of the defender types, -1 for no second type.
+        """
+        rows = self.matrix[attackers]
+        return rows[:, type1] * rows[:, type2]
+
+
+@cache
+def get_chart() -> EffectivenessChart:
+    """The chart shipped in data/, loaded on first use."""
+    return EffectivenessChart.load()
@@ -0,0 +1,102 @@
+"""
+Streaming export of the Pokemon table.
+
+Rows are read with a single JOIN query consumed through a server-side
+iterator (`.iterator(chunk_size=...)`), encoded as NDJSON or CSV one chunk
+at a time and optionally gzip-compressed on the fly: the memory used does
+not depend on the size of the table. The same generators back the
+/api/querysets/pokemons/export endpoint and the exportpokemon command.
+"""
+
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator, Literal
+
+from pokemon.models import Pokemon
+
+ExportFormat = Literal["ndjson", "csv"]
+
+# Output column -> ORM lookup (the relations are joined in the same query).
+COLUMNS = {
+    "id": "id",
+    "number": "number",
+    "name": "name",
+    "version": "version",
+    "type1": "type1__name",
+    "type2": "type2__name",
+    "total": "total",
+    "hp": "hp",
+    "attack": "attack",
+    "defense": "defense",
+    "special_attack": "special_attack",
+    "special_defense": "special_defense",
+    "speed": "speed",
+    "generation": "generation__number",
+    "legendary": "legendary",
+}
+
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# Number of rows fetched from the database cursor at a time.
+CHUNK_SIZE = 2000
+
+
+def export_rows(chunk_size: int = CHUNK_SIZE) -> Iterator[tuple]:
+    """Yields every pokemon as a tuple in COLUMNS order, sorted by number."""
+    queryset = Pokemon.objects.order_by("number", "id").values_list(*COLUMNS.values())
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def encode_ndjson(rows: Iterable[tuple], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """One JSON object per line, yielded by chunks of `chunk_size` lines."""
+    columns = list(COLUMNS)
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), ensure_ascii=False, separators=(",", ":")))
+        if len(lines) >= chunk_size:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def encode_csv(rows: Iterable[tuple], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """A header line then one line per row, yielded by chunks of `chunk_size` lines."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+ENCODERS = {"ndjson": encode_ndjson, "csv": encode_csv}
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compresses a stream of chunks into a gzip stream, without buffering it."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(format: ExportFormat = "ndjson", compress: bool = False, rows: Iterable[tuple] | None = None) -> Iterator[bytes]:
+    """
+    The export pipeline: rows -> NDJSON/CSV chunks -> gzip (optional).
+
+    `rows` defaults to the whole table (export_rows).
+    """
+    chunks = ENCODERS[format](export_rows() if rows is None else rows)
+    return gzip_stream(chunks) if compress else chunks
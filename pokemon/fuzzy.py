@@ -0,0 +1,214 @@
+"""
+Typo-tolerant name search with an in-memory trigram index.
+
+Every Pokemon name (with its version) and every translated name is split in
+trigrams of its normalized form, padded like pg_trgm ("  pik", ...). A query is
+scored against the names sharing at least one trigram with it, by the
+similarity shared / (query trigrams + name trigrams - shared), so no database
+extension is needed and SQLite works.
+
+The index of the process is kept up to date in place by the save/delete
+signals (see pokemon/signals.py); a change it did not see (bulk import,
+another process) is detected through the ChangeCounter versions and triggers
+a full rebuild on the next search.
+"""
+
+import heapq
+import threading
+from collections import Counter, defaultdict
+from typing import Hashable
+
+from pokemon.models import ChangeCounter, Pokemon, PokemonName
+from pokemon.names import LANGUAGES, normalize
+
+# Default minimal similarity of a match (pg_trgm uses the same default).
+THRESHOLD = 0.3
+
+LANGUAGE_RANKS = {language: rank for rank, language in enumerate(LANGUAGES)}
+
+
+def trigrams(text: str) -> frozenset[str]:
+    """Trigrams of the normalized text, padded with two spaces before and one after."""
+    text = normalize(text)
+    if not text:
+        return frozenset()
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """
+    Inverted index from trigrams to documents.
+
+    A document is a key (any hashable), a text and a payload dict returned
+    with the matches. Documents can be added and removed one by one.
+    """
+
+    def __init__(self):
+        self.documents: dict[Hashable, tuple[str, frozenset[str], dict]] = {}
+        self.postings: dict[str, set[Hashable]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, key: Hashable, text: str, **payload) -> None:
+        self.remove(key)
+        grams = trigrams(text)
+        if not grams:
+            return
+        self.documents[key] = (text, grams, payload)
+        for gram in grams:
+            self.postings[gram].add(key)
+
+    def remove(self, key: Hashable) -> None:
+        document = self.documents.pop(key, None)
+        if document is None:
+            return
+        for gram in document[1]:
+            keys = self.postings[gram]
+            keys.discard(key)
+            if not keys:
+                del self.postings[gram]
+
+    def scores(self, query: str, threshold: float = THRESHOLD) -> list[tuple[float, Hashable]]:
+        """(similarity, key) of the documents at least `threshold` similar to the query, unordered."""
+        grams = trigrams(query)
+        if not grams:
+            return []
+        counts = Counter()
+        for gram in grams:
+            counts.update(self.postings.get(gram, ()))
+        size = len(grams)
+        # similarity <= shared / size: documents sharing fewer trigrams cannot reach the threshold.
+        minimum = threshold * size
+        result = []
+        for key, shared in counts.items():
+            if shared >= minimum:
+                score = shared / (size + len(self.documents[key][1]) - shared)
+                if score >= threshold:
+                    result.append((score, key))
+        return result
+
+    def search(self, query: str, limit: int = 10, threshold: float = THRESHOLD) -> list[dict]:
+        """The `limit` most similar documents, best first: payload plus text and score."""
+        best = heapq.nlargest(limit, self.scores(query, threshold), key=lambda match: match[0])
+        return [self.match(key, score) for score, key in best]
+
+    def match(self, key: Hashable, score: float) -> dict:
+        text, _, payload = self.documents[key]
+        return {**payload, "name": text, "score": round(score, 4)}
+
+
+def pokemon_text(name: str, version: str) -> str:
+    """Searchable text of a Pokemon: its version when it contains the name ("Mega Venusaur")."""
+    if not version:
+        return name
+    return version if name in version else f"{name} {version}"
+
+
+class PokemonFuzzyIndex(TrigramIndex):
+    """Trigram index of the Pokemon names (as English) and of the translated names."""
+
+    @classmethod
+    def load(cls) -> "PokemonFuzzyIndex":
+        index = cls()
+        for pk, number, name, version in Pokemon.objects.values_list("id", "number", "name", "version"):
+            index.add_pokemon(pk, number, name, version)
+        for pk, number, language, name in PokemonName.objects.values_list("id", "number", "language", "name"):
+            index.add_name(pk, number, language, name)
+        return index
+
+    def add_pokemon(self, pk: int, number: int, name: str, version: str) -> None:
+        self.add(("pokemon", pk), pokemon_text(name, version), number=number, pokemon_id=pk, language="en")
+
+    def add_name(self, pk: int, number: int, language: str, name: str) -> None:
+        self.add(("name", pk), name, number=number, pokemon_id=None, language=language)
+
+    def search_species(self, query: str, limit: int = 10, language: str | None = None, threshold: float = THRESHOLD) -> list[dict]:
+        """
+        Best match of each species (number), best first.
+
+        On equal scores a Pokemon row wins over a translated name, so the
+        result carries a pokemon id when there is one, then the languages
+        follow the LANGUAGES order.
+        """
+        matches = self.scores(query, threshold)
+        if language is not None:
+            matches = [(score, key) for score, key in matches if self.documents[key][2]["language"] == language]
+
+        def rank(match):
+            score, key = match
+            payload = self.documents[key][2]
+            language_rank = LANGUAGE_RANKS.get(payload["language"], len(LANGUAGE_RANKS))
+            return (-score, key[0] != "pokemon", language_rank, payload["number"])
+
+        matches.sort(key=rank)
+        result, seen = [], set()
+        for score, key in matches:
+            number = self.documents[key][2]["number"]
+            if number not in seen:
+                seen.add(number)
+                result.append(self.match(key, score))
+                if len(result) == limit:
+                    break
+        return result
+
+
+class FuzzyIndexCache:
+    """Holds the fuzzy index of the process, updated in place on saves and rebuilt on unseen changes."""
+
+    tables = {Pokemon: Pokemon._meta.db_table, PokemonName: PokemonName._meta.db_table}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: PokemonFuzzyIndex | None = None
+        self._versions: dict[str, int] = {}
+
+    def versions(self) -> dict[str, int]:
+        return dict(ChangeCounter.objects.filter(table__in=self.tables.values()).values_list("table", "version"))
+
+    def get(self) -> PokemonFuzzyIndex:
+        """Returns the index, costing a single query when it is up to date."""
+        versions = self.versions()
+        with self._lock:
+            if self._index is None or versions != self._versions:
+                self._index = PokemonFuzzyIndex.load()
+                self._versions = versions
+            return self._index
+
+    def update(self, instance, pk: int, deleted: bool = False) -> None:
+        """
+        Applies one saved/deleted row to the index, after its ChangeCounter bump.
+
+        `pk` is read when the row is written: once deleted, the instance has no pk anymore.
+
+        If the version moved by more than this change, another writer was
+        missed: the index is dropped and rebuilt on the next search.
+        """
+        with self._lock:
+            if self._index is None:
+                return
+            table = self.tables[type(instance)]
+            expected = {**self._versions, table: self._versions.get(table, 0) + 1}
+            versions = self.versions()
+            if versions != expected:
+                self._index = None
+                return
+            if isinstance(instance, Pokemon):
+                key = ("pokemon", pk)
+                if not deleted:
+                    self._index.add_pokemon(pk, instance.number, instance.name, instance.version)
+            else:
+                key = ("name", pk)
+                if not deleted:
+                    self._index.add_name(pk, instance.number, instance.language, instance.name)
+            if deleted:
+                self._index.remove(key)
+            self._versions = versions
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index, self._versions = None, {}
+
+
+fuzzy_index = FuzzyIndexCache()
@@ -0,0 +1,57 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+import time
+
+from pokemon.export import ENCODERS, export, export_rows
+
+
+class Command(BaseCommand):
+    help = "Exports every pokemon as NDJSON or csv, streamed from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=list(ENCODERS), help="Output format (default: from the file extension, else ndjson).")
+        parser.add_argument("--output", type=Path, help="File to write (default: standard output). A .gz suffix compresses it.")
+        parser.add_argument("--gzip", action="store_true", help="Compress the output with gzip.")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Number of rows fetched from the database at a time.")
+
+    def handle(self, *args, **options):
+        """
+        Executes the command.
+
+        Uses the pipeline of the export endpoint (pokemon/export.py): the rows
+        are written as they are read, so the memory does not grow with the table.
+        """
+        output: Path | None = options["output"]
+        compress = options["gzip"] or (output is not None and output.suffix == ".gz")
+        format = options["format"] or self.guess_format(output)
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be a positive integer.")
+        if compress and output is None:
+            raise CommandError("--gzip needs an --output file.")
+
+        start = time.perf_counter()
+        count = 0
+
+        def counted(rows):
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield row
+
+        chunks = export(format, compress, rows=counted(export_rows(options["chunk_size"])))
+        if output is None:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending="")
+            return
+        with output.open("wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {count} pokemons to {output} in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.0f} rows/s)."
+        ))
+
+    @staticmethod
+    def guess_format(output: Path | None) -> str:
+        suffixes = output.suffixes if output is not None else []
+        return "csv" if ".csv" in suffixes else "ndjson"
@@ -1,54 +1,271 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import django
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 import csv
+import os
 import re
+import time
 
-from pokemon.models import Generation, Pokemon, Type
+from pokemon.cache import response_cache
+from pokemon.models import ChangeCounter, Generation, Pokemon, PokemonName, Type
+from pokemon.names import NAMES_PATH, read_names
+from pokemon.readmodel import refresh_documents
+
+DEFAULT_PATH: Path = Path(__file__).parent.parent.parent.parent / "data" / "pokemon.csv"
+
+# Match a name starting with an uppercase letter followed by lowercase letters,
+# optionally followed by a second part starting with an uppercase letter or digit.
+NAME_PATTERN = re.compile("^([A-Z][a-z]+)([A-Z0-9]?.*)$")
+
+# Size of the byte ranges parsed by each worker process in --workers mode.
+CHUNK_SIZE = 1 << 20
+
+# Fields rewritten when a row already exists for the (number, name, version) key.
+UPDATE_FIELDS = [
+    "type1", "type2", "hp", "attack", "defense", "special_attack",
+    "special_defense", "speed", "generation", "legendary",
+]
+
+
+def parse_row(row: dict) -> tuple:
+    """
+    Validates one csv row and converts it to a ready-to-insert tuple.
+
+    Returns:
+        tuple: (number, name, version, type1 name, type2 name or None,
+        hp, attack, defense, special attack, special defense, speed,
+        generation number, legendary)
+
+    Raises:
+        ValueError: If the name cannot be split or a number is invalid.
+    """
+    result = NAME_PATTERN.fullmatch(row["Name"])
+    if result is None:
+        raise ValueError(f"Invalid pokemon name {row['Name']!r}")
+    # There are two groups detected, name and version
+    name, version = result.groups()
+    return (
+        int(row["#"]),
+        name,
+        version,
+        row["Type 1"],
+        row["Type 2"] or None,
+        int(row["HP"]),
+        int(row["Attack"]),
+        int(row["Defense"]),
+        int(row["Sp. Atk"]),
+        int(row["Sp. Def"]),
+        int(row["Speed"]),
+        int(row["Generation"]),
+        row["Legendary"] == "True",
+    )
+
+
+def parse_chunk(path: str, start: int, end: int, fieldnames: list[str]) -> list[tuple]:
+    """
+    Parses the csv lines starting inside the byte range [start, end).
+
+    Runs in a worker process. A line belongs to the chunk its first byte
+    is in, so ranges can be cut anywhere (quoted fields spanning several
+    lines are not supported, the pokemon files have none).
+    """
+    lines = []
+    with open(path, "rb") as file:
+        # start is always after the header line, so start - 1 >= 0.
+        # Skip the end of the line started in the previous chunk.
+        file.seek(start - 1)
+        file.readline()
+        while file.tell() < end:
+            line = file.readline()
+            if not line:
+                break
+            lines.append(line.decode("utf-8"))
+    try:
+        return [parse_row(row) for row in csv.DictReader(lines, fieldnames=fieldnames)]
+    except (KeyError, ValueError) as error:
+        raise ValueError(f"Bytes {start}-{end}: {error}")
+
+
+class PokemonWriter:
+    """
+    Resolves foreign keys in memory and writes pokemons in bulk.
+
+    Types and generations are loaded once in dictionaries; missing ones are
+    created on the fly, so a row never costs more than the batch insert.
+    Each batch renders the read model of the rows it wrote (pokemon/readmodel.py).
+    """
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self.types = {type.name: type.pk for type in Type.objects.all()}
+        self.generations = {generation.number: generation.pk for generation in Generation.objects.all()}
+        self.batch: list[Pokemon] = []
+        self.count = 0
+        self.render_time = 0.0
+
+    def type_id(self, name: str | None) -> int | None:
+        if name is None:
+            return None
+        if name not in self.types:
+            self.types[name] = Type.objects.get_or_create(name=name)[0].pk
+        return self.types[name]
+
+    def generation_id(self, number: int) -> int:
+        if number not in self.generations:
+            self.generations[number] = Generation.objects.get_or_create(number=number)[0].pk
+        return self.generations[number]
+
+    def add(self, values: tuple) -> None:
+        (number, name, version, type1, type2, hp, attack, defense,
+         special_attack, special_defense, speed, generation, legendary) = values
+        self.batch.append(Pokemon(
+            number=number,
+            name=name,
+            version=version,
+            type1_id=self.type_id(type1),
+            type2_id=self.type_id(type2),
+            hp=hp,
+            attack=attack,
+            defense=defense,
+            special_attack=special_attack,
+            special_defense=special_defense,
+            speed=speed,
+            generation_id=self.generation_id(generation),
+            legendary=legendary,
+        ))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def written_ids(self) -> list[int]:
+        """The ids of the rows of the batch just upserted."""
+        ids = [pokemon.pk for pokemon in self.batch]
+        if None not in ids:
+            return ids
+        # Backends that do not return the ids of an upsert: read them back by key.
+        keys = {(pokemon.number, pokemon.name, pokemon.version) for pokemon in self.batch}
+        rows = Pokemon.objects.filter(number__in={number for number, _, _ in keys}).values_list("pk", "number", "name", "version")
+        return [pk for pk, *key in rows if tuple(key) in keys]
+
+    def flush(self) -> None:
+        """Upserts the pending batch and renders its documents in a single transaction."""
+        if not self.batch:
+            return
+        with transaction.atomic():
+            Pokemon.objects.bulk_create(
+                self.batch,
+                update_conflicts=True,
+                unique_fields=["number", "name", "version"],
+                update_fields=UPDATE_FIELDS,
+            )
+            # bulk_create sends no post_save signal
+            ChangeCounter.bump(Pokemon)
+            start = time.perf_counter()
+            refresh_documents(Pokemon.objects.filter(pk__in=self.written_ids()), batch_size=self.batch_size)
+            self.render_time += time.perf_counter() - start
+        self.count += len(self.batch)
+        self.batch = []
 
 
 class Command(BaseCommand):
     help = "Loads pokemon data from a csv file."
 
     def add_arguments(self, parser):
-        pass
+        parser.add_argument("--path", type=Path, default=DEFAULT_PATH, help="Csv file to import (default: data/pokemon.csv).")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of pokemons inserted per query.")
+        parser.add_argument("--workers", type=int, default=1, help="Number of processes parsing the file (default: 1, no pool).")
+        parser.add_argument("--names-path", type=Path, default=NAMES_PATH, help="Csv file of the translated names (default: data/pokemon-translation.csv).")
+        parser.add_argument("--no-names", action="store_true", help="Do not import the translated names.")
 
     def handle(self, *args, **options):
         """
         Executes the command.
 
-        Load the pokemon.csv file and display column info.
+        Streams the csv file and upserts pokemons in batches on the
+        (number, name, version) unique key, then displays the throughput.
+        The bulk writes send no signal: each batch renders the read model
+        (pokemon/readmodel.py) of the rows it wrote, the other rows are left as is.
         """
-        path: Path = Path(__file__).parent.parent.parent.parent / "data" / "pokemon.csv"
-        with path.open("r", encoding="utf-8") as file:
+        path: Path = options["path"]
+        if not path.is_file():
+            raise CommandError(f"File {path} does not exist.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be a positive integer.")
+        if options["workers"] < 1:
+            raise CommandError("--workers must be a positive integer.")
+        if not options["no_names"] and not options["names_path"].is_file():
+            raise CommandError(f"File {options['names_path']} does not exist.")
+
+        start = time.perf_counter()
+        writer = PokemonWriter(options["batch_size"])
+        if options["workers"] == 1:
+            self.import_serial(path, writer)
+        else:
+            self.import_parallel(path, writer, options["workers"])
+        writer.flush()
+        # bulk_create sends no signal: drop the cached API responses of this process.
+        response_cache.bump()
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {writer.count} pokemons in {elapsed:.2f}s ({writer.count / max(elapsed, 1e-9):.0f} rows/s), "
+            f"documents rendered in {writer.render_time:.2f}s."
+        ))
+        if not options["no_names"]:
+            count = self.import_names(options["names_path"], options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Imported {count} translated names."))
+
+    def import_names(self, path: Path, batch_size: int) -> int:
+        """Upserts the translated names on the (number, language) unique key."""
+        names = [PokemonName(number=number, language=language, name=name) for number, language, name in read_names(path)]
+        with transaction.atomic():
+            PokemonName.objects.bulk_create(
+                names, batch_size=batch_size, update_conflicts=True,
+                unique_fields=["number", "language"], update_fields=["name"],
+            )
+            ChangeCounter.bump(PokemonName)
+        return len(names)
+
+    def import_serial(self, path: Path, writer: PokemonWriter) -> None:
+        """Parses the file row by row in the current process."""
+        with path.open("r", encoding="utf-8", newline="") as file:
             reader = csv.DictReader(file)
-            with transaction.atomic():
-                for row in reader:  
-                    # Match a name starting with an uppercase letter followed by lowercase letters,
-                    # optionally followed by a second part starting with an uppercase letter or digit.
-                    result = re.fullmatch("^([A-Z][a-z]+)([A-Z0-9]?.*)$", row["Name"])
-                    # There are two groups detected, name and version
-                    name, version = result.groups()
-
-                    # Try to get or create types for type1 and type2 (if value is not empty)
-                    type1 = Type.objects.get_or_create(name=row["Type 1"])[0] if row["Type 1"] != "" else None
-                    type2 = Type.objects.get_or_create(name=row["Type 2"])[0] if row["Type 2"] != "" else None
-                    # Try to get or create generation object
-                    generation = Generation.objects.get_or_create(number=row["Generation"])[0]
-
-                    # Create the pokemon
-                    pokemon = Pokemon.objects.create(
-                        number=row["#"],
-                        name=name,
-                        version=version,
-                        type1=type1,
-                        type2=type2,
-                        hp=row["HP"],
-                        attack=row["Attack"],
-                        defense=row["Defense"],
-                        special_attack=row["Sp. Atk"],
-                        special_defense=row["Sp. Def"],
-                        speed=row["Speed"],
-                        generation=generation,
-                        legendary=row["Legendary"],
-                    )
\ No newline at end of file
+            for row in reader:
+                try:
+                    writer.add(parse_row(row))
+                except (KeyError, ValueError) as error:
+                    raise CommandError(f"Line {reader.line_num}: {error}")
+
+    def import_parallel(self, path: Path, writer: PokemonWriter, workers: int) -> None:
+        """
+        Splits the file in byte ranges parsed by a process pool.
+
+        Parsed chunks are consumed in file order by the single writer of the
+        current process; at most two chunks per worker are in flight so the
+        memory stays bounded whatever the file size.
+        """
+        with path.open("rb") as file:
+            fieldnames = next(csv.reader([file.readline().decode("utf-8")]))
+            first = file.tell()
+            size = os.fstat(file.fileno()).st_size
+        ranges = [(start, min(start + CHUNK_SIZE, size)) for start in range(first, size, CHUNK_SIZE)]
+
+        # django.setup makes the command module importable in spawned workers.
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+            pending = deque()
+            for start, end in ranges:
+                pending.append(executor.submit(parse_chunk, str(path), start, end, fieldnames))
+                if len(pending) >= workers * 2:
+                    self.write_chunk(pending.popleft(), writer)
+            while pending:
+                self.write_chunk(pending.popleft(), writer)
+
+    def write_chunk(self, future, writer: PokemonWriter) -> None:
+        try:
+            rows = future.result()
+        except ValueError as error:
+            raise CommandError(str(error))
+        for values in rows:
+            writer.add(values)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+import time
+
+from pokemon.cache import response_cache
+from pokemon.models import ChangeCounter, Pokemon
+from pokemon.readmodel import BATCH_SIZE, refresh_documents
+
+
+class Command(BaseCommand):
+    help = "Re-renders the read model of the API responses (PokemonDocument) from the pokemon table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Number of pokemons rendered per query.")
+
+    def handle(self, *args, **options):
+        """
+        Executes the command.
+
+        Needed only after writes that bypass the signals and the bulk
+        endpoints, e.g. Pokemon.objects.update() in a shell (see pokemon/readmodel.py).
+        """
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be a positive integer.")
+        start = time.perf_counter()
+        count = refresh_documents(batch_size=options["batch_size"])
+        # The rows may have changed without a signal: new ETags, and drop the cached API responses of this process.
+        ChangeCounter.bump(Pokemon)
+        response_cache.bump()
+        self.stdout.write(self.style.SUCCESS(f"Rendered {count} documents in {time.perf_counter() - start:.2f}s."))
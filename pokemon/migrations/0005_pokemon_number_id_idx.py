@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokemon', '0004_alter_pokemon_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['number', 'id'], name='pokemon_number_id_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokemon', '0005_pokemon_number_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('table', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='table')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='version')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='updated at')),
+            ],
+            options={
+                'verbose_name': 'change counter',
+                'verbose_name_plural': 'change counters',
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:06
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokemon', '0006_changecounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pokemon',
+            name='total',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('hp'), '+', models.F('attack')), '+', models.F('defense')), '+', models.F('special_attack')), '+', models.F('special_defense')), '+', models.F('speed')), output_field=models.PositiveSmallIntegerField(), verbose_name='total'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['total'], name='pokemon_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['type1', 'total'], name='pokemon_type1_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['type2', 'total'], name='pokemon_type2_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['generation', 'total'], name='pokemon_generation_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['legendary', 'total'], name='pokemon_legendary_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['hp'], name='pokemon_hp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['attack'], name='pokemon_attack_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['defense'], name='pokemon_defense_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['special_attack'], name='pokemon_special_attack_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['special_defense'], name='pokemon_special_defense_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['speed'], name='pokemon_speed_idx'),
+        ),
+    ]
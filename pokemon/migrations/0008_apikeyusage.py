@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ninja_apikey', '0002_alter_apikey_hashed_key'),
+        ('pokemon', '0007_pokemon_total_stat_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APIKeyUsage',
+            fields=[
+                ('api_key', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='ninja_apikey.apikey', verbose_name='API key')),
+                ('last_used_at', models.DateTimeField(verbose_name='last used at')),
+            ],
+            options={
+                'verbose_name': 'API key usage',
+                'verbose_name_plural': 'API key usages',
+            },
+        ),
+    ]
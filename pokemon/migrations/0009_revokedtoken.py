@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokemon', '0008_apikeyusage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('jti', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='jti')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='expires at')),
+            ],
+            options={
+                'verbose_name': 'revoked token',
+                'verbose_name_plural': 'revoked tokens',
+            },
+        ),
+    ]
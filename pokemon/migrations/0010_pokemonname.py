@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokemon', '0009_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PokemonName',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveSmallIntegerField(verbose_name='number')),
+                ('language', models.CharField(max_length=8, verbose_name='language')),
+                ('name', models.CharField(max_length=64, verbose_name='name')),
+            ],
+            options={
+                'verbose_name': 'pokémon name',
+                'verbose_name_plural': 'pokémon names',
+                'unique_together': {('number', 'language')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# The documents are not rendered here: they have the shape of the current response
+# schemas, which the historical models cannot give. They are rendered at the end of
+# `migrate`, once the tables match the current models (see pokemon/signals.py).
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokemon', '0010_pokemonname'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PokemonDocument',
+            fields=[
+                ('pokemon', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='pokemon.pokemon', verbose_name='pokémon')),
+                ('number', models.PositiveSmallIntegerField(verbose_name='number')),
+                ('version', models.CharField(max_length=64, verbose_name='version')),
+                ('detail', models.TextField(verbose_name='detail (PokemonSchema JSON)')),
+                ('mini', models.TextField(verbose_name='summary (PokemonSchemaMini JSON)')),
+            ],
+            options={
+                'verbose_name': 'pokémon document',
+                'verbose_name_plural': 'pokémon documents',
+                'indexes': [models.Index(fields=['number', 'version'], name='document_number_version_idx'), models.Index(fields=['number', 'pokemon'], name='document_number_pokemon_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
+from ninja_apikey.models import APIKey
 
 
 
@@ -31,6 +34,47 @@ class Generation(models.Model):
         return f"Generation {self.number}"
 
 
+class PokemonQuerySet(models.QuerySet):
+    """Querysets shaped for the API response schemas (see api/schemas.py)."""
+
+    def for_schema(self):
+        """Joins the relations nested in PokemonSchema: type1, type2 and generation."""
+        return self.select_related("type1", "type2", "generation")
+
+    def for_mini_schema(self):
+        """Joins type1 and loads only the columns serialized by PokemonSchemaMini."""
+        return self.select_related("type1").only(
+            "id", "number", "name", "version", "type1__name", "type2_id", "hp", "attack", "defense",
+            "special_attack", "special_defense", "speed", "generation_id", "legendary", "total",
+        )
+
+    def schema_values(self) -> list[dict]:
+        """
+        The rows as plain dicts shaped like PokemonSchema (relations nested), read with
+        one JOIN query: the API renders them without building model instances or schemas
+        (see api/renderers.py: values_response).
+        """
+        relations = {
+            "type1": ["id", "name", "description"],
+            "type2": ["id", "name", "description"],
+            "generation": ["id", "number", "description"],
+        }
+        fields = [field.name for field in self.model._meta.concrete_fields]
+        lookups = [name for name in fields if name not in relations]
+        lookups += [f"{relation}__{column}" for relation, columns in relations.items() for column in columns]
+        rows = []
+        for values in self.values(*lookups):
+            row = {}
+            for name in fields:
+                if name in relations:
+                    nested = {column: values[f"{name}__{column}"] for column in relations[name]}
+                    row[name] = nested if nested["id"] is not None else None
+                else:
+                    row[name] = values[name]
+            rows.append(row)
+        return rows
+
+
 class Pokemon(models.Model):
     """Pokémon information."""
     number = models.PositiveSmallIntegerField(verbose_name="number")
@@ -46,15 +90,147 @@ class Pokemon(models.Model):
     speed = models.PositiveSmallIntegerField(verbose_name="speed")
     generation = models.ForeignKey("pokemon.Generation", on_delete=models.PROTECT, verbose_name="generation")
     legendary = models.BooleanField(default=False, verbose_name="legendary")
+    # Somme des six statistiques, calculée et stockée par la base (colonne générée)
+    total = models.GeneratedField(
+        expression=F("hp") + F("attack") + F("defense") + F("special_attack") + F("special_defense") + F("speed"),
+        output_field=models.PositiveSmallIntegerField(),
+        db_persist=True,
+        verbose_name="total",
+    )
+
+    objects = PokemonQuerySet.as_manager()
 
     class Meta:
         verbose_name = "pokémon"
         verbose_name_plural = "pokémons"
         unique_together = [("number", "name", "version")]
+        indexes = [
+            # Keyset pagination of the API (api/pagination.py: CursorPagination)
+            models.Index(fields=["number", "id"], name="pokemon_number_id_idx"),
+            # Stat search (api/pokemon.py: pokemon_search): filters followed by the default sort on total
+            models.Index(fields=["total"], name="pokemon_total_idx"),
+            models.Index(fields=["type1", "total"], name="pokemon_type1_total_idx"),
+            models.Index(fields=["type2", "total"], name="pokemon_type2_total_idx"),
+            models.Index(fields=["generation", "total"], name="pokemon_generation_total_idx"),
+            models.Index(fields=["legendary", "total"], name="pokemon_legendary_total_idx"),
+            # Range filters and sorts on a single stat
+            models.Index(fields=["hp"], name="pokemon_hp_idx"),
+            models.Index(fields=["attack"], name="pokemon_attack_idx"),
+            models.Index(fields=["defense"], name="pokemon_defense_idx"),
+            models.Index(fields=["special_attack"], name="pokemon_special_attack_idx"),
+            models.Index(fields=["special_defense"], name="pokemon_special_defense_idx"),
+            models.Index(fields=["speed"], name="pokemon_speed_idx"),
+        ]
         permissions = [
             ("change_legendary_pokemon", "Can change legendary Pokémons"),
         ]
         
 
     def __str__(self):
-        return f"{self.name} ({self.version})"
\ No newline at end of file
+        return f"{self.name} ({self.version})"
+
+
+class PokemonDocument(models.Model):
+    """
+    Read model of a Pokémon: its PokemonSchema and PokemonSchemaMini payloads, already serialized.
+
+    Rendered by pokemon/readmodel.py on every write of the Pokémon, of its types
+    or of its generation, so the read routes return the stored JSON as is.
+    """
+    pokemon = models.OneToOneField(Pokemon, on_delete=models.CASCADE, primary_key=True, related_name="document", verbose_name="pokémon")
+    number = models.PositiveSmallIntegerField(verbose_name="number")
+    version = models.CharField(max_length=64, verbose_name="version")
+    detail = models.TextField(verbose_name="detail (PokemonSchema JSON)")
+    mini = models.TextField(verbose_name="summary (PokemonSchemaMini JSON)")
+
+    class Meta:
+        verbose_name = "pokémon document"
+        verbose_name_plural = "pokémon documents"
+        indexes = [
+            # api/pokemon.py: pokemon_view
+            models.Index(fields=["number", "version"], name="document_number_version_idx"),
+            # api/pokemon.py: pokemon_view_all, and the keyset pagination of api/querysets.py
+            models.Index(fields=["number", "pokemon"], name="document_number_pokemon_idx"),
+        ]
+
+    def __str__(self):
+        return f"Document of pokémon {self.pk}"
+
+
+class PokemonName(models.Model):
+    """Name of a Pokémon species (national number) in one language, from data/pokemon-translation.csv."""
+    number = models.PositiveSmallIntegerField(verbose_name="number")
+    language = models.CharField(max_length=8, verbose_name="language")
+    name = models.CharField(max_length=64, verbose_name="name")
+
+    class Meta:
+        verbose_name = "pokémon name"
+        verbose_name_plural = "pokémon names"
+        unique_together = [("number", "language")]
+
+    def __str__(self):
+        return f"{self.name} ({self.language})"
+
+
+class ChangeCounter(models.Model):
+    """
+    Number of changes of a table, bumped on every write (see pokemon/signals.py).
+
+    The API reads it to compute ETag and Last-Modified headers in a single query,
+    without hashing the response body.
+    """
+    table = models.CharField(max_length=64, primary_key=True, verbose_name="table")
+    version = models.PositiveBigIntegerField(default=0, verbose_name="version")
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name="updated at")
+
+    class Meta:
+        verbose_name = "change counter"
+        verbose_name_plural = "change counters"
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+
+    @classmethod
+    def bump(cls, *models):
+        """Records a change of the tables of the given models (e.g. after a bulk write)."""
+        now = timezone.now()
+        for model in models:
+            table = model._meta.db_table
+            if not cls.objects.filter(table=table).update(version=F("version") + 1, updated_at=now):
+                cls.objects.get_or_create(table=table, defaults={"version": 1, "updated_at": now})
+
+
+class APIKeyUsage(models.Model):
+    """
+    Last time an API key was used.
+
+    Written in batches by pokemon.usage.api_key_usage rather than on every
+    authenticated request.
+    """
+    api_key = models.OneToOneField(APIKey, on_delete=models.CASCADE, primary_key=True, related_name="usage", verbose_name="API key")
+    last_used_at = models.DateTimeField(verbose_name="last used at")
+
+    class Meta:
+        verbose_name = "API key usage"
+        verbose_name_plural = "API key usages"
+
+    def __str__(self):
+        return f"{self.api_key_id} {self.last_used_at:%Y-%m-%d %H:%M:%S}"
+
+
+class RevokedToken(models.Model):
+    """
+    JWT revoked before its expiry (logout), identified by its jti claim.
+
+    Loaded periodically in memory by pokemon.revocation.revoked_tokens; a row
+    is useless once the token has expired.
+    """
+    jti = models.CharField(max_length=64, primary_key=True, verbose_name="jti")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="expires at")
+
+    class Meta:
+        verbose_name = "revoked token"
+        verbose_name_plural = "revoked tokens"
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,127 @@
+"""
+Multilingual name index for autocomplete.
+
+The PokemonName rows (one per species and language) are loaded once in sorted
+arrays of normalized names: a prefix lookup is two binary searches plus a scan
+of the matching range, instead of an `icontains` scan of the table. The index
+is rebuilt lazily when the ChangeCounter version of the table changes (after
+an import, in this process or in another one).
+"""
+
+import csv
+import heapq
+import threading
+import unicodedata
+from bisect import bisect_left
+from pathlib import Path
+
+from pokemon.models import ChangeCounter, PokemonName
+
+NAMES_PATH: Path = Path(__file__).parent.parent / "data" / "pokemon-translation.csv"
+
+LANGUAGES = ["en", "ja", "fr", "de", "es", "it", "ko", "zh_HK", "zh"]
+
+
+def normalize(text: str) -> str:
+    """
+    Folds a name for accent, case and punctuation-insensitive matching.
+
+    "Salamèche" -> "salameche", "Mr. Mime" -> "mrmime", "Nidoran♀" -> "nidoran".
+    Combining marks are dropped after decomposition, so Japanese voiced kana
+    match their unvoiced form (ダ -> タ) and Hangul is split into jamo, which
+    lets an incomplete syllable match as a prefix.
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if char.isalnum() and not unicodedata.combining(char)).casefold()
+
+
+def read_names(path: Path = NAMES_PATH) -> list[tuple[int, str, str]]:
+    """
+    Reads the translation csv, whose n-th row is the species number n.
+
+    Returns:
+        list: (number, language, name) for every non-empty name.
+    """
+    with path.open("r", encoding="utf-8", newline="") as file:
+        reader = csv.DictReader(file)
+        languages = [language for language in reader.fieldnames if language != "keys"]
+        return [
+            (number, language, row[language].strip())
+            for number, row in enumerate(reader, start=1)
+            for language in languages
+            if row[language] and row[language].strip()
+        ]
+
+
+class NameIndex:
+    """
+    Sorted-array prefix index over the names.
+
+    `keys[i]` is the normalized form of `entries[i]` = (number, language, name);
+    there is one array for all the languages and one per language.
+    """
+
+    def __init__(self, names: list[tuple[int, str, str]]):
+        self._indexes: dict[str | None, tuple[list[str], list[tuple[int, str, str]]]] = {}
+        rows = sorted((normalize(name), number, language, name) for number, language, name in names)
+        rows = [row for row in rows if row[0]]
+        self._indexes[None] = self._arrays(rows)
+        for language in {row[2] for row in rows}:
+            self._indexes[language] = self._arrays([row for row in rows if row[2] == language])
+
+    @staticmethod
+    def _arrays(rows: list[tuple]) -> tuple[list[str], list[tuple[int, str, str]]]:
+        return [row[0] for row in rows], [row[1:] for row in rows]
+
+    @classmethod
+    def load(cls) -> "NameIndex":
+        return cls(list(PokemonName.objects.values_list("number", "language", "name")))
+
+    def __len__(self) -> int:
+        return len(self._indexes[None][0])
+
+    def lookup(self, query: str, language: str | None = None, limit: int = 10) -> list[dict]:
+        """
+        Names starting with `query` (after normalization), exact matches first,
+        then the shortest names.
+        """
+        prefix = normalize(query)
+        if not prefix or language not in self._indexes:
+            return []
+        keys, entries = self._indexes[language]
+        start = bisect_left(keys, prefix)
+        # Every key starting with the prefix sorts before prefix + the last code point.
+        end = bisect_left(keys, prefix + "\U0010ffff", start)
+        best = heapq.nsmallest(limit, range(start, end), key=lambda position: (len(keys[position]), position))
+        return [
+            {"number": number, "language": lang, "name": name, "exact": keys[position] == prefix}
+            for position in best
+            for number, lang, name in [entries[position]]
+        ]
+
+
+class NameIndexCache:
+    """Holds the current NameIndex of the process, rebuilt when the names change."""
+
+    table = PokemonName._meta.db_table
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: NameIndex | None = None
+        self._version = None
+
+    def get(self) -> NameIndex:
+        """Returns the index, costing a single query when it is up to date."""
+        version = ChangeCounter.objects.filter(table=self.table).values_list("version", flat=True).first()
+        with self._lock:
+            if self._index is None or version != self._version:
+                self._index = NameIndex.load()
+                self._version = version
+            return self._index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index = self._version = None
+
+
+name_index = NameIndexCache()
@@ -0,0 +1,121 @@
+"""
+Denormalized read model of the Pokémon responses (PokemonDocument).
+
+Each Pokémon has a document holding its PokemonSchema payload (types and
+generation nested) and its PokemonSchemaMini payload, serialized to JSON once
+at write time. The read routes of api/pokemon.py and api/querysets.py then
+answer with one indexed lookup on the document table and return the stored
+JSON, without joining the types and the generation nor building schemas.
+
+Documents are rendered by refresh_documents:
+    - by the signals of pokemon/signals.py when a Pokémon is saved, and for
+      every Pokémon of a type or a generation when its nested fields change (a
+      renamed type re-renders its Pokémon in batches);
+    - by the bulk writes (api/bulk.py) and importpokemon (the rows of each
+      batch), which send no signals;
+    - by `python manage.py refreshdocuments` after any other write that
+      bypasses the signals (e.g. queryset.update() in a shell);
+    - after `migrate`, for the Pokémon that have no document yet (migration
+      0011 creates the table empty: the historical models do not have the
+      current schemas), see render_missing_documents in pokemon/signals.py.
+A deleted Pokémon loses its document through the cascade of the relation.
+"""
+
+import json
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Q, QuerySet
+
+from pokemon.models import Generation, Pokemon, PokemonDocument, Type
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# Pokémon rendered per query (and per upsert).
+BATCH_SIZE = 1000
+
+
+def dumps(payload: dict) -> str:
+    if orjson is not None:
+        return orjson.dumps(payload).decode()
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+def mini_payload(detail: dict) -> dict:
+    """The PokemonSchemaMini payload of a PokemonSchema one: type1 by name, the other relations by id."""
+    mini = {"type1_name": detail["type1"]["name"]}
+    for name, value in detail.items():
+        if name != "type1":
+            mini[name] = value["id"] if isinstance(value, dict) else value
+    return mini
+
+
+def render(detail: dict) -> PokemonDocument:
+    """The document of a row of PokemonQuerySet.schema_values()."""
+    return PokemonDocument(
+        pokemon_id=detail["id"],
+        number=detail["number"],
+        version=detail["version"],
+        detail=dumps(detail),
+        mini=dumps(mini_payload(detail)),
+    )
+
+
+def refresh_documents(pokemons: QuerySet | None = None, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Renders and upserts the documents of `pokemons` (all the Pokémon by default).
+
+    Returns the number of documents written.
+    """
+    pokemons = Pokemon.objects.all() if pokemons is None else pokemons
+    ids = list(pokemons.order_by("pk").values_list("pk", flat=True))
+    with transaction.atomic():
+        for start in range(0, len(ids), batch_size):
+            documents = [
+                render(detail) for detail in Pokemon.objects.filter(pk__in=ids[start:start + batch_size]).schema_values()
+            ]
+            PokemonDocument.objects.bulk_create(
+                documents, update_conflicts=True, unique_fields=["pokemon"],
+                update_fields=["number", "version", "detail", "mini"],
+            )
+    return len(ids)
+
+
+def refresh_related(types: Iterable[Type | int] = (), generations: Iterable[Generation | int] = ()) -> int:
+    """Re-renders the documents of the Pokémon of these types and generations."""
+    types, generations = list(types), list(generations)
+    if not types and not generations:
+        return 0
+    return refresh_documents(
+        Pokemon.objects.filter(Q(type1__in=types) | Q(type2__in=types) | Q(generation__in=generations))
+    )
+
+
+def documents_by_key(keys: list[tuple[int, str]]) -> dict[tuple[int, str], str]:
+    """
+    The stored PokemonSchema JSON of each (number, version) key found, read with one query.
+
+    The query selects the numbers (a range scan of the (number, version) index)
+    and the versions are matched here: a few rows per number, and no OR of
+    hundreds of conditions in the SQL. When several Pokémon share a key, the
+    first one (by id) is kept.
+    """
+    wanted = set(keys)
+    documents: dict[tuple[int, str], str] = {}
+    rows = (
+        PokemonDocument.objects.filter(number__in={number for number, _ in wanted})
+        .order_by("pokemon")
+        .values_list("number", "version", "detail")
+    )
+    for number, version, detail in rows:
+        if (number, version) in wanted:
+            documents.setdefault((number, version), detail)
+    return documents
+
+
+def json_array(documents: Iterable[str]) -> str:
+    """A JSON array of stored documents, without decoding them."""
+    return f"[{','.join(documents)}]"
@@ -0,0 +1,64 @@
+"""
+In-memory list of the revoked JWTs.
+
+Stateless JWT authentication never reads the users table: the only shared
+state is the list of tokens revoked before their expiry (logout). Each process
+keeps the jti of the unexpired RevokedToken rows in a set, reloaded every
+settings.JWT_REVOCATION_REFRESH seconds, so checking a token costs no query.
+A token revoked in another process is refused at most that many seconds later.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from pokemon.models import RevokedToken
+
+
+class RevocationList:
+    """Set of revoked jti, refreshed from the database when it is older than the interval."""
+
+    def __init__(self):
+        self._revoked: frozenset[str] = frozenset()
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def interval(self) -> float:
+        return getattr(settings, "JWT_REVOCATION_REFRESH", 30)
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.interval
+
+    def _query(self):
+        return RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list("jti", flat=True)
+
+    def is_revoked(self, jti: str) -> bool:
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    self._revoked, self._loaded_at = frozenset(self._query()), time.monotonic()
+        return jti in self._revoked
+
+    async def ais_revoked(self, jti: str) -> bool:
+        if self._stale():
+            # No lock: two coroutines may both reload, which is harmless.
+            self._revoked, self._loaded_at = frozenset([jti async for jti in self._query()]), time.monotonic()
+        return jti in self._revoked
+
+    def revoke(self, jti: str, expires_at: datetime) -> None:
+        """Revokes a token in the database and, at once, in this process."""
+        RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        RevokedToken.objects.update_or_create(jti=jti, defaults={"expires_at": expires_at})
+        with self._lock:
+            self._revoked = self._revoked | {jti}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._revoked, self._loaded_at = frozenset(), None
+
+
+revoked_tokens = RevocationList()
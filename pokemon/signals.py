@@ -0,0 +1,186 @@
+"""Signal receivers keeping the caches of the pokemon app up to date."""
+
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db import connections, router, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from pokemon.cache import api_key_cache, credentials_cache, reference_cache, response_cache
+from pokemon.fuzzy import fuzzy_index
+from pokemon.models import APIKey, ChangeCounter, Generation, Pokemon, PokemonDocument, PokemonName, Type
+from pokemon.readmodel import refresh_documents, refresh_related
+
+User = get_user_model()
+
+# Fields of a user kept by the authentication caches (see api/authentification.py).
+AUTH_FIELDS = {"password", "is_active", "is_staff", "is_superuser"}
+
+# Fields of the types and generations nested in the stored Pokémon responses (see PokemonQuerySet.schema_values).
+NESTED_FIELDS = {Type: ("name", "description"), Generation: ("number", "description")}
+
+
+@receiver(post_save, sender=Type)
+@receiver(post_delete, sender=Type)
+@receiver(post_save, sender=Generation)
+@receiver(post_delete, sender=Generation)
+def invalidate_reference_cache(sender, **kwargs):
+    """
+    Any change to a type or a generation (API, admin, shell) invalidates the reference cache.
+
+    The bump waits for the commit: bumped earlier, a concurrent request could cache
+    the rows it still reads before the commit under the new version.
+    """
+    transaction.on_commit(reference_cache.bump)
+
+
+@receiver(post_save, sender=Pokemon)
+@receiver(post_delete, sender=Pokemon)
+@receiver(post_save, sender=Type)
+@receiver(post_delete, sender=Type)
+@receiver(post_save, sender=Generation)
+@receiver(post_delete, sender=Generation)
+@receiver(post_save, sender=PokemonName)
+@receiver(post_delete, sender=PokemonName)
+def bump_change_counter(sender, **kwargs):
+    """Changes the ETag of the API responses built from this table, once the change is committed."""
+    transaction.on_commit(partial(ChangeCounter.bump, sender))
+
+
+@receiver(post_save, sender=Pokemon)
+@receiver(post_delete, sender=Pokemon)
+@receiver(post_save, sender=Type)
+@receiver(post_delete, sender=Type)
+@receiver(post_save, sender=Generation)
+@receiver(post_delete, sender=Generation)
+def invalidate_response_cache(sender, **kwargs):
+    """The cached responses (api/response_cache.py) are built from these tables (bumped on commit, see above)."""
+    transaction.on_commit(response_cache.bump)
+
+
+@receiver(post_save, sender=Pokemon)
+def refresh_pokemon_document(sender, instance, raw=False, **kwargs):
+    """Re-renders the stored responses of the Pokémon (pokemon/readmodel.py)."""
+    if not raw:
+        refresh_documents(Pokemon.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_save, sender=Type)
+@receiver(pre_save, sender=Generation)
+def load_nested_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Reads the stored NESTED_FIELDS of the type or generation before the save, so that its
+    Pokémon are only re-rendered when they change (not by a no-op update_or_create).
+    """
+    instance._stored_nested_state = None
+    fields = NESTED_FIELDS[sender]
+    if raw or instance._state.adding or (update_fields is not None and not set(fields) & set(update_fields)):
+        return
+    instance._stored_nested_state = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(post_save, sender=Type)
+@receiver(post_save, sender=Generation)
+def refresh_related_documents(sender, instance, created, raw=False, **kwargs):
+    """A type or a generation is nested in the stored responses of its Pokémon: re-render them in bulk."""
+    stored = getattr(instance, "_stored_nested_state", None)
+    if created or raw or stored is None:
+        return
+    if all(getattr(instance, name) == value for name, value in stored.items()):
+        return
+    if sender is Type:
+        refresh_related(types=[instance.pk])
+    else:
+        refresh_related(generations=[instance.pk])
+
+
+@receiver(post_migrate)
+def render_missing_documents(sender, using, **kwargs):
+    """
+    Renders the documents of the Pokémon that have none, e.g. the whole table after
+    migration 0011 on a database that already holds Pokémon: the read routes only read
+    the documents. Skipped while migrations are pending (the tables may not match the
+    current models yet).
+    """
+    if sender.name != "pokemon" or not router.allow_migrate_model(using, PokemonDocument):
+        return
+    executor = MigrationExecutor(connections[using])
+    if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+        return
+    if refresh_documents(Pokemon.objects.using(using).filter(document__isnull=True)):
+        ChangeCounter.bump(Pokemon)
+        response_cache.bump()
+
+
+# Connected after bump_change_counter: the fuzzy index checks the version it has just bumped
+# (the on_commit callbacks run in the order they were registered).
+@receiver(post_save, sender=Pokemon)
+@receiver(post_save, sender=PokemonName)
+def update_fuzzy_index(sender, instance, **kwargs):
+    """Adds or replaces the name in the fuzzy index of this process, without a full rebuild."""
+    transaction.on_commit(partial(fuzzy_index.update, instance, instance.pk))
+
+
+@receiver(post_delete, sender=Pokemon)
+@receiver(post_delete, sender=PokemonName)
+def remove_from_fuzzy_index(sender, instance, **kwargs):
+    # The pk is read now: the deletion resets it before the commit.
+    transaction.on_commit(partial(fuzzy_index.update, instance, instance.pk, deleted=True))
+
+
+@receiver(pre_save, sender=User)
+def load_auth_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Reads the stored AUTH_FIELDS of the user before the save, so that the caches are
+    only invalidated when they change (not by the last_login save of every sign-in).
+    """
+    instance._stored_auth_state = None
+    if raw or instance._state.adding or (update_fields is not None and not AUTH_FIELDS & set(update_fields)):
+        return
+    instance._stored_auth_state = User.objects.filter(pk=instance.pk).values(*AUTH_FIELDS).first()
+
+
+def changed_auth_fields(instance) -> set[str]:
+    """The AUTH_FIELDS changed by the save of the user (none for a new user)."""
+    stored = getattr(instance, "_stored_auth_state", None) or {}
+    return {name for name, value in stored.items() if getattr(instance, name) != value}
+
+
+@receiver(post_save, sender=APIKey)
+@receiver(post_delete, sender=APIKey)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidate_api_key_cache(sender, **kwargs):
+    """A revoked key, or a user losing permissions, must not stay authenticated by the cache."""
+    transaction.on_commit(api_key_cache.bump)
+
+
+@receiver(post_save, sender=User)
+def invalidate_api_key_cache_of_user(sender, instance, **kwargs):
+    """The cache holds the status and the permissions of the user of each key (see api/authentification.py)."""
+    if changed_auth_fields(instance) - {"password"}:
+        transaction.on_commit(api_key_cache.bump)
+
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_api_key_cache_of_permissions(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        transaction.on_commit(api_key_cache.bump)
+
+
+@receiver(post_save, sender=User)
+def invalidate_credentials_cache(sender, instance, **kwargs):
+    """Old Basic auth credentials must stop working as soon as the password changes."""
+    if "password" in changed_auth_fields(instance):
+        transaction.on_commit(credentials_cache.bump)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_credentials_cache_of_deleted_user(sender, **kwargs):
+    transaction.on_commit(credentials_cache.bump)
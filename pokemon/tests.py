@@ -1,3 +1,1518 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import json
+import logging
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+import jwt
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F, Q
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from ninja_apikey.models import APIKey
+from ninja_apikey.security import generate_key
+from ninja_simple_jwt.jwt.key_retrieval import InMemoryJwtKeyPair
+from ninja_simple_jwt.jwt.token_operations import get_access_token_for_user, get_refresh_token_for_user
+
+from api.authentification import CachedAPIKeyAuth, StatelessJwtAuth, TokenUser
+from api.loaders import DataLoader, request_loader
+from api.ninja import api
+from api.renderers import FastJSONRenderer
+from api.response_cache import SingleFlight, flights
+from api.schemas import PokemonSchema, PokemonSchemaMini
+from pokemon.cache import VersionedCache, api_key_cache, credentials_cache, reference_cache, response_cache
+from pokemon.management.commands.importpokemon import DEFAULT_PATH
+from pokemon.models import APIKeyUsage, ChangeCounter, Generation, Pokemon, PokemonDocument, PokemonName, RevokedToken, Type
+from pokemon.fuzzy import PokemonFuzzyIndex, TrigramIndex, fuzzy_index, trigrams
+from pokemon.names import NameIndex, name_index, normalize
+from pokemon.readmodel import refresh_documents
+from pokemon.revocation import revoked_tokens
+from pokemon.usage import api_key_usage
+from project.database import ReplicaMiddleware, ReplicaRouter, database_settings, use_replica
+from project.metrics import MetricsMiddleware, log_sampled, registry
+from project.querydetector import QueryBudgetExceeded, QueryDetectorMiddleware, normalize_sql
+
+
+class ImportPokemonTests(TestCase):
+    """Tests for the importpokemon management command."""
+
+    def import_pokemons(self, **options):
+        out = StringIO()
+        call_command("importpokemon", stdout=out, **options)
+        return out.getvalue()
+
+    def test_import_csv(self):
+        output = self.import_pokemons(batch_size=100)
+        self.assertIn("rows/s", output)
+        self.assertEqual(Pokemon.objects.count(), 800)
+        self.assertEqual(Type.objects.count(), 18)
+        self.assertEqual(Generation.objects.count(), 6)
+        venusaur = Pokemon.objects.get(number=3, name="Venusaur", version="Mega Venusaur")
+        self.assertEqual(venusaur.type1.name, "Grass")
+        self.assertEqual(venusaur.type2.name, "Poison")
+        self.assertFalse(venusaur.legendary)
+
+    def test_import_twice_upserts(self):
+        self.import_pokemons()
+        Pokemon.objects.filter(number=1).update(hp=1)
+        self.import_pokemons(path=DEFAULT_PATH)
+        self.assertEqual(Pokemon.objects.count(), 800)
+        self.assertEqual(Pokemon.objects.get(number=1).hp, 45)
+
+    def test_import_with_workers(self):
+        # Small chunks so the file is really split between the workers.
+        with mock.patch("pokemon.management.commands.importpokemon.CHUNK_SIZE", 4096):
+            self.import_pokemons(workers=2)
+        self.assertEqual(Pokemon.objects.count(), 800)
+        self.assertEqual(Pokemon.objects.filter(legendary=True).count(), 65)
+        self.assertTrue(Pokemon.objects.filter(number=721, name="Volcanion").exists())
+
+    def test_import_names(self):
+        output = self.import_pokemons()
+        self.assertIn("translated names", output)
+        self.assertEqual(PokemonName.objects.filter(language="en").count(), 1025)
+        self.assertEqual(PokemonName.objects.get(number=4, language="fr").name, "Salamèche")
+        # Upsert on (number, language).
+        self.import_pokemons(no_names=False)
+        self.assertEqual(PokemonName.objects.filter(number=4).count(), 9)
+
+    def test_import_without_names(self):
+        self.import_pokemons(no_names=True)
+        self.assertFalse(PokemonName.objects.exists())
+
+    def test_import_renders_the_written_rows(self):
+        self.import_pokemons(no_names=True)
+        self.assertEqual(PokemonDocument.objects.count(), 800)
+        PokemonDocument.objects.update(detail="stale")
+        with DEFAULT_PATH.open(encoding="utf-8") as file:
+            lines = file.readlines()
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "bulbasaur.csv"
+            path.write_text(lines[0] + lines[1], encoding="utf-8")
+            self.import_pokemons(path=path, no_names=True)
+        self.assertEqual(json.loads(PokemonDocument.objects.get(number=1).detail)["name"], "Bulbasaur")
+        self.assertEqual(PokemonDocument.objects.filter(detail="stale").count(), 799)
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    API_KEY_LAST_USED_INTERVAL=None,
+    # No sampled log lines in the test output.
+    LOG_SAMPLE_RATE=0,
+)
+class ApiTestCase(TestCase):
+    """
+    Base class for API tests.
+
+    Loads data/pokemon.csv once and provides an API key and a JWT access token.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command("importpokemon", stdout=StringIO())
+        cls.user = User.objects.create_user("dawan", password="dawan")
+        prefix, key, hashed_key = generate_key()
+        APIKey.objects.create(prefix=prefix, hashed_key=hashed_key, user=cls.user, label="tests")
+        cls.api_key = f"{prefix}.{key}"
+        cls.access_token, _ = get_access_token_for_user(cls.user)
+
+    @classmethod
+    def setUpClass(cls):
+        # The keys are needed by setUpTestData.
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        InMemoryJwtKeyPair._private_key = private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        InMemoryJwtKeyPair._public_key = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        cls.addClassCleanup(InMemoryJwtKeyPair.clear)
+        super().setUpClass()
+
+    def setUp(self):
+        # Test transactions are rolled back without signals: start from an empty cache.
+        reference_cache.clear()
+        api_key_cache.clear()
+        credentials_cache.clear()
+        response_cache.clear()
+        revoked_tokens.clear()
+        # Written in the test transaction, never in the development database at exit.
+        self.addCleanup(api_key_usage.flush)
+
+    def get(self, url, **headers):
+        return self.client.get(url, headers=headers)
+
+    def get_with_key(self, url):
+        return self.get(url, **{"X-API-Key": self.api_key})
+
+    def get_with_jwt(self, url, token=None):
+        return self.get(url, Authorization=f"Bearer {token or self.access_token}")
+
+
+class QueryBudgetTests(ApiTestCase):
+    """
+    Query-count regression tests.
+
+    Each endpoint has a budget independent of the number of rows returned;
+    a test fails as soon as an endpoint issues more queries (e.g. N+1).
+    """
+
+    def assertQueryBudget(self, budget, request, url):
+        with CaptureQueriesContext(connection) as context:
+            response = request(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        queries = "\n".join(query["sql"] for query in context.captured_queries)
+        self.assertLessEqual(len(context), budget, f"{url} exceeded its query budget:\n{queries}")
+        return response
+
+    def test_list_pokemons(self):
+        # change counters + COUNT + page
+        response = self.assertQueryBudget(3, self.client.get, "/api/querysets/pokemons?page=2")
+        self.assertEqual(len(response.json()["items"]), 10)
+        self.assertEqual(response.json()["items"][0]["type1_name"], "Water")
+
+    def test_pokemon_view(self):
+        # API key with its user + its permissions + change counters + pokemon
+        response = self.assertQueryBudget(4, self.get_with_key, "/api/pokemon/view/3")
+        self.assertEqual(response.json()["type2"]["name"], "Poison")
+
+    def test_pokemon_view_all(self):
+        # revocation list (reloaded every JWT_REVOCATION_REFRESH seconds) + pokemons, no user
+        response = self.assertQueryBudget(2, self.get_with_jwt, "/api/pokemon/view-all/3")
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(response.json()[0]["generation"]["number"], 1)
+
+    def test_type_list(self):
+        # change counters + types
+        self.assertQueryBudget(2, self.client.get, "/api/type/list")
+
+    def test_type_view(self):
+        self.assertQueryBudget(1, self.client.get, "/api/type/view/Steel")
+
+    def test_list_pokemons_cursor(self):
+        # change counters + page, no COUNT
+        response = self.assertQueryBudget(2, self.client.get, "/api/querysets/pokemons/cursor?page_size=50")
+        self.assertIsNone(response.json()["count"])
+
+
+class CursorPaginationTests(ApiTestCase):
+    """Tests for api.pagination.CursorPagination."""
+
+    url = "/api/querysets/pokemons/cursor"
+
+    def test_walk_forward_and_backward(self):
+        expected = list(Pokemon.objects.order_by("number", "id").values_list("id", flat=True))
+        seen, pages = [], []
+        url = f"{self.url}?page_size=100&total=true"
+        while url:
+            page = self.client.get(url).json()
+            pages.append(page)
+            seen += [item["id"] for item in page["items"]]
+            url = page["next"]
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages[0]["count"], 800)
+        self.assertIsNone(pages[0]["previous"])
+
+        previous = self.client.get(pages[-1]["previous"]).json()
+        self.assertEqual(previous["items"], pages[-2]["items"])
+        self.assertEqual(self.client.get(pages[1]["previous"]).json()["items"], pages[0]["items"])
+
+    def test_forged_cursor(self):
+        response = self.client.get(f"{self.url}?cursor=forged")
+        self.assertEqual(response.status_code, 400)
+
+
+class ReferenceCacheTests(ApiTestCase):
+    """Tests for the reference data cache (pokemon.cache)."""
+
+    def test_type_list_is_cached(self):
+        self.client.get("/api/type/list")
+        # Only the change counters read for the ETag
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/type/list")
+        self.assertEqual(len(response.json()), 18)
+        stats = self.client.get("/api/type/cache/stats").json()
+        self.assertEqual((stats["misses"], stats["local_hits"]), (1, 1))
+
+    def test_type_view_not_found(self):
+        self.assertEqual(self.client.get("/api/type/view/Sound").status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/type/view/Sound").status_code, 404)
+
+    def test_invalidated_on_write(self):
+        steel = self.client.get("/api/type/view/Steel").json()
+        self.assertEqual(steel["description"], "")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                "/api/type/edit/Steel", {**steel, "description": "Hard"}, content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get("/api/type/view/Steel").json()["description"], "Hard")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/type/create", {"name": "Sound", "description": ""}, content_type="application/json")
+        self.assertEqual(len(self.client.get("/api/type/list").json()), 19)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete("/api/type/delete/Sound")
+        self.assertEqual(self.client.get("/api/type/view/Sound").status_code, 404)
+
+    def test_invalidated_on_commit(self):
+        self.client.get("/api/type/list")
+        with self.captureOnCommitCallbacks(execute=True):
+            Type.objects.create(name="Sound")
+            # Not committed yet: the entry cached before the write is still served.
+            self.assertEqual(len(self.client.get("/api/type/list").json()), 18)
+        self.assertEqual(len(self.client.get("/api/type/list").json()), 19)
+
+    def test_backend_tier(self):
+        first, second = (VersionedCache("tests", backend="default") for _ in range(2))
+        self.assertEqual(first.get_or_set("key", lambda: 1), 1)
+        # Another process: empty local tier, served by the shared backend
+        self.assertEqual(second.get_or_set("key", lambda: 2), 1)
+        self.assertEqual(second.stats()["backend_hits"], 1)
+        first.bump()
+        self.assertEqual(second.get_or_set("key", lambda: 3), 3)
+
+
+class ConditionalRequestTests(ApiTestCase):
+    """Tests for the ETag / Last-Modified headers (api.conditional)."""
+
+    def test_not_modified(self):
+        response = self.get_with_key("/api/pokemon/view/25")
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+        # change counters only (the API key is cached): no pokemon query, no serialization
+        with self.assertNumQueries(1):
+            response = self.get("/api/pokemon/view/25", **{"X-API-Key": self.api_key, "If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_etag_changes_with_data(self):
+        etag = self.client.get("/api/type/list")["ETag"]
+        self.assertEqual(self.client.get("/api/type/list", headers={"If-None-Match": etag}).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Type.objects.create(name="Sound")
+        response = self.client.get("/api/type/list", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_depends_on_query(self):
+        first = self.client.get("/api/querysets/pokemons?page=1")["ETag"]
+        second = self.client.get("/api/querysets/pokemons?page=2")
+        self.assertNotEqual(second["ETag"], first)
+        response = self.client.get("/api/querysets/pokemons?page=2", headers={"If-None-Match": first})
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        last_modified = self.get_with_key("/api/pokemon/view/25")["Last-Modified"]
+        response = self.get("/api/pokemon/view/25", **{"X-API-Key": self.api_key, "If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 304)
+
+    def test_errors_have_no_etag(self):
+        self.assertNotIn("ETag", self.get_with_key("/api/pokemon/view/9999"))
+        self.assertEqual(self.get("/api/pokemon/view/25", **{"If-None-Match": "*"}).status_code, 401)
+
+    def test_if_none_match_star_is_ignored(self):
+        # The validators are checked before the handler: a missing resource must still answer 404.
+        headers = {"X-API-Key": self.api_key, "If-None-Match": "*"}
+        self.assertEqual(self.get("/api/pokemon/view/9999", **headers).status_code, 404)
+        self.assertEqual(self.get("/api/pokemon/view/25", **headers).status_code, 200)
+
+    def test_counter_bumped_on_commit(self):
+        etag = self.client.get("/api/type/list")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Type.objects.create(name="Sound")
+            self.assertEqual(self.client.get("/api/type/list")["ETag"], etag)
+        self.assertNotEqual(self.client.get("/api/type/list")["ETag"], etag)
+
+
+class PokemonSearchTests(ApiTestCase):
+    """Tests for the stat search endpoint and its indexes."""
+
+    def search(self, query):
+        response = self.get_with_key(f"/api/pokemon/search?{query}")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_total_is_stored(self):
+        bulbasaur = Pokemon.objects.get(number=1)
+        self.assertEqual(bulbasaur.total, 318)
+
+    def test_filters_and_sort(self):
+        result = self.search("type=Fire&min_speed=100&legendary=false&order_by=-speed&page_size=100")
+        items = result["items"]
+        self.assertEqual(result["count"], len(items))
+        self.assertTrue(items)
+        for item in items:
+            self.assertIn("Fire", (item["type1"]["name"], (item["type2"] or {}).get("name")))
+            self.assertGreaterEqual(item["speed"], 100)
+            self.assertFalse(item["legendary"])
+        self.assertEqual([item["speed"] for item in items], sorted((item["speed"] for item in items), reverse=True))
+
+    def test_default_sort_by_total(self):
+        items = self.search("generation=1")["items"]
+        self.assertEqual(items[0]["name"], "Mewtwo")
+        self.assertEqual(items[0]["total"], 780)
+
+    def test_invalid_order(self):
+        response = self.get_with_key("/api/pokemon/search?order_by=name")
+        self.assertEqual(response.status_code, 422)
+
+    def test_filters_use_an_index(self):
+        """
+        The common filter combinations search an index: the queries of the endpoint
+        (count and page) never scan the pokemon table, nor walk a whole index
+        ("SCAN ... USING INDEX").
+        """
+        combinations = [
+            {"min_total": 600},
+            {"min_attack": 120, "max_attack": 150},
+            {"type": "Dragon"},
+            {"type": "Dragon", "min_total": 500},
+            {"generation": 3},
+            {"generation": 3, "legendary": "true"},
+            {"legendary": "true"},
+            {"legendary": "false"},
+            {"min_speed": 110},
+        ]
+        table = Pokemon._meta.db_table
+        for filters in combinations:
+            with self.subTest(**filters):
+                with CaptureQueriesContext(connection) as context:
+                    self.search(urlencode(filters))
+                queries = [query["sql"] for query in context.captured_queries if f'FROM "{table}"' in query["sql"]]
+                self.assertEqual(len(queries), 2)
+                for sql in queries:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                        plan = [row[-1] for row in cursor.fetchall()]
+                    scans = [line for line in plan if line.startswith(f"SCAN {table}")]
+                    self.assertFalse(scans, "\n".join([sql, *plan]))
+
+
+class AnalyticsTests(ApiTestCase):
+    """Tests for the in-memory stat matrix (pokemon.analytics) and its routes."""
+
+    def test_top_k_matches_orm(self):
+        response = self.get_with_key("/api/analytics/top?k=5&attack=2&speed=0.5&type=Fire")
+        self.assertEqual(response.status_code, 200, response.content)
+        top = response.json()
+        expected = (
+            Pokemon.objects.filter(Q(type1__name="Fire") | Q(type2__name="Fire"))
+            .annotate(score=F("hp") + 2 * F("attack") + F("defense") + F("special_attack") + F("special_defense") + 0.5 * F("speed"))
+            .order_by("-score", "id")[:5]
+        )
+        self.assertEqual([item["id"] for item in top], [pokemon.id for pokemon in expected])
+        self.assertEqual(top[0]["value"], expected[0].score)
+
+    def test_percentiles(self):
+        response = self.get_with_key("/api/analytics/percentiles?stat=total&percentiles=0&percentiles=100")
+        dragon = response.json()["Dragon"]
+        totals = Pokemon.objects.filter(Q(type1__name="Dragon") | Q(type2__name="Dragon")).values_list("total", flat=True)
+        self.assertEqual((dragon["0"], dragon["100"]), (min(totals), max(totals)))
+        self.assertEqual(self.get_with_key("/api/analytics/percentiles?percentiles=101").status_code, 422)
+
+    def test_nearest(self):
+        pikachu = Pokemon.objects.get(name="Pikachu")
+        nearest = self.get_with_key(f"/api/analytics/nearest/{pikachu.pk}?k=3").json()
+        self.assertEqual(len(nearest), 3)
+        self.assertNotIn(pikachu.pk, [item["id"] for item in nearest])
+        self.assertEqual(nearest, sorted(nearest, key=lambda item: item["value"]))
+        self.assertEqual(self.get_with_key("/api/analytics/nearest/0").status_code, 404)
+
+    def test_default_k(self):
+        pikachu = Pokemon.objects.get(name="Pikachu", version="")
+        self.assertEqual(len(self.get_with_key("/api/analytics/top").json()), 10)
+        self.assertEqual(len(self.get_with_key(f"/api/analytics/nearest/{pikachu.pk}").json()), 5)
+        self.assertEqual(self.get_with_key("/api/analytics/top?k=0").status_code, 422)
+
+    def test_rebuilt_after_save(self):
+        self.get_with_key("/api/analytics/top?k=1")
+        pikachu = Pokemon.objects.get(name="Pikachu")
+        pikachu.attack = 1000
+        with self.captureOnCommitCallbacks(execute=True):
+            pikachu.save()
+        top = self.get_with_key("/api/analytics/top?k=1").json()
+        self.assertEqual(top[0]["id"], pikachu.pk)
+
+    def test_matchups(self):
+        ids = {name: Pokemon.objects.get(name=name, version="").pk for name in ("Charizard", "Gyarados", "Pikachu")}
+        response = self.client.post(
+            "/api/analytics/matchups",
+            {"attackers": ["Electric", "Rock", "Ground"], "defenders": list(ids.values())},
+            content_type="application/json",
+            headers={"X-API-Key": self.api_key},
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        # Charizard: Fire/Flying, Gyarados: Water/Flying, Pikachu: Electric
+        self.assertEqual(response.json()["multipliers"], [[2, 4, 0.5], [4, 2, 1], [0, 0, 2]])
+
+    def test_matchups_errors(self):
+        post = lambda data: self.client.post(
+            "/api/analytics/matchups", data, content_type="application/json", headers={"X-API-Key": self.api_key}
+        )
+        self.assertEqual(post({"attackers": ["Sound"], "defenders": [1]}).status_code, 422)
+        response = post({"attackers": ["Fire"], "defenders": [1, 0]})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["missing"], [0])
+
+    def test_matchups_with_a_type_missing_from_the_chart(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/type/create", {"name": "Sound", "description": ""}, content_type="application/json")
+            loudred = Pokemon.objects.create(
+                number=294, name="Loudred", version="Sound", type1=Type.objects.get(name="Sound"),
+                type2=Type.objects.get(name="Flying"), hp=84, attack=71, defense=43, special_attack=71,
+                special_defense=43, speed=48, generation_id=3,
+            )
+        response = self.client.post(
+            "/api/analytics/matchups",
+            {"attackers": ["Electric", "Ground", "Fighting"], "defenders": [loudred.pk]},
+            content_type="application/json",
+            headers={"X-API-Key": self.api_key},
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        # Sound is not in the chart: only Flying counts.
+        self.assertEqual(response.json()["multipliers"], [[2], [0], [0.5]])
+
+
+class AsyncRoutesTests(ApiTestCase):
+    """Tests for the async versions of the read routes (api.asynchronous)."""
+
+    def assertSameResponse(self, request, url):
+        expected = request(f"/api/{url}")
+        response = request(f"/api/async/{url}")
+        self.assertEqual(response.status_code, expected.status_code, response.content)
+        self.assertEqual(response.json(), expected.json())
+        return response
+
+    def test_same_responses(self):
+        self.assertSameResponse(self.get_with_key, "pokemon/view/6?version=Mega Charizard X")
+        self.assertSameResponse(self.get_with_key, "pokemon/view/9999")
+        self.assertSameResponse(self.get_with_jwt, "pokemon/view-all/3")
+        self.assertSameResponse(self.get_with_key, "pokemon/search?min_attack=120&type=Fire&page=1")
+        self.assertSameResponse(self.client.get, "type/list")
+        self.assertSameResponse(self.client.get, "type/view/Steel")
+        self.assertSameResponse(self.client.get, "type/view/Sound")
+        self.assertSameResponse(self.client.get, "querysets/pokemons?page=3")
+
+    def test_cursor_pagination(self):
+        expected = self.client.get("/api/querysets/pokemons/cursor?page_size=5&total=true").json()
+        page = self.client.get("/api/async/querysets/pokemons/cursor?page_size=5&total=true").json()
+        self.assertEqual(page["items"], expected["items"])
+        self.assertEqual(page["count"], expected["count"])
+        following = self.client.get(page["next"]).json()
+        self.assertEqual(following["items"], self.client.get(expected["next"]).json()["items"])
+
+    def test_authentication(self):
+        self.assertEqual(self.client.get("/api/async/pokemon/view/25").status_code, 401)
+        self.assertEqual(self.get("/api/async/pokemon/view/25", **{"X-API-Key": "wrong.key"}).status_code, 401)
+        self.assertEqual(self.get("/api/async/pokemon/view/25", **{"X-API-Key": "nodot"}).status_code, 401)
+        self.assertEqual(self.get("/api/async/pokemon/view-all/3", Authorization="Bearer wrong").status_code, 401)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_with_key("/api/async/pokemon/view/25").status_code, 401)
+
+    def test_query_budget(self):
+        # API key (with its user) + its permissions + change counters + pokemon
+        with self.assertNumQueries(4):
+            response = self.get_with_key("/api/async/pokemon/view/3")
+        self.assertEqual(response.json()["type2"]["name"], "Poison")
+
+    def test_not_modified(self):
+        etag = self.client.get("/api/async/type/list")["ETag"]
+        response = self.client.get("/api/async/type/list", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_async_client(self):
+        response = await self.async_client.get("/api/async/pokemon/view/25", headers={"X-API-Key": self.api_key})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["name"], "Pikachu")
+
+
+class APIKeyCacheTests(ApiTestCase):
+    """Tests for the cached API key authentication (api.authentification.CachedAPIKeyAuth)."""
+
+    def test_key_is_verified_once(self):
+        self.assertEqual(self.get_with_key("/api/auth/key").status_code, 200)
+        with self.assertNumQueries(0), mock.patch("api.authentification.check_password") as check:
+            response = self.get_with_key("/api/auth/key")
+        self.assertEqual(response.status_code, 200)
+        check.assert_not_called()
+
+    def test_wrong_secret(self):
+        self.assertEqual(self.get_with_key("/api/auth/key").status_code, 200)
+        prefix = self.api_key.split(".")[0]
+        response = self.get("/api/auth/key", **{"X-API-Key": f"{prefix}.wrong"})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.get_with_key("/api/auth/key").status_code, 200)
+
+    def test_revoked_key(self):
+        self.assertEqual(self.get_with_key("/api/auth/key").status_code, 200)
+        key = APIKey.objects.get()
+        key.revoked = True
+        with self.captureOnCommitCallbacks(execute=True):
+            key.save()
+        self.assertEqual(self.get_with_key("/api/auth/key").status_code, 401)
+        self.assertEqual(self.get_with_key("/api/async/pokemon/view/25").status_code, 401)
+
+    def test_deactivated_user(self):
+        self.assertEqual(self.get_with_key("/api/auth/key").status_code, 200)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.get_with_key("/api/auth/key").status_code, 401)
+
+    def test_user_is_not_shared(self):
+        self.assertEqual(self.get_with_key("/api/auth/key").status_code, 200)
+        request = RequestFactory().get("/", headers={"X-API-Key": self.api_key})
+        first, second = CachedAPIKeyAuth()(request), CachedAPIKeyAuth()(request)
+        self.assertIsInstance(first, TokenUser)
+        self.assertIsNot(first, second)
+        self.assertEqual((first.pk, str(first)), (self.user.pk, "dawan"))
+        self.assertFalse(first.has_perm("pokemon.view_pokemon"))
+
+    def test_permission_change(self):
+        request = RequestFactory().get("/", headers={"X-API-Key": self.api_key})
+        self.assertFalse(CachedAPIKeyAuth()(request).has_perm("pokemon.view_pokemon"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_permissions.add(Permission.objects.get(codename="view_pokemon"))
+        self.assertTrue(CachedAPIKeyAuth()(request).has_perm("pokemon.view_pokemon"))
+
+    def test_kept_on_unrelated_user_save(self):
+        self.assertEqual(self.get_with_key("/api/auth/key").status_code, 200)
+        self.user.first_name = "Dawan"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+            self.client.login(username="dawan", password="dawan")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_with_key("/api/auth/key").status_code, 200)
+
+    def test_expired_key(self):
+        APIKey.objects.update(expires_at=timezone.now() + timedelta(hours=1))
+        self.assertEqual(self.get_with_key("/api/auth/key").status_code, 200)
+        with mock.patch("api.authentification.timezone.now", return_value=timezone.now() + timedelta(hours=2)):
+            self.assertEqual(self.get_with_key("/api/auth/key").status_code, 401)
+
+    def test_last_used_is_batched(self):
+        self.get_with_key("/api/auth/key")
+        # Cached key: the usage is only noted in memory, nothing is written.
+        with self.assertNumQueries(0):
+            self.get_with_key("/api/auth/key")
+            self.get_with_key("/api/auth/key")
+        self.assertFalse(APIKeyUsage.objects.exists())
+        with self.assertNumQueries(2):
+            self.assertEqual(api_key_usage.flush(), 1)
+        usage = APIKeyUsage.objects.get()
+        self.assertEqual(usage.api_key_id, self.api_key.split(".")[0])
+        self.assertEqual(api_key_usage.flush(), 0)
+
+
+class BasicAuthTests(ApiTestCase):
+    """Tests for the Basic auth credential cache and login throttling (api.authentification.FakeBasicAuth)."""
+
+    def get_with_basic(self, username="dawan", password="dawan"):
+        credentials = base64.b64encode(f"{username}:{password}".encode()).decode()
+        return self.get("/api/auth/basic", Authorization=f"Basic {credentials}")
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_password_is_hashed_once(self):
+        self.assertEqual(self.get_with_basic().status_code, 200)
+        # the user, by primary key: no password hashing
+        with self.assertNumQueries(1), mock.patch("api.authentification.authenticate") as authenticate:
+            response = self.get_with_basic()
+        self.assertEqual(response.status_code, 200)
+        authenticate.assert_not_called()
+
+    def test_wrong_password(self):
+        self.assertEqual(self.get_with_basic(password="wrong").status_code, 401)
+        self.assertEqual(self.get_with_basic().status_code, 200)
+
+    def test_password_change(self):
+        self.assertEqual(self.get_with_basic().status_code, 200)
+        self.user.set_password("new password")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.get_with_basic().status_code, 401)
+        self.assertEqual(self.get_with_basic(password="new password").status_code, 200)
+
+    def test_kept_on_login(self):
+        self.assertEqual(self.get_with_basic().status_code, 200)
+        # update_last_login saves the user on every sign-in.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.login(username="dawan", password="dawan")
+            self.user.first_name = "Dawan"
+            self.user.save()
+        with mock.patch("api.authentification.authenticate") as authenticate:
+            self.assertEqual(self.get_with_basic().status_code, 200)
+        authenticate.assert_not_called()
+
+    def test_deactivated_user(self):
+        self.assertEqual(self.get_with_basic().status_code, 200)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get_with_basic().status_code, 401)
+
+    def test_failures_are_not_cached(self):
+        # Refused while inactive, then accepted as soon as the account is reactivated.
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get_with_basic().status_code, 401)
+        User.objects.filter(pk=self.user.pk).update(is_active=True)
+        self.assertEqual(self.get_with_basic().status_code, 200)
+        # A user created after a failed attempt.
+        self.assertEqual(self.get_with_basic(username="newcomer", password="secret").status_code, 401)
+        User.objects.create_user(username="newcomer", password="secret")
+        self.assertEqual(self.get_with_basic(username="newcomer", password="secret").status_code, 200)
+
+    @override_settings(BASIC_AUTH_THROTTLE={"FAILURES": 2, "WINDOW": 60})
+    def test_throttle(self):
+        self.assertEqual(self.get_with_basic(password="wrong").status_code, 401)
+        self.assertEqual(self.get_with_basic().status_code, 200)
+        self.assertEqual(self.get_with_basic(password="wrong").status_code, 401)
+        self.assertEqual(self.get_with_basic(password="other").status_code, 401)
+        # Locked out, even with the right password.
+        self.assertEqual(self.get_with_basic().status_code, 429)
+        self.assertEqual(self.get_with_basic(username="someone").status_code, 401)
+
+
+class StatelessJwtTests(ApiTestCase):
+    """Tests for the JWT authentication from the token claims (api.authentification.StatelessJwtAuth)."""
+
+    def test_no_user_query(self):
+        self.get_with_jwt("/api/pokemon/view-all/9999")
+        # the pokemons only: neither the user nor the revocation list is read
+        with self.assertNumQueries(1):
+            response = self.get_with_jwt("/api/pokemon/view-all/9999")
+        self.assertEqual(response.status_code, 404)
+
+    def test_token_user(self):
+        permission = Permission.objects.get(codename="view_pokemon")
+        self.user.user_permissions.add(permission)
+        token, _ = get_access_token_for_user(User.objects.get(pk=self.user.pk))
+        request = RequestFactory().get("/", headers={"Authorization": f"Bearer {token}"})
+        with self.assertNumQueries(1):
+            user = StatelessJwtAuth()(request)
+        self.assertIsInstance(user, TokenUser)
+        self.assertIs(request.user, user)
+        self.assertEqual((user.pk, user.username), (self.user.pk, "dawan"))
+        self.assertTrue(user.has_perm("pokemon.view_pokemon"))
+        self.assertFalse(user.has_perm("pokemon.delete_pokemon"))
+
+    def test_invalid_tokens(self):
+        refresh_token, _ = get_refresh_token_for_user(self.user)
+        for token in ["wrong", refresh_token, self.access_token[:-4] + "AAAA"]:
+            with self.subTest(token=token[:20]):
+                self.assertEqual(self.get_with_jwt("/api/pokemon/view-all/3", token).status_code, 401)
+
+    def test_logout(self):
+        self.assertEqual(self.get_with_jwt("/api/pokemon/view-all/3").status_code, 200)
+        response = self.client.post("/api/auth/logout", headers={"Authorization": f"Bearer {self.access_token}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_with_jwt("/api/pokemon/view-all/3").status_code, 401)
+        self.assertEqual(self.get_with_jwt("/api/async/pokemon/view-all/3").status_code, 401)
+        # Another token of the same user still works.
+        token, _ = get_access_token_for_user(self.user)
+        self.assertEqual(self.get_with_jwt("/api/pokemon/view-all/3", token).status_code, 200)
+
+    def test_sign_in(self):
+        response = self.client.post(
+            "/api/auth/mobile/sign-in", {"username": "dawan", "password": "dawan"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_with_jwt("/api/pokemon/view-all/3", response.json()["access"]).status_code, 200)
+
+    def test_refresh_reads_the_user(self):
+        refresh_token, _ = get_refresh_token_for_user(self.user)
+        refresh = lambda: self.client.post(
+            "/api/auth/mobile/token-refresh", {"refresh": refresh_token}, content_type="application/json"
+        )
+        self.user.user_permissions.add(Permission.objects.get(codename="view_pokemon"))
+        response = refresh()
+        self.assertEqual(response.status_code, 200)
+        claims = jwt.decode(response.json()["access"], options={"verify_signature": False})
+        self.assertEqual(claims["permissions"], ["pokemon.view_pokemon"])
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(refresh().status_code, 401)
+        self.client.cookies["refresh"] = refresh_token
+        self.assertEqual(self.client.post("/api/auth/web/token-refresh").status_code, 401)
+
+    def test_revocation_from_another_process(self):
+        self.assertEqual(self.get_with_jwt("/api/pokemon/view-all/3").status_code, 200)
+        jti = jwt.decode(self.access_token, options={"verify_signature": False})["jti"]
+        RevokedToken.objects.create(jti=jti, expires_at=timezone.now() + timedelta(minutes=15))
+        # Still accepted until the list is reloaded.
+        self.assertEqual(self.get_with_jwt("/api/pokemon/view-all/3").status_code, 200)
+        with override_settings(JWT_REVOCATION_REFRESH=0):
+            self.assertEqual(self.get_with_jwt("/api/pokemon/view-all/3").status_code, 401)
+
+
+class NameLookupTests(ApiTestCase):
+    """Tests for the multilingual name index (pokemon.names) and the lookup endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        name_index.clear()
+
+    def lookup(self, query):
+        response = self.get_with_key(f"/api/pokemon/lookup?{query}")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_normalize(self):
+        self.assertEqual(normalize("Salamèche"), "salameche")
+        self.assertEqual(normalize("Mr. Mime"), "mrmime")
+        self.assertEqual(normalize("FLABÉBÉ"), "flabebe")
+
+    def test_prefix_accent_and_case(self):
+        names = self.lookup("q=SALAME&lang=fr")
+        self.assertEqual(names, [{"number": 4, "language": "fr", "name": "Salamèche", "exact": False}])
+        self.assertEqual(self.lookup("q=ピカチュウ")[0]["number"], 25)
+
+    def test_exact_matches_first(self):
+        names = self.lookup("q=mew&lang=en")
+        self.assertEqual(names[0], {"number": 151, "language": "en", "name": "Mew", "exact": True})
+        self.assertEqual(names[1]["name"], "Mewtwo")
+
+    def test_all_languages(self):
+        languages = {name["language"] for name in self.lookup("q=pikachu&limit=50")}
+        self.assertEqual(languages, {"en", "fr", "de", "es", "it"})
+
+    def test_validation(self):
+        self.assertEqual(self.get_with_key("/api/pokemon/lookup?q=").status_code, 422)
+        self.assertEqual(self.get_with_key("/api/pokemon/lookup?q=pika&lang=xx").status_code, 422)
+        self.assertEqual(self.lookup("q=..."), [])
+
+    def test_index_is_cached(self):
+        self.lookup("q=pika")
+        # API key cached, index up to date: only its version is read
+        with self.assertNumQueries(1):
+            self.lookup("q=bulb")
+
+    def test_index_follows_changes(self):
+        self.assertEqual(self.lookup("q=zzpika"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            PokemonName.objects.create(number=25, language="xx", name="Zzpikachu")
+        self.assertEqual(self.lookup("q=zzpika")[0]["name"], "Zzpikachu")
+
+    def test_lookup_ranks_by_length(self):
+        index = NameIndex([(1, "en", "Abcdef"), (2, "en", "Abc"), (3, "en", "Abcd"), (4, "fr", "Abc")])
+        self.assertEqual([name["number"] for name in index.lookup("ab", limit=3)], [2, 4, 3])
+        self.assertEqual([name["number"] for name in index.lookup("abc", "fr")], [4])
+        self.assertEqual(index.lookup("abc", "de"), [])
+
+
+class FuzzySearchTests(ApiTestCase):
+    """Tests for the trigram index (pokemon.fuzzy), the fuzzy endpoint and the admin search."""
+
+    def setUp(self):
+        super().setUp()
+        fuzzy_index.clear()
+
+    def fuzzy(self, query):
+        response = self.get_with_key(f"/api/pokemon/fuzzy?{query}")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_trigrams(self):
+        self.assertEqual(trigrams("Mew"), {"  m", " me", "mew", "ew "})
+        self.assertEqual(trigrams("..."), frozenset())
+
+    def test_typos(self):
+        pikachu = Pokemon.objects.get(name="Pikachu")
+        match = self.fuzzy("q=pikachoo")[0]
+        self.assertEqual((match["number"], match["pokemon_id"], match["name"]), (25, pikachu.pk, "Pikachu"))
+        self.assertEqual(self.fuzzy("q=bulbasor")[0]["number"], 1)
+        self.assertEqual(self.fuzzy("q=mega charizrd x")[0]["name"], "Mega Charizard X")
+
+    def test_one_match_per_species_ranked(self):
+        matches = self.fuzzy("q=salamech&limit=3")
+        self.assertEqual(matches[0]["name"], "Salamèche")
+        self.assertEqual(len({match["number"] for match in matches}), len(matches))
+        self.assertEqual([match["score"] for match in matches], sorted((match["score"] for match in matches), reverse=True))
+
+    def test_language(self):
+        matches = self.fuzzy("q=bisasm&lang=de")
+        self.assertEqual(matches[0]["name"], "Bisasam")
+        self.assertEqual({match["language"] for match in matches}, {"de"})
+        self.assertEqual(self.fuzzy("q=zzzzzz"), [])
+
+    def test_incremental_update(self):
+        self.fuzzy("q=pika")
+        with mock.patch.object(PokemonFuzzyIndex, "load") as load:
+            with self.captureOnCommitCallbacks(execute=True):
+                pokemon = Pokemon.objects.create(
+                    number=25, name="Pikachu", version="Pikachu Libre", type1=Type.objects.get(name="Electric"),
+                    hp=1, attack=1, defense=1, special_attack=1, special_defense=1, speed=1, generation_id=1,
+                )
+            pk = pokemon.pk
+            self.assertEqual(self.fuzzy("q=pikachu libree")[0]["pokemon_id"], pk)
+            with self.captureOnCommitCallbacks(execute=True):
+                pokemon.delete()
+            self.assertNotIn(pk, [match["pokemon_id"] for match in self.fuzzy("q=pikachu libree&limit=50")])
+        load.assert_not_called()
+
+    def test_rebuild_after_unseen_change(self):
+        self.assertEqual(self.fuzzy("q=zzpikachu")[0]["name"], "Pikachu")
+        PokemonName.objects.bulk_create([PokemonName(number=25, language="xx", name="Zzpikachu")])
+        ChangeCounter.bump(PokemonName)
+        self.assertEqual(self.fuzzy("q=zzpikachu")[0]["name"], "Zzpikachu")
+
+    def test_remove(self):
+        index = TrigramIndex()
+        index.add(1, "Pikachu", number=25)
+        index.add(2, "Raichu", number=26)
+        index.remove(1)
+        self.assertEqual([match["number"] for match in index.search("pikachu", threshold=0.1)], [26])
+        self.assertNotIn("pik", index.postings)
+
+    def test_admin_search(self):
+        admin = User.objects.create_superuser("admin", password="admin")
+        self.client.force_login(admin)
+        response = self.client.get("/admin/pokemon/pokemon/", {"q": "pikachoo"})
+        self.assertContains(response, "Pikachu")
+        response = self.client.get("/admin/pokemon/pokemonname/", {"q": "salamech"})
+        self.assertContains(response, "Salamèche")
+
+
+class BulkWriteTests(ApiTestCase):
+    """Tests for the bulk write endpoints (api/bulk.py)."""
+
+    def pokemon(self, **fields):
+        return {
+            "number": 1000, "name": "Bulkasaur", "version": "", "type1_name": "Grass", "type2_name": None,
+            "hp": 10, "attack": 20, "defense": 30, "special_attack": 40, "special_defense": 50, "speed": 60,
+            "generation_number": 6, "legendary": False, **fields,
+        }
+
+    def post(self, url, body, content_type="application/json"):
+        if not isinstance(body, (str, bytes)):
+            body = json.dumps(body)
+        return self.client.post(url, body, content_type=content_type, headers={"X-API-Key": self.api_key})
+
+    def test_per_item_status(self):
+        body = [
+            self.pokemon(),
+            self.pokemon(hp=99),
+            self.pokemon(name="Bulbasaur", number=1, version=""),
+            self.pokemon(name="Typo", type1_name="Sound"),
+            self.pokemon(name="Weak", hp=-1),
+            self.pokemon(name="x" * 65),
+            {"name": "Incomplete"},
+        ]
+        response = self.post("/api/pokemon/bulk", body)
+        self.assertEqual(response.status_code, 200, response.content)
+        items = response.json()["items"]
+        self.assertEqual([item["status"] for item in items], [
+            "created", "duplicate", "skipped", "invalid", "invalid", "invalid", "invalid",
+        ])
+        self.assertEqual(list(items[3]["errors"]), ["type1_name"])
+        self.assertEqual(list(items[4]["errors"]), ["hp"])
+        self.assertEqual(list(items[5]["errors"]), ["name"])
+        self.assertIn("number", items[6]["errors"])
+        self.assertEqual(response.json()["counts"]["invalid"], 4)
+        created = Pokemon.objects.get(pk=items[0]["id"])
+        self.assertEqual((created.hp, created.total, created.type1.name), (10, 210, "Grass"))
+
+    def test_update(self):
+        body = [self.pokemon(name="Bulbasaur", number=1, version="", hp=1, type1_name="Fire")]
+        response = self.post("/api/pokemon/bulk?on_conflict=update", body)
+        self.assertEqual(response.json()["items"][0]["status"], "updated")
+        bulbasaur = Pokemon.objects.get(number=1, name="Bulbasaur")
+        self.assertEqual((bulbasaur.hp, bulbasaur.type1.name, bulbasaur.generation.number), (1, "Fire", 6))
+
+    def test_constant_query_count(self):
+        # One read query per table whatever the size of the batch (the inserts are batched too),
+        # plus the ids and the rows rendered in the read model (pokemon/readmodel.py: BATCH_SIZE rows per query).
+        def queries(first, count):
+            body = [self.pokemon(number=first + index, name=f"Bulk {index}", type2_name="Poison") for index in range(count)]
+            with CaptureQueriesContext(connection) as context:
+                response = self.post("/api/pokemon/bulk", body)
+            self.assertEqual(response.json()["counts"]["created"], count)
+            return [query["sql"].split()[2] for query in context.captured_queries if query["sql"].startswith("SELECT")]
+
+        self.get_with_key("/api/pokemon/view/1")
+        self.assertEqual(queries(2000, 5), queries(3000, 200))
+        self.assertEqual(len(queries(4000, 1000)), 5)
+
+    def test_ndjson(self):
+        lines = "\n".join(json.dumps(self.pokemon(number=6000 + index, name=f"Line {index}")) for index in range(3))
+        response = self.post("/api/pokemon/bulk", lines + "\n\n", content_type="application/x-ndjson")
+        self.assertEqual(response.json()["counts"]["created"], 3)
+        response = self.post("/api/pokemon/bulk", "{}\n{", content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Line 2", response.json()["detail"])
+
+    def test_malformed_body(self):
+        self.assertEqual(self.post("/api/pokemon/bulk", "[").status_code, 400)
+        self.assertEqual(self.post("/api/pokemon/bulk", {"name": "Bulkasaur"}).status_code, 400)
+        with override_settings(BULK_MAX_ITEMS=2):
+            self.assertEqual(self.post("/api/pokemon/bulk", [self.pokemon()] * 3).status_code, 413)
+
+    def test_authentication(self):
+        response = self.client.post("/api/pokemon/bulk", "[]", content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+
+    def test_invalidates_caches(self):
+        response = self.client.get("/api/type/list")
+        self.assertEqual(len(response.json()), 18)
+        etag = response["ETag"]
+        response = self.post("/api/type/bulk", [
+            {"name": "Sound", "description": "New"},
+            {"name": "Fire", "description": "Updated"},
+            {"name": "Sound", "description": "Again"},
+        ])
+        self.assertEqual([item["status"] for item in response.json()["items"]], ["created", "updated", "duplicate"])
+        response = self.client.get("/api/type/list", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 19)
+        self.assertEqual(Type.objects.get(name="Fire").description, "Updated")
+
+    def test_types_skip(self):
+        response = self.post("/api/type/bulk?on_conflict=skip", [{"name": "Fire", "description": "Updated"}])
+        self.assertEqual(response.json()["items"][0]["status"], "skipped")
+        self.assertNotEqual(Type.objects.get(name="Fire").description, "Updated")
+
+
+class ExportTests(ApiTestCase):
+    """Tests for the streaming export (pokemon.export), its endpoint and the exportpokemon command."""
+
+    def export(self, query=""):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f"/api/querysets/pokemons/export{query}")
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.streaming)
+            content = b"".join(response.streaming_content)
+        # change counters + one JOIN query for the rows
+        self.assertLessEqual(len(context), 2)
+        return response, content
+
+    def test_ndjson(self):
+        response, content = self.export()
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = content.decode().splitlines()
+        self.assertEqual(len(lines), 800)
+        venusaur = json.loads(lines[3])
+        self.assertEqual(
+            (venusaur["name"], venusaur["version"], venusaur["type2"], venusaur["total"], venusaur["generation"]),
+            ("Venusaur", "Mega Venusaur", "Poison", 625, 1),
+        )
+
+    def test_csv(self):
+        response, content = self.export("?format=csv")
+        self.assertIn('filename="pokemon.csv"', response["Content-Disposition"])
+        rows = list(csv.DictReader(content.decode().splitlines()))
+        self.assertEqual(len(rows), 800)
+        self.assertEqual((rows[0]["name"], rows[0]["type1"], rows[0]["legendary"]), ("Bulbasaur", "Grass", "False"))
+        self.assertEqual(rows[4]["type2"], "")
+
+    def test_gzip(self):
+        plain = self.export("?format=csv")[1]
+        response, content = self.export("?format=csv&gzip=true")
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertLess(len(content), len(plain))
+        self.assertEqual(gzip.decompress(content), plain)
+
+    def test_not_modified(self):
+        etag = self.client.get("/api/querysets/pokemons/export")["ETag"]
+        response = self.client.get("/api/querysets/pokemons/export", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("exportpokemon", stdout=out)
+        self.assertEqual(out.getvalue().encode(), self.export()[1])
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "pokemon.csv.gz"
+            out = StringIO()
+            call_command("exportpokemon", output=path, chunk_size=100, stdout=out)
+            self.assertIn("Exported 800 pokemons", out.getvalue())
+            self.assertEqual(gzip.decompress(path.read_bytes()), self.export("?format=csv")[1])
+
+
+class RendererTests(ApiTestCase):
+    """Tests for the JSON renderer and the .values() response path (api/renderers.py)."""
+
+    def test_schema_values(self):
+        # Same dicts as the ORM instance -> PokemonSchema round trip, type2 included when missing.
+        expected = [PokemonSchema.model_validate(pokemon).model_dump() for pokemon in Pokemon.objects.for_schema().order_by("id")]
+        with CaptureQueriesContext(connection) as context:
+            values = Pokemon.objects.order_by("id").schema_values()
+        self.assertEqual(len(context), 1)
+        self.assertEqual(values, expected)
+        self.assertIsNone(values[4]["type2"])
+
+    def test_endpoints(self):
+        venusaur = Pokemon.objects.for_schema().get(number=3, version="")
+        response = self.get_with_key("/api/pokemon/view/3")
+        self.assertEqual(response["Content-Type"], "application/json; charset=utf-8")
+        self.assertEqual(response.json(), PokemonSchema.model_validate(venusaur).model_dump())
+        self.assertEqual(len(self.get_with_jwt("/api/pokemon/view-all/3").json()), 2)
+        self.assertEqual(self.get_with_key("/api/pokemon/view/9999").status_code, 404)
+        self.assertEqual(self.client.get("/api/type/view/Fire").json()["name"], "Fire")
+
+    def test_encoders_agree(self):
+        data = {"date": timezone.now(), "number": 1.5, "name": "Salamèche", "items": [None, True], 3: "key"}
+        fast = FastJSONRenderer(use_orjson=True).render(None, data, response_status=200)
+        fallback = FastJSONRenderer(use_orjson=False).render(None, data, response_status=200)
+        self.assertEqual(json.loads(fast), json.loads(fallback))
+
+
+class ResponseCacheTests(ApiTestCase):
+    """Tests for the response cache of pokemon/view (api/response_cache.py)."""
+
+    url = "/api/pokemon/view/25"
+
+    def view(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.get_with_key(self.url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response, [query["sql"] for query in context.captured_queries]
+
+    def test_hit(self):
+        miss, _ = self.view()
+        self.assertEqual(miss["X-Cache"], "MISS")
+        hit, queries = self.view()
+        self.assertEqual(hit["X-Cache"], "HIT")
+        self.assertEqual(hit.content, miss.content)
+        self.assertEqual(hit["ETag"], miss["ETag"])
+        # Only the change counters of the ETag: no pokemon query.
+        self.assertFalse([sql for sql in queries if 'FROM "pokemon_pokemondocument"' in sql])
+        self.assertEqual(self.get_with_key(f"{self.url}?version=")["X-Cache"], "MISS")
+
+    def test_not_cached(self):
+        self.assertEqual(self.get_with_key("/api/pokemon/view/9999").status_code, 404)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.assertEqual(self.view()[0]["X-Cache"], "MISS")
+
+    def test_invalidation(self):
+        self.view()
+        pikachu = Pokemon.objects.get(number=25, version="")
+        pikachu.hp = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            pikachu.save()
+        response, _ = self.view()
+        self.assertEqual((response["X-Cache"], response.json()["hp"]), ("MISS", 1))
+        # Bulk write of another process: only the change counter (hence the ETag) and the read model move.
+        Pokemon.objects.filter(pk=pikachu.pk).update(hp=2)
+        ChangeCounter.bump(Pokemon)
+        refresh_documents(Pokemon.objects.filter(pk=pikachu.pk))
+        response, _ = self.view()
+        self.assertEqual((response["X-Cache"], response.json()["hp"]), ("MISS", 2))
+
+    def test_stale_while_revalidate(self):
+        self.view()
+        Pokemon.objects.filter(number=25, version="").update(hp=3)
+        refresh_documents(Pokemon.objects.filter(number=25, version=""))
+        later = time.time() + 75
+        with mock.patch("api.response_cache.time.time", return_value=later), \
+                mock.patch("api.response_cache.start_refresh", side_effect=lambda function, *args: function(*args)) as refresh:
+            response, _ = self.view()
+            self.assertEqual((response["X-Cache"], response.json()["hp"]), ("STALE", 35))
+            refresh.assert_called_once()
+            response, _ = self.view()
+            self.assertEqual((response["X-Cache"], response.json()["hp"]), ("HIT", 3))
+        with mock.patch("api.response_cache.time.time", return_value=later + 60 + 31):
+            self.assertEqual(self.view()[0]["X-Cache"], "MISS")
+
+    def test_single_flight(self):
+        def leader():
+            response_cache.set("burst", (b'{"cached": true}', "application/json", time.time() + 60, time.time() + 60))
+            flights.release("burst")
+
+        with mock.patch("api.response_cache.cache_key", return_value="burst"):
+            # Another request is computing the key: wait for its response instead of querying.
+            self.assertIsNone(flights.acquire("burst"))
+            threading.Timer(0.05, leader).start()
+            response, queries = self.view()
+            self.assertEqual((response["X-Cache"], response.json()), ("HIT", {"cached": True}))
+            self.assertFalse([sql for sql in queries if 'FROM "pokemon_pokemondocument"' in sql])
+
+    def test_single_flight_election(self):
+        single_flight = SingleFlight()
+        self.assertIsNone(single_flight.acquire("key"))
+        event = single_flight.acquire("key")
+        self.assertFalse(event.is_set())
+        single_flight.release("key")
+        self.assertTrue(event.is_set())
+        self.assertIsNone(single_flight.acquire("key"))
+
+
+class DatabaseProfileTests(TestCase):
+    """Tests for the environment-driven database settings and the replica routing (project/database.py)."""
+
+    def test_sqlite_profile(self):
+        default = database_settings(Path("/srv"), {})["default"]
+        self.assertEqual(default["NAME"], Path("/srv/db.sqlite3"))
+        self.assertEqual(default["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        self.assertIn("PRAGMA journal_mode=WAL", default["OPTIONS"]["init_command"].split(";"))
+        self.assertIn("PRAGMA cache_size=-1024", database_settings(Path("/srv"), {"SQLITE_CACHE_KB": "1024"})["default"]["OPTIONS"]["init_command"])
+        self.assertEqual(database_settings(Path("/srv"), {"SQLITE_PROFILE": "off"})["default"]["OPTIONS"], {})
+
+    def test_server_profile(self):
+        databases = database_settings(Path("/srv"), {
+            "DB_ENGINE": "postgresql", "DB_HOST": "primary", "DB_POOL": "1", "DB_REPLICA_HOST": "replica",
+        })
+        self.assertEqual(databases["default"]["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(databases["default"]["CONN_MAX_AGE"], 0)
+        self.assertEqual(databases["default"]["OPTIONS"]["pool"]["max_size"], 10)
+        self.assertEqual((databases["replica"]["HOST"], databases["replica"]["TEST"]), ("replica", {"MIRROR": "default"}))
+        persistent = database_settings(Path("/srv"), {"DB_ENGINE": "mysql", "DB_CONN_MAX_AGE": "None"})
+        self.assertIsNone(persistent["default"]["CONN_MAX_AGE"])
+        self.assertNotIn("replica", persistent)
+        with self.assertRaises(ValueError):
+            database_settings(Path("/srv"), {"DB_ENGINE": "oracle"})
+
+    def test_replica_routing(self):
+        flags = {}
+
+        def get_response(request):
+            flags[request.method, request.path] = use_replica.get()
+            return None
+
+        middleware = ReplicaMiddleware(get_response)
+        factory = RequestFactory()
+        middleware(factory.get("/api/pokemon/view/1"))
+        middleware(factory.post("/api/type/create"))
+        middleware(factory.get("/admin/"))
+        self.assertEqual(list(flags.values()), [True, False, False])
+        self.assertFalse(use_replica.get())
+
+        async def aget_response(request):
+            flags[request.method, request.path] = use_replica.get()
+            return None
+
+        middleware = ReplicaMiddleware(aget_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        async_to_sync(middleware)(factory.get("/api/async/pokemon/view/1"))
+        self.assertTrue(flags["GET", "/api/async/pokemon/view/1"])
+        self.assertFalse(use_replica.get())
+
+        router = ReplicaRouter()
+        token = use_replica.set(True)
+        try:
+            self.assertIsNone(router.db_for_read(Pokemon))
+            with mock.patch.dict(settings.DATABASES, {"replica": {}}):
+                self.assertEqual(router.db_for_read(Pokemon), "replica")
+                self.assertEqual(router.db_for_write(Pokemon), "default")
+                self.assertFalse(router.allow_migrate("replica", "pokemon"))
+        finally:
+            use_replica.reset(token)
+
+
+class MetricsTests(ApiTestCase):
+    """Tests for the request instrumentation and the /metrics endpoint (project/metrics.py)."""
+
+    route = 'route="/api/pokemon/view/<number>",method="GET"'
+
+    def setUp(self):
+        super().setUp()
+        registry.clear()
+
+    def metrics(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        return response.content.decode()
+
+    def test_route_metrics(self):
+        with CaptureQueriesContext(connection) as context:
+            self.get_with_key("/api/pokemon/view/1")
+        self.get_with_key("/api/pokemon/view/2")
+        self.get_with_key("/api/pokemon/view/9999")
+        metrics = self.metrics()
+        self.assertIn(f'http_requests_total{{{self.route},status="200"}} 2', metrics)
+        self.assertIn(f'http_requests_total{{{self.route},status="404"}} 1', metrics)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{self.route},le="+Inf"}} 3', metrics)
+        self.assertIn(f'http_request_duration_seconds_count{{{self.route}}} 3', metrics)
+        self.assertIn("# TYPE http_request_db_queries histogram", metrics)
+        # The first request ran len(context) queries, all counted.
+        self.assertIn(f'http_request_db_queries_bucket{{{self.route},le="0"}} 0', metrics)
+        queries = next(line for line in metrics.splitlines() if line.startswith(f"http_request_db_queries_sum{{{self.route}}}"))
+        self.assertGreaterEqual(float(queries.split()[-1]), len(context))
+        serialization = next(line for line in metrics.splitlines() if line.startswith(f"http_request_serialization_seconds_sum{{{self.route}}}"))
+        self.assertGreater(float(serialization.split()[-1]), 0)
+
+    def test_serialization_covers_the_response_step(self):
+        create_response = api.create_response
+
+        def slow_create_response(*args, **kwargs):
+            time.sleep(0.05)
+            return create_response(*args, **kwargs)
+
+        # The validation by the response schema happens before the rendering: both are timed.
+        with mock.patch.object(api, "create_response", slow_create_response):
+            response = self.get_with_key("/api/pokemon/search?min_attack=100")
+        self.assertEqual(response.status_code, 200)
+        route = 'route="/api/pokemon/search",method="GET"'
+        serialization = next(line for line in self.metrics().splitlines() if line.startswith(f"http_request_serialization_seconds_sum{{{route}}}"))
+        self.assertGreaterEqual(float(serialization.split()[-1]), 0.05)
+
+    async def test_async_routes(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(MetricsMiddleware(get_response)))
+        response = await self.async_client.get("/api/async/pokemon/view/25", headers={"X-API-Key": self.api_key})
+        self.assertEqual(response.status_code, 200)
+        metrics = (await self.async_client.get("/metrics")).content.decode()
+        route = 'route="/api/async/pokemon/view/<number>",method="GET"'
+        self.assertIn(f'http_requests_total{{{route},status="200"}} 1', metrics)
+        queries = next(line for line in metrics.splitlines() if line.startswith(f"http_request_db_queries_sum{{{route}}}"))
+        self.assertGreater(float(queries.split()[-1]), 0)
+
+    def test_django_views(self):
+        self.client.get("/login/")
+        self.client.get("/no-such-page/")
+        metrics = self.metrics()
+        self.assertIn('http_requests_total{route="/login/",method="GET",status="200"} 1', metrics)
+        self.assertIn('http_requests_total{route="unmatched",method="GET",status="404"} 1', metrics)
+
+    def test_sampled_logging(self):
+        with self.assertLogs("pokemon.views", "INFO") as logs:
+            log_sampled(logging.getLogger("pokemon.views"), "home", rate=1, user="dawan")
+            log_sampled(logging.getLogger("pokemon.views"), "home", rate=0, user="ignored")
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(json.loads(logs.records[0].getMessage()), {"event": "home", "user": "dawan"})
+        with override_settings(LOG_SAMPLE_RATE=1), self.assertLogs("project.metrics", "INFO") as requests, \
+                self.assertLogs("api.pokemon", "INFO") as logs:
+            self.get_with_jwt("/api/pokemon/view-all/3")
+        self.assertIn('"user": "dawan"', logs.output[0])
+        self.assertEqual(json.loads(requests.records[0].getMessage())["route"], "/api/pokemon/view-all/<number>")
+
+
+class QueryDetectorTests(ApiTestCase):
+    """Tests for the N+1 and slow-query detector (project/querydetector.py)."""
+
+    def detector(self, **options):
+        return override_settings(QUERY_DETECTOR={
+            "ENABLED": True, "REPEAT_THRESHOLD": 5, "SLOW_QUERY_MS": 1000, "MAX_QUERIES": None, "RAISE": False, **options,
+        })
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT *  FROM t\nWHERE id = 3 AND name = 'O''Brien' AND pk IN (%s, %s, %s)"),
+            "SELECT * FROM t WHERE id = ? AND name = ? AND pk IN (...)",
+        )
+        self.assertEqual(normalize_sql("SELECT * FROM t WHERE id = 4"), normalize_sql("SELECT * FROM t WHERE id = 12"))
+
+    def test_n_plus_one(self):
+        numbers = list(Pokemon.objects.values_list("number", flat=True).distinct()[:6])
+
+        def handler(request):
+            # One query per pokemon, the pattern to detect.
+            return [Pokemon.objects.filter(number=number).first() for number in numbers]
+
+        request = RequestFactory().get("/api/pokemon/view/1")
+        request.resolver_match = resolve("/api/pokemon/view/1")
+        with self.detector(), self.assertLogs("project.querydetector", "WARNING") as logs:
+            QueryDetectorMiddleware(handler)(request)
+        message = logs.output[0]
+        self.assertIn("GET /api/pokemon/view/1 (route /api/pokemon/view/<number>)", message)
+        self.assertIn("N+1: 6 queries of the same shape", message)
+        self.assertIn("pokemon/tests.py:", message)
+        self.assertIn("in <listcomp>", message)
+
+        # Under the threshold, or with the detector off: nothing.
+        numbers = numbers[:4]
+        with self.detector(), self.assertNoLogs("project.querydetector"):
+            QueryDetectorMiddleware(handler)(request)
+        numbers = list(range(1, 10))
+        with self.detector(ENABLED=False), self.assertNoLogs("project.querydetector"):
+            QueryDetectorMiddleware(handler)(request)
+
+    def test_slow_query(self):
+        with self.detector(SLOW_QUERY_MS=0), self.assertLogs("project.querydetector", "WARNING") as logs:
+            response = self.get_with_key("/api/pokemon/view/3")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Slow query", logs.output[0])
+        # The handler is named by watch_api, without a decorator on the route.
+        self.assertIn("handler api.pokemon.pokemon_view (pokemon.py:", logs.output[0])
+        # Slow queries depend on the machine: RAISE (the test runner) keeps them as warnings.
+        with self.detector(SLOW_QUERY_MS=0, RAISE=True), self.assertLogs("project.querydetector", "WARNING"):
+            self.assertEqual(self.get_with_key("/api/pokemon/view/3").status_code, 200)
+
+    async def test_async_routes(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(QueryDetectorMiddleware(get_response)))
+        # No middleware of the chain is adapted between sync and async (Django logs each adaptation in DEBUG).
+        with override_settings(DEBUG=True), self.assertNoLogs("django.request", "DEBUG"):
+            ASGIHandler()
+        with self.detector(SLOW_QUERY_MS=0), self.assertLogs("project.querydetector", "WARNING") as logs:
+            response = await self.async_client.get("/api/async/pokemon/view/3", headers={"X-API-Key": self.api_key})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("GET /api/async/pokemon/view/3 (route /api/async/pokemon/view/<number>", logs.output[0])
+
+    def test_query_budget(self):
+        with self.detector(MAX_QUERIES=1, RAISE=True), self.assertRaises(QueryBudgetExceeded) as raised:
+            self.get_with_key("/api/pokemon/view/3")
+        self.assertIn("over the budget of 1", str(raised.exception))
+        with self.detector(MAX_QUERIES=3, RAISE=True):
+            self.assertEqual(self.get_with_key("/api/pokemon/view/4").status_code, 200)
+
+
+class ReadModelTests(ApiTestCase):
+    """Tests for the pre-serialized Pokémon responses (pokemon/readmodel.py)."""
+
+    def test_documents_match_schemas(self):
+        self.assertEqual(PokemonDocument.objects.count(), Pokemon.objects.count())
+        for pokemon in Pokemon.objects.for_schema().filter(number__in=[1, 4, 6]):
+            document = pokemon.document
+            self.assertEqual(json.loads(document.detail), PokemonSchema.from_orm(pokemon).model_dump(mode="json"))
+            self.assertEqual(json.loads(document.mini), PokemonSchemaMini.from_orm(pokemon).model_dump(mode="json"))
+
+    def test_single_lookup(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.get_with_key("/api/pokemon/view/6")
+        self.assertEqual(response.json()["type2"]["name"], "Flying")
+        queries = [query["sql"] for query in context.captured_queries if "pokemon_pokemondocument" in query["sql"]]
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("JOIN", queries[0])
+
+    def test_pokemon_writes(self):
+        bulbasaur = Pokemon.objects.get(number=1, version="")
+        bulbasaur.hp = 99
+        with self.captureOnCommitCallbacks(execute=True):
+            bulbasaur.save()
+        self.assertEqual(self.get_with_key("/api/pokemon/view/1").json()["hp"], 99)
+        with self.captureOnCommitCallbacks(execute=True):
+            bulbasaur.delete()
+        self.assertEqual(self.get_with_key("/api/pokemon/view/1").status_code, 404)
+        self.assertFalse(PokemonDocument.objects.filter(pk=bulbasaur.pk).exists())
+
+    def test_type_rename(self):
+        grass = Type.objects.get(name="Grass")
+        count = Pokemon.objects.filter(Q(type1=grass) | Q(type2=grass)).count()
+        response = self.client.put(
+            "/api/type/edit/Grass", {"id": grass.pk, "name": "Plant", "description": ""}, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(PokemonDocument.objects.filter(detail__contains='"name":"Plant"').count(), count)
+        self.assertEqual(self.get_with_key("/api/pokemon/view/1").json()["type1"]["name"], "Plant")
+        self.assertEqual(self.client.get("/api/querysets/pokemons").json()["items"][0]["type1_name"], "Plant")
+
+    def test_generation_and_bulk_type_updates(self):
+        generation = Generation.objects.get(number=1)
+        generation.description = "Kanto"
+        generation.save()
+        self.assertEqual(self.get_with_key("/api/pokemon/view/4").json()["generation"]["description"], "Kanto")
+        response = self.client.post(
+            "/api/type/bulk", [{"name": "Fire", "description": "Hot."}], content_type="application/json",
+        )
+        self.assertEqual(response.json()["counts"]["updated"], 1)
+        self.assertEqual(self.get_with_key("/api/pokemon/view/4").json()["type1"]["description"], "Hot.")
+
+    def test_unchanged_type_keeps_documents(self):
+        with mock.patch("pokemon.signals.refresh_related") as refresh:
+            Type.objects.update_or_create(name="Fire", defaults={"description": Type.objects.get(name="Fire").description})
+            Generation.objects.get(number=1).save()
+            refresh.assert_not_called()
+            Generation.objects.filter(number=1).first().save(update_fields=["number"])
+            refresh.assert_not_called()
+            Type.objects.update_or_create(name="Fire", defaults={"description": "Hot."})
+            refresh.assert_called_once_with(types=[Type.objects.get(name="Fire").pk])
+
+    def test_refresh_command(self):
+        etag = self.get_with_key("/api/pokemon/view/1")["ETag"]
+        Pokemon.objects.filter(number=1, version="").update(hp=7)
+        out = StringIO()
+        call_command("refreshdocuments", stdout=out)
+        self.assertIn(f"Rendered {Pokemon.objects.count()} documents", out.getvalue())
+        # Neither a 304 on the old ETag nor the cached response.
+        response = self.client.get("/api/pokemon/view/1", headers={"X-API-Key": self.api_key, "If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["hp"], 7)
+
+    def test_missing_documents_rendered_after_migrate(self):
+        PokemonDocument.objects.filter(number__in=[1, 25]).delete()
+        call_command("migrate", verbosity=0)
+        self.assertEqual(PokemonDocument.objects.count(), Pokemon.objects.count())
+        self.assertEqual(self.get_with_key("/api/pokemon/view/25").json()["name"], "Pikachu")
+
+
+class ViewManyTests(ApiTestCase):
+    """Tests for the batch lookup /api/pokemon/view-many and the DataLoader (api/loaders.py)."""
+
+    url = "/api/pokemon/view-many"
+
+    def view_many(self, keys):
+        return self.client.post(self.url, {"keys": keys}, content_type="application/json", headers={"X-API-Key": self.api_key})
+
+    def test_request_order_and_misses(self):
+        keys = [{"number": 6, "version": "Mega Charizard X"}, {"number": 9999}, {"number": 25}, {"number": 6, "version": "Nope"}, {"number": 25}]
+        response = self.view_many(keys)
+        self.assertEqual(response.status_code, 200)
+        items = response.json()["items"]
+        self.assertEqual(
+            [(item["number"], item["version"], item["found"]) for item in items],
+            [(6, "Mega Charizard X", True), (9999, "", False), (25, "", True), (6, "Nope", False), (25, "", True)],
+        )
+        self.assertEqual(items[0]["pokemon"]["type2"]["name"], "Dragon")
+        self.assertIsNone(items[1]["pokemon"])
+        self.assertEqual(items[2]["pokemon"], self.get_with_key("/api/pokemon/view/25").json())
+
+    def test_single_query(self):
+        keys = [{"number": number} for number in range(1, 29)]
+        with CaptureQueriesContext(connection) as context:
+            response = self.view_many(keys)
+        self.assertTrue(all(item["found"] for item in response.json()["items"]))
+        documents = [query for query in context.captured_queries if "pokemon_pokemondocument" in query["sql"]]
+        self.assertEqual(len(documents), 1)
+        # API key with its user + its permissions + documents
+        self.assertLessEqual(len(context), 3)
+
+    def test_validation(self):
+        self.assertEqual(self.view_many([]).status_code, 422)
+        self.assertEqual(self.view_many([{"number": 1}] * 501).status_code, 422)
+        # Out of the range of the number column: a 422, not an OverflowError in the query.
+        self.assertEqual(self.view_many([{"number": 10 ** 20}]).status_code, 422)
+        self.assertEqual(self.view_many([{"number": -1}]).status_code, 422)
+        self.assertEqual(self.view_many([{"number": 32767}]).status_code, 200)
+        self.assertEqual(self.client.post(self.url, {"keys": [{"number": 1}]}, content_type="application/json").status_code, 401)
+
+    def test_data_loader(self):
+        calls = []
+
+        def batch_load(keys):
+            calls.append(keys)
+            return {key: key * 10 for key in keys if key != 3}
+
+        loader = DataLoader(batch_load, max_batch_size=2, default=-1)
+        pending = [loader.load(key) for key in [1, 2, 1, 3]]
+        self.assertEqual(calls, [])
+        self.assertEqual([item.get() for item in pending], [10, 20, 10, -1])
+        self.assertEqual(calls, [[1, 2], [3]])
+        # Cached: only the new key is loaded.
+        self.assertEqual(loader.load_many([2, 4]), [20, 40])
+        self.assertEqual(calls[-1], [4])
+        loader.prime(5, 0)
+        loader.clear(4)
+        self.assertEqual((loader.get(5), loader.get(4)), (0, 40))
+        self.assertEqual(calls[-1], [4])
+
+    def test_request_loader(self):
+        request = RequestFactory().get("/")
+        loader = request_loader(request, "numbers", dict.fromkeys)
+        self.assertIs(request_loader(request, "numbers", dict.fromkeys), loader)
+        self.assertIsNot(request_loader(RequestFactory().get("/"), "numbers", dict.fromkeys), loader)
@@ -0,0 +1,85 @@
+"""
+Batched recording of the API key last-used timestamps.
+
+Authenticated requests only note the time in memory; a daemon thread writes
+the pending timestamps every settings.API_KEY_LAST_USED_INTERVAL seconds, in
+one bulk upsert, instead of one UPDATE per request.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from pokemon.models import APIKey, APIKeyUsage
+
+logger = logging.getLogger(__name__)
+
+
+class LastUsedRecorder:
+    """
+    Collects the last use of each API key and flushes them in batches.
+
+    With API_KEY_LAST_USED_INTERVAL = None no thread is started: the
+    timestamps are written by flush() calls only (and at exit).
+    """
+
+    def __init__(self):
+        self._pending: dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        atexit.register(self._flush_at_exit)
+
+    def record(self, prefix: str) -> None:
+        with self._lock:
+            self._pending[prefix] = timezone.now()
+        if self._thread is None:
+            self._start()
+
+    def _start(self) -> None:
+        interval = getattr(settings, "API_KEY_LAST_USED_INTERVAL", 60)
+        if not interval:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(interval,), name="api-key-usage", daemon=True)
+        self._thread.start()
+
+    def _run(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except DatabaseError:
+                logger.exception("Could not record the API key usage.")
+            finally:
+                # The thread must not keep a connection open between two flushes.
+                connection.close()
+
+    def _flush_at_exit(self) -> None:
+        try:
+            self.flush()
+        except DatabaseError:
+            logger.exception("Could not record the API key usage.")
+
+    def flush(self) -> int:
+        """Writes the pending timestamps and returns how many keys were updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        # Keys deleted since their last use are dropped.
+        existing = APIKey.objects.filter(prefix__in=pending).values_list("prefix", flat=True)
+        usages = [APIKeyUsage(api_key_id=prefix, last_used_at=pending[prefix]) for prefix in existing]
+        APIKeyUsage.objects.bulk_create(
+            usages, update_conflicts=True, unique_fields=["api_key"], update_fields=["last_used_at"]
+        )
+        return len(usages)
+
+
+api_key_usage = LastUsedRecorder()
@@ -1,7 +1,12 @@
 from django.shortcuts import redirect, render
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import login, logout
+import logging
+
 from pokemon.forms import LoginForm
+from project.metrics import log_sampled
+
+logger = logging.getLogger(__name__)
 
 
 
@@ -13,9 +18,8 @@ def view_home(request):
     user = request.user
     # Get whether the user has permission to view the pokemon.pokemon model
     can_view_pokemon = user.has_perm("pokemon.view_pokemon")
-    # Show the informations cleanly in the console
-    print(f"User: {user}")
-    print(f"Can view pokemon: {can_view_pokemon}")
+    # Journalisé pour une fraction des requêtes seulement (settings.LOG_SAMPLE_RATE)
+    log_sampled(logger, "home", user=user.get_username(), can_view_pokemon=can_view_pokemon)
     return render(request, "pokemon/page-home.html", context={})
 
 
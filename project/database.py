@@ -0,0 +1,161 @@
+"""
+Database performance profile, driven by environment variables.
+
+SQLite (default, DB_ENGINE unset):
+    Every connection runs init pragmas: WAL journal (readers no longer block
+    the writer and the other way round), synchronous=NORMAL (safe with WAL,
+    one fsync per checkpoint instead of per commit), a memory-mapped file and
+    a larger page cache. Writers wait up to DB_BUSY_TIMEOUT seconds for the
+    lock, and transactions start with BEGIN IMMEDIATE: a transaction that
+    reads then writes can no longer fail with "database is locked" when it
+    upgrades its lock, the busy timeout applies at BEGIN instead.
+    SQLITE_PROFILE=off restores the default SQLite settings.
+
+Server databases (DB_ENGINE=postgresql or mysql):
+    Persistent connections (DB_CONN_MAX_AGE, with health checks), or a
+    psycopg connection pool with DB_POOL=1 (PostgreSQL). DB_REPLICA_HOST adds
+    a "replica" alias: ReplicaRouter sends the reads of GET/HEAD API requests
+    to it, everything else goes to "default".
+"""
+
+import contextvars
+import os
+from pathlib import Path
+from typing import Any, Callable, Mapping
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+# True while the current request may read from the replica.
+use_replica: contextvars.ContextVar[bool] = contextvars.ContextVar("use_replica", default=False)
+
+ENGINES = {
+    "sqlite": "django.db.backends.sqlite3",
+    "postgresql": "django.db.backends.postgresql",
+    "mysql": "django.db.backends.mysql",
+}
+
+
+def sqlite_pragmas(environ: Mapping[str, str]) -> list[str]:
+    mmap_size = int(environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    cache_size = int(environ.get("SQLITE_CACHE_KB", str(64 * 1024)))
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA mmap_size={mmap_size}",
+        # Negative: a size in KiB rather than in pages.
+        f"PRAGMA cache_size=-{cache_size}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def database_settings(base_dir: Path, environ: Mapping[str, str] = os.environ, name: Any = None) -> dict:
+    """
+    Builds settings.DATABASES from the environment.
+
+    `name` overrides DB_NAME (e.g. the file of the benchmarks).
+    """
+    engine = environ.get("DB_ENGINE", "sqlite")
+    if engine not in ENGINES:
+        raise ValueError(f"DB_ENGINE must be one of {', '.join(ENGINES)}, not {engine!r}.")
+    conn_max_age = environ.get("DB_CONN_MAX_AGE", "60")
+    default = {
+        "ENGINE": ENGINES[engine],
+        "NAME": name or environ.get("DB_NAME") or (base_dir / "db.sqlite3" if engine == "sqlite" else "pokemon"),
+        # "None" keeps the connections open for the lifetime of the worker.
+        "CONN_MAX_AGE": None if conn_max_age.lower() == "none" else int(conn_max_age),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+
+    if engine == "sqlite":
+        if environ.get("SQLITE_PROFILE", "on").lower() != "off":
+            default["OPTIONS"] = {
+                "init_command": ";".join(sqlite_pragmas(environ)),
+                "timeout": float(environ.get("DB_BUSY_TIMEOUT", "20")),
+                "transaction_mode": "IMMEDIATE",
+            }
+        return {"default": default}
+
+    default.update({
+        "USER": environ.get("DB_USER", ""),
+        "PASSWORD": environ.get("DB_PASSWORD", ""),
+        "HOST": environ.get("DB_HOST", ""),
+        "PORT": environ.get("DB_PORT", ""),
+    })
+    if engine == "postgresql" and environ.get("DB_POOL", "0") == "1":
+        # The pool replaces the persistent connections (Django requires CONN_MAX_AGE=0).
+        default["CONN_MAX_AGE"] = 0
+        default["OPTIONS"]["pool"] = {
+            "min_size": int(environ.get("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(environ.get("DB_POOL_MAX_SIZE", "10")),
+        }
+    databases = {"default": default}
+    if environ.get("DB_REPLICA_HOST"):
+        databases["replica"] = {
+            **default,
+            "OPTIONS": dict(default["OPTIONS"]),
+            "HOST": environ["DB_REPLICA_HOST"],
+            "PORT": environ.get("DB_REPLICA_PORT", default["PORT"]),
+            "TEST": {"MIRROR": "default"},
+        }
+    return databases
+
+
+class ReplicaRouter:
+    """Sends the reads of the requests flagged by ReplicaMiddleware to the "replica" alias."""
+
+    def db_for_read(self, model, **hints) -> str | None:
+        if use_replica.get() and "replica" in settings.DATABASES:
+            return "replica"
+        return None
+
+    def db_for_write(self, model, **hints) -> str:
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool:
+        return db == "default"
+
+
+class ReplicaMiddleware:
+    """
+    Flags the GET/HEAD requests of the API as replica reads.
+
+    Writes (POST/PUT/DELETE) and the admin keep reading from "default", so
+    they always see their own changes despite the replication lag.
+
+    Sync and async: under ASGI, the async routes are not run in a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = use_replica.set(self.reads_from_replica(request))
+        try:
+            return self.get_response(request)
+        finally:
+            use_replica.reset(token)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        token = use_replica.set(self.reads_from_replica(request))
+        try:
+            return await self.get_response(request)
+        finally:
+            use_replica.reset(token)
+
+    @staticmethod
+    def reads_from_replica(request: HttpRequest) -> bool:
+        return request.method in ("GET", "HEAD") and request.path.startswith("/api/")
@@ -0,0 +1,282 @@
+"""
+Request instrumentation: in-process metrics registry exposed to Prometheus.
+
+MetricsMiddleware times every request (ninja API and Django views), counts
+the database queries and their time with `connection.execute_wrapper`, and
+collects the serialization time of the API: ninja's response step (response
+schema validation, model_dump and rendering, see time_serialization, called
+from api/ninja.py) and the encodings done in the views (api/renderers.py),
+without the queries they run. The values go
+to per-route counters and fixed-bucket histograms held in memory (one lock
+acquisition per request, no I/O); `metrics_view` renders them in the
+Prometheus text format at /metrics.
+
+Each process has its own registry: with several workers, Prometheus scrapes
+one of them per scrape, which is fine for rates and latency distributions.
+
+log_sampled writes a structured (JSON) log line for a fraction of the calls
+only (settings.LOG_SAMPLE_RATE), keeping stdout off the hot path.
+"""
+
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from functools import wraps
+from typing import Any, Callable
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestMetrics:
+    """Accumulates the measures of the request being handled."""
+
+    __slots__ = ("queries", "query_time", "serialization_time", "serializing")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.serialization_time = 0.0
+        # True inside a timed_serialization call: the nested ones are not counted twice.
+        self.serializing = False
+
+
+# Measures of the current request, None outside of MetricsMiddleware.
+current_request: contextvars.ContextVar[RequestMetrics | None] = contextvars.ContextVar("current_request", default=None)
+
+
+class Histogram:
+    """Cumulative-on-export histogram with fixed upper bounds."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bound plus +Inf.
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# name -> (type, help, histogram bounds or None for a counter)
+METRICS = {
+    "http_requests_total": ("counter", "Requests handled, by route, method and status.", None),
+    "http_request_duration_seconds": ("histogram", "Time spent handling the request.", LATENCY_BUCKETS),
+    "http_request_db_queries": ("histogram", "Database queries per request.", QUERY_BUCKETS),
+    "http_request_db_duration_seconds": ("histogram", "Time spent in database queries per request.", LATENCY_BUCKETS),
+    "http_request_serialization_seconds": ("histogram", "Time spent validating and rendering the API response.", LATENCY_BUCKETS),
+}
+
+
+class MetricsRegistry:
+    """Thread-safe store of the counters and histograms, keyed by (metric, labels)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, tuple], Any] = {}
+
+    def record(self, route: str, method: str, status: int, duration: float, measures: RequestMetrics) -> None:
+        labels = (("route", route), ("method", method))
+        observations = [
+            ("http_request_duration_seconds", duration),
+            ("http_request_db_queries", measures.queries),
+            ("http_request_db_duration_seconds", measures.query_time),
+            ("http_request_serialization_seconds", measures.serialization_time),
+        ]
+        counter = ("http_requests_total", labels + (("status", str(status)),))
+        with self._lock:
+            self._values[counter] = self._values.get(counter, 0) + 1
+            for name, value in observations:
+                histogram = self._values.get((name, labels))
+                if histogram is None:
+                    histogram = self._values[(name, labels)] = Histogram(METRICS[name][2])
+                histogram.observe(value)
+
+    def render(self) -> str:
+        """The registry in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            values = sorted(
+                ((name, labels, value if isinstance(value, int) else (list(value.counts), value.sum, value.count)))
+                for (name, labels), value in self._values.items()
+            )
+        lines = []
+        for metric, (kind, description, bounds) in METRICS.items():
+            lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {kind}"]
+            for name, labels, value in values:
+                if name != metric:
+                    continue
+                if bounds is None:
+                    lines.append(f"{metric}{{{format_labels(labels)}}} {value}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket in zip(list(bounds) + ["+Inf"], counts):
+                    cumulative += bucket
+                    lines.append(f'{metric}_bucket{{{format_labels(labels + (("le", str(bound)),))}}} {cumulative}')
+                lines.append(f"{metric}_sum{{{format_labels(labels)}}} {total!r}")
+                lines.append(f"{metric}_count{{{format_labels(labels)}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+def format_labels(labels: tuple) -> str:
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped))
+
+
+registry = MetricsRegistry()
+
+
+def count_query(execute: Callable, sql: str, params: Any, many: bool, context: dict) -> Any:
+    """execute_wrapper adding each query and its duration to the current request."""
+    measures = current_request.get()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if measures is not None:
+            measures.queries += 1
+            measures.query_time += time.perf_counter() - start
+
+
+def timed_serialization(function: Callable) -> Callable:
+    """
+    Adds the duration of the calls of `function` to the serialization time of the request,
+    less the queries they run (e.g. a lazy queryset evaluated by the response schema).
+    """
+    @wraps(function)
+    def timed(*args: Any, **kwargs: Any) -> Any:
+        measures = current_request.get()
+        if measures is None or measures.serializing:
+            return function(*args, **kwargs)
+        measures.serializing = True
+        query_time = measures.query_time
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            measures.serializing = False
+            measures.serialization_time += time.perf_counter() - start - (measures.query_time - query_time)
+
+    return timed
+
+
+def time_serialization(api) -> None:
+    """
+    Times the response step of every operation of the NinjaAPI (`Operation._result_to_response`:
+    response schema validation, model_dump and rendering) as serialization.
+    """
+    for _, router in api._routers:
+        for path_view in router.path_operations.values():
+            for operation in path_view.operations:
+                if not getattr(operation._result_to_response, "_timed", False):
+                    operation._result_to_response = timed_serialization(operation._result_to_response)
+                    operation._result_to_response._timed = True
+
+
+def route_of(request: HttpRequest) -> str:
+    # The URL pattern, not the path: one series per route whatever the parameters.
+    match = getattr(request, "resolver_match", None)
+    return f"/{match.route}" if match is not None and match.route else "unmatched"
+
+
+def log_sampled(logger: logging.Logger, event: str, rate: float | None = None, **fields: Any) -> None:
+    """
+    Logs `event` and its fields as one JSON line, for a fraction `rate` of the calls
+    (default settings.LOG_SAMPLE_RATE). Nothing is formatted for the calls not sampled.
+    """
+    rate = getattr(settings, "LOG_SAMPLE_RATE", 0.01) if rate is None else rate
+    if rate <= 0 or not logger.isEnabledFor(logging.INFO) or random.random() >= rate:
+        return
+    logger.info(json.dumps({"event": event, **fields}, default=str))
+
+
+def wrap_connections(stack: ExitStack, wrapper: Callable) -> None:
+    """
+    Installs an execute_wrapper on the connections of the current thread until `stack` is closed.
+
+    Django's connections are per thread: an async request runs its queries in its
+    thread-sensitive executor (the async ORM, sync_to_async), so the async
+    middlewares call it there through sync_to_async.
+    """
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(wrapper))
+
+
+class MetricsMiddleware:
+    """
+    Records the metrics of each request; to put first in settings.MIDDLEWARE.
+
+    Sync and async: under ASGI, the async routes are not run in a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        measures = RequestMetrics()
+        token = current_request.set(measures)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                wrap_connections(stack, count_query)
+                response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.record(request, response, time.perf_counter() - start, measures)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        measures = RequestMetrics()
+        token = current_request.set(measures)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                await sync_to_async(wrap_connections)(stack, count_query)
+                response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.record(request, response, time.perf_counter() - start, measures)
+        return response
+
+    @staticmethod
+    def record(request: HttpRequest, response: HttpResponse, duration: float, measures: RequestMetrics) -> None:
+        route = route_of(request)
+        registry.record(route, request.method, response.status_code, duration, measures)
+        log_sampled(
+            logger, "request", route=route, method=request.method, status=response.status_code,
+            duration_ms=round(duration * 1000, 3), queries=measures.queries,
+            db_ms=round(measures.query_time * 1000, 3), serialization_ms=round(measures.serialization_time * 1000, 3),
+        )
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Prometheus scrape endpoint (/metrics)."""
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,258 @@
+"""
+N+1 and slow-query detector, for development and CI.
+
+QueryDetectorMiddleware records the SQL executed by each request (through
+`connection.execute_wrapper`), groups it by normalized shape (literals and
+IN lists replaced by placeholders) and reports:
+    - N+1 patterns: the same SELECT shape executed REPEAT_THRESHOLD times or
+      more (writes are left out: bulk_create/bulk_update repeat the same
+      statement once per batch on purpose);
+    - slow queries: above SLOW_QUERY_MS;
+    - requests over MAX_QUERIES queries.
+Each report names the route, the ninja handler (see watch_api, called from
+api/ninja.py) and the first line of project code that ran the query.
+
+It is configured by settings.QUERY_DETECTOR and enabled in DEBUG. With RAISE,
+an N+1 or a request over budget raises QueryBudgetExceeded instead of logging
+a warning: that is what QueryBudgetRunner does, so that the test suite fails
+on an N+1. Slow queries are always logged only: their timing depends on the
+machine, not on the code.
+"""
+
+import contextvars
+import inspect
+import logging
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from project.metrics import route_of, wrap_connections
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Instrumentation frames, skipped when looking for the code that ran a query.
+SKIPPED_FILES = {__file__, str(BASE_DIR / "project" / "metrics.py")}
+
+DEFAULTS = {
+    "ENABLED": False,
+    "REPEAT_THRESHOLD": 5,
+    "SLOW_QUERY_MS": 100,
+    "MAX_QUERIES": None,
+    "RAISE": False,
+}
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?|NULL)\s*,?)+\)", re.IGNORECASE)
+SPACES = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in RAISE mode; an AssertionError so that the test reports a failure."""
+
+
+def config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "QUERY_DETECTOR", {})}
+
+
+def normalize_sql(sql: str) -> str:
+    """The shape of a query: "... WHERE id = 3" and "... WHERE id = 4" have the same one."""
+    sql = STRING.sub("?", sql)
+    sql = NUMBER.sub("?", sql)
+    sql = IN_LIST.sub("IN (...)", sql)
+    return SPACES.sub(" ", sql).strip()
+
+
+def caller() -> str:
+    """The innermost frame of the project (outside this module and the installed packages)."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(str(BASE_DIR)) and filename not in SKIPPED_FILES and "site-packages" not in filename:
+            return f"{Path(filename).relative_to(BASE_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class QueryRecorder:
+    """The queries of one request, by shape."""
+
+    def __init__(self, slow_query_ms: float):
+        self.slow_query_ms = slow_query_ms
+        self.handler: str | None = None
+        self.count = 0
+        self.shapes: dict[str, list[tuple[float, str]]] = defaultdict(list)
+        self.slow: list[tuple[float, str, str]] = []
+
+    def __call__(self, execute: Callable, sql: str, params: Any, many: bool, context: dict) -> Any:
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            location = caller()
+            self.count += 1
+            self.shapes[normalize_sql(sql)].append((duration, location))
+            if duration * 1000 >= self.slow_query_ms:
+                self.slow.append((duration, sql, location))
+
+    def problems(self, options: dict) -> list[str]:
+        """The N+1 patterns and the budget overrun: the reports that RAISE turns into failures."""
+        problems = []
+        for shape, executions in self.shapes.items():
+            if len(executions) >= options["REPEAT_THRESHOLD"] and shape.upper().startswith("SELECT"):
+                locations = sorted({location for _, location in executions})
+                problems.append(
+                    f"N+1: {len(executions)} queries of the same shape, from {', '.join(locations)}: {shape[:300]}"
+                )
+        if options["MAX_QUERIES"] is not None and self.count > options["MAX_QUERIES"]:
+            problems.append(f"{self.count} queries, over the budget of {options['MAX_QUERIES']}")
+        return problems
+
+    def slow_queries(self) -> list[str]:
+        return [f"Slow query ({duration * 1000:.0f} ms), from {location}: {sql[:300]}" for duration, sql, location in self.slow]
+
+
+# Recorder of the current request, None when the detector is off.
+current_recorder: contextvars.ContextVar[QueryRecorder | None] = contextvars.ContextVar("current_recorder", default=None)
+
+
+class QueryDetectorMiddleware:
+    """
+    Runs the detector on every request while settings.QUERY_DETECTOR["ENABLED"] is true.
+
+    Sync and async: under ASGI, the async routes are not run in a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        options = config()
+        if not options["ENABLED"]:
+            return self.get_response(request)
+
+        recorder = QueryRecorder(options["SLOW_QUERY_MS"])
+        token = current_recorder.set(recorder)
+        try:
+            with ExitStack() as stack:
+                wrap_connections(stack, recorder)
+                response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.report(request, recorder, options)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        options = config()
+        if not options["ENABLED"]:
+            return await self.get_response(request)
+
+        recorder = QueryRecorder(options["SLOW_QUERY_MS"])
+        token = current_recorder.set(recorder)
+        try:
+            with ExitStack() as stack:
+                await sync_to_async(wrap_connections)(stack, recorder)
+                response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.report(request, recorder, options)
+        return response
+
+    @staticmethod
+    def report(request: HttpRequest, recorder: QueryRecorder, options: dict) -> None:
+        where = f"{request.method} {request.get_full_path()} (route {route_of(request)}"
+        where += f", handler {recorder.handler})" if recorder.handler else ")"
+        problems, slow = recorder.problems(options), recorder.slow_queries()
+        if problems and options["RAISE"]:
+            raise QueryBudgetExceeded(f"{where}:\n  " + "\n  ".join(problems + slow))
+        if problems or slow:
+            logger.warning(f"{where}:\n  " + "\n  ".join(problems + slow))
+
+
+def handler_name(view_func: Callable) -> str:
+    code = inspect.unwrap(view_func).__code__
+    return f"{view_func.__module__}.{view_func.__name__} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def watch_api(api) -> None:
+    """
+    Wraps the operations of every router of the NinjaAPI so the reports name the
+    handler of the request: the queries of a lazy queryset run during the
+    serialization, after the handler has returned.
+    """
+    for _, router in api._routers:
+        for path_view in router.path_operations.values():
+            for operation in path_view.operations:
+                name = handler_name(operation.view_func)
+                run = operation.run
+
+                def run_watched(request: HttpRequest, __run=run, __name=name, **kw: Any) -> Any:
+                    recorder = current_recorder.get()
+                    if recorder is not None:
+                        recorder.handler = __name
+                    return __run(request, **kw)
+
+                if not getattr(run, "_watched", False):
+                    operation.run = wraps(run)(run_watched)
+                    operation.run._watched = True
+
+
+class QueryBudgetRunner(DiscoverRunner):
+    """
+    Test runner failing every request of the test client that shows an N+1 pattern
+    or (with --query-budget) too many queries. Slow queries are logged, not failed:
+    CI machines are slower than the threshold was set for.
+
+        python manage.py test --query-budget 10 --repeat-threshold 3
+        python manage.py test --no-query-detector
+    """
+
+    def __init__(self, query_budget: int | None = None, repeat_threshold: int | None = None,
+                 query_detector: bool = True, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.query_detector = query_detector
+        self.options = {"ENABLED": True, "RAISE": True, "MAX_QUERIES": query_budget}
+        if repeat_threshold is not None:
+            self.options["REPEAT_THRESHOLD"] = repeat_threshold
+        self._override = None
+
+    @classmethod
+    def add_arguments(cls, parser) -> None:
+        super().add_arguments(parser)
+        parser.add_argument("--query-budget", type=int, help="Maximum number of queries per request.")
+        parser.add_argument("--repeat-threshold", type=int, help="Number of queries of the same shape reported as N+1.")
+        parser.add_argument("--no-query-detector", dest="query_detector", action="store_false",
+                            help="Do not fail the tests on N+1 patterns and query budgets.")
+
+    def setup_test_environment(self, **kwargs: Any) -> None:
+        super().setup_test_environment(**kwargs)
+        if self.query_detector:
+            self._override = override_settings(QUERY_DETECTOR={**config(), **self.options})
+            self._override.enable()
+
+    def teardown_test_environment(self, **kwargs: Any) -> None:
+        if self._override is not None:
+            self._override.disable()
+        super().teardown_test_environment(**kwargs)
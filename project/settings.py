@@ -14,6 +14,8 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
+from project.database import database_settings
+
 # Charger le fichier .env
 load_dotenv()
 
@@ -49,6 +51,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # En premier : mesure la durée complète de chaque requête (voir project/metrics.py, exposé sur /metrics)
+    'project.metrics.MetricsMiddleware',
+    # Détection des N+1 et des requêtes SQL lentes, active si QUERY_DETECTOR['ENABLED'] (voir project/querydetector.py)
+    'project.querydetector.QueryDetectorMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,6 +62,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Lectures des GET de l'API sur la réplique, si DB_REPLICA_HOST est défini (voir project/database.py)
+    'project.database.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'project.urls'
@@ -81,13 +89,121 @@ WSGI_APPLICATION = 'project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+# Profil de performance piloté par l'environnement, voir project/database.py :
+# - SQLite (par défaut) : WAL, synchronous=NORMAL, mmap, cache, busy timeout (DB_BUSY_TIMEOUT)
+#   et BEGIN IMMEDIATE, pour que les écritures concurrentes attendent au lieu d'échouer
+#   ("database is locked"). SQLITE_PROFILE=off pour revenir aux réglages par défaut.
+# - DB_ENGINE=postgresql ou mysql : DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT,
+#   connexions persistantes (DB_CONN_MAX_AGE) ou pool (DB_POOL=1, PostgreSQL),
+#   et réplique en lecture (DB_REPLICA_HOST) pour les GET de l'API.
+DATABASES = database_settings(BASE_DIR)
+
+DATABASE_ROUTERS = ['project.database.ReplicaRouter']
+
+
+# Journalisation : lignes JSON (project/metrics.py: log_sampled) écrites pour une fraction
+# LOG_SAMPLE_RATE des requêtes seulement, pour garder les écritures sur stdout hors du chemin critique.
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.01'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'structured'},
+    },
+    'loggers': {
+        name: {'handlers': ['console'], 'level': os.environ.get('LOG_LEVEL', 'INFO'), 'propagate': False}
+        for name in ('api', 'pokemon', 'project')
+    },
+}
+
+# Détecteur de requêtes SQL (project/querydetector.py), actif par défaut en DEBUG.
+# Signale les requêtes de même forme répétées REPEAT_THRESHOLD fois ou plus (N+1), celles
+# de plus de SLOW_QUERY_MS millisecondes et les requêtes HTTP de plus de MAX_QUERIES requêtes SQL.
+# RAISE : lève une exception au lieu d'écrire un avertissement (mode du lanceur de tests).
+QUERY_DETECTOR = {
+    'ENABLED': os.environ.get('QUERY_DETECTOR', str(DEBUG)).lower() == 'true',
+    'REPEAT_THRESHOLD': int(os.environ.get('QUERY_DETECTOR_REPEAT_THRESHOLD', '5')),
+    'SLOW_QUERY_MS': float(os.environ.get('QUERY_DETECTOR_SLOW_QUERY_MS', '100')),
+    'MAX_QUERIES': None,
+    'RAISE': False,
+}
+
+# Les tests échouent sur un N+1, les requêtes lentes sont seulement signalées (python manage.py test --query-budget N
+# pour limiter aussi le nombre de requêtes, --no-query-detector pour désactiver).
+TEST_RUNNER = 'project.querydetector.QueryBudgetRunner'
+
+
+# Cache des données de référence (types, générations), voir pokemon/cache.py.
+# BACKEND : alias optionnel d'un cache de CACHES partagé entre les workers (ex : "default").
+REFERENCE_CACHE = {
+    'TTL': int(os.environ.get('REFERENCE_CACHE_TTL', '300')),
+    'MAXSIZE': 1024,
+    'BACKEND': os.environ.get('REFERENCE_CACHE_BACKEND') or None,
+}
+
+# Cache des réponses rendues (api/response_cache.py), ex : /api/pokemon/view/{number}.
+# TTL : durée maximale de conservation d'une entrée (fraîche puis périmée), quelle que soit la route.
+RESPONSE_CACHE = {
+    'TTL': int(os.environ.get('RESPONSE_CACHE_TTL', '600')),
+    'MAXSIZE': 4096,
+    'BACKEND': os.environ.get('RESPONSE_CACHE_BACKEND') or None,
+}
+
+# Cache des clés API vérifiées, voir api/authentification.py.
+# Sans BACKEND partagé, une clé révoquée reste acceptée au plus TTL secondes par les autres workers.
+API_KEY_CACHE = {
+    'TTL': int(os.environ.get('API_KEY_CACHE_TTL', '60')),
+    'MAXSIZE': 4096,
+    'BACKEND': os.environ.get('API_KEY_CACHE_BACKEND') or None,
+}
+
+# Cache des identifiants Basic auth vérifiés (HMAC des identifiants -> id de l'utilisateur), voir api/authentification.py.
+CREDENTIALS_CACHE = {
+    'TTL': int(os.environ.get('CREDENTIALS_CACHE_TTL', '30')),
+    'MAXSIZE': 1024,
+    'BACKEND': os.environ.get('CREDENTIALS_CACHE_BACKEND') or None,
 }
 
+# Limitation optionnelle des échecs de connexion Basic auth (par IP et username), désactivée par défaut.
+# Exemple : BASIC_AUTH_THROTTLE=5/300 refuse (429) les tentatives après 5 échecs en 300 secondes.
+BASIC_AUTH_THROTTLE = (
+    dict(zip(('FAILURES', 'WINDOW'), map(int, os.environ['BASIC_AUTH_THROTTLE'].split('/'))))
+    if os.environ.get('BASIC_AUTH_THROTTLE') else None
+)
+
+# Claims des JWT (ninja_simple_jwt) : ceux par défaut, plus les permissions de l'utilisateur,
+# pour que StatelessJwtAuth (api/authentification.py) n'ait pas à lire l'utilisateur en base.
+NINJA_SIMPLE_JWT = {
+    'TOKEN_CLAIM_USER_ATTRIBUTE_MAP': {
+        'user_id': 'id',
+        'username': 'username',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'email': 'email',
+        'is_staff': 'is_staff',
+        'is_superuser': 'is_superuser',
+        'last_login': 'last_login',
+        'date_joined': 'date_joined',
+        'is_active': 'is_active',
+        'permissions': lambda user: sorted(user.get_all_permissions()),
+    },
+}
+
+# Intervalle (en secondes) de rechargement de la liste des JWT révoqués (déconnexion), voir pokemon/revocation.py.
+JWT_REVOCATION_REFRESH = int(os.environ.get('JWT_REVOCATION_REFRESH', '30'))
+
+# Écritures en masse (POST /api/pokemon/bulk, /api/type/bulk), voir api/bulk.py :
+# nombre maximal d'éléments par requête, et nombre de lignes par requête SQL.
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', '10000'))
+BULK_BATCH_SIZE = 500
+
+# Intervalle (en secondes) d'écriture groupée des dates de dernière utilisation des clés API.
+API_KEY_LAST_USED_INTERVAL = int(os.environ.get('API_KEY_LAST_USED_INTERVAL', '60'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import path
 from pokemon.views import view_home, view_login, view_logout
 from api import api
+from project.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -25,6 +26,8 @@ urlpatterns = [
     path('api/', api.urls),
     # disponible sur http://127.0.0.1:8000/api/
     # http://127.0.0.1:8000/api/docs → interface Swagger Ninja
+    path('metrics', metrics_view, name='metrics'),
+    # disponible sur http://127.0.0.1:8000/metrics (format texte Prometheus)
     path('', view_home, name='home'),
     path('login/', view_login, name='login'),
     path('logout/', view_logout, name='logout'),